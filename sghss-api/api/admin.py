@@ -0,0 +1,55 @@
+from flask import Blueprint, Response, request, jsonify
+from auth.utils import token_required, admin_required
+from config import Config
+from api.agenda import interpretar_data
+from api.paginacao import intervalo_datas, inteiro
+from api.estatisticas import estatisticas
+from storage import exportar
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+# Endpoints
+@admin_bp.route('/export/<colecao>', methods=['GET'])
+@token_required
+@admin_required
+def export_colecao(colecao):
+    """Exporta uma coleção como NDJSON (formato=gzip para comprimir; ver storage/exportar.py)"""
+    if colecao not in Config.FILES:
+        return jsonify({'error': 'Coleção não encontrada'}), 404
+
+    try:
+        since_id = inteiro('since_id')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    since = request.args.get('since')
+    desde = interpretar_data(since) if since else None
+    if since and desde is None:
+        return jsonify({'error': 'Parâmetro since deve ser uma data ISO (ex.: 2024-01-15T00:00:00)'}), 400
+
+    formato = request.args.get('formato', 'ndjson')
+    if formato not in ('ndjson', 'gzip'):
+        return jsonify({'error': 'Parâmetro formato deve ser ndjson ou gzip'}), 400
+
+    gzip = formato == 'gzip'
+    arquivo = f'{colecao}.ndjson.gz' if gzip else f'{colecao}.ndjson'
+    resposta = Response(exportar.exportar(colecao, since_id, desde, gzip),
+                        mimetype='application/gzip' if gzip else 'application/x-ndjson')
+    resposta.headers['Content-Disposition'] = f'attachment; filename="{arquivo}"'
+    resposta.headers['Cache-Control'] = 'no-store'
+    return resposta
+
+@admin_bp.route('/stats', methods=['GET'])
+@token_required
+@admin_required
+def get_stats():
+    """Contagem de consultas por status, profissional, tipo e dia (de, ate: só os dias do período)"""
+    try:
+        inicio, fim = intervalo_datas()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Contadores mantidos a cada escrita (api/estatisticas.py): nenhuma consulta é lida
+    resposta = jsonify(estatisticas().resumo(inicio, fim))
+    resposta.headers['Cache-Control'] = 'no-store'
+    return resposta, 200
@@ -0,0 +1,238 @@
+"""Índice de horários ocupados (consultas AGENDADA) por profissional.
+
+Só as consultas com status AGENDADA ocupam horário, então o índice guarda
+apenas elas, mantido pelo repositório a cada mudança em 'consultas'
+(criação, reagendamento, cancelamento, remoção e atendimento):
+
+- ``(profissional, inicio) -> id``: checagem O(1) de horário idêntico;
+- por profissional, a lista ordenada de ``(inicio, id)`` com o fim de cada
+  intervalo: sobreposições são achadas com bisect, olhando só as consultas
+  que começam entre ``inicio - maior duração`` e o fim pedido.
+
+A duração de cada consulta vem do campo ``duracao`` (minutos), ou de
+Config.CONSULTA_DURACAO_MINUTOS para consultas antigas.
+
+``livres`` calcula os horários livres de um profissional: o expediente
+(Config.EXPEDIENTE_*) menos os intervalos de ``IndiceHorarios.ocupados``,
+lidos com uma única busca por bisect para o período inteiro.
+"""
+import threading
+from bisect import bisect_left, insort
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import Config
+from storage import repositorio
+from storage.base import Derivado, Registro
+
+
+def interpretar_data(valor: Any) -> Optional[datetime]:
+    """``datetime`` (sem fuso, no horário local) de uma data ISO; None se inválida"""
+    if isinstance(valor, datetime):
+        data = valor
+    else:
+        try:
+            data = datetime.fromisoformat(str(valor))
+        except ValueError:
+            return None
+    if data.tzinfo is not None:
+        data = data.astimezone().replace(tzinfo=None)
+    return data
+
+
+def duracao_de(consulta: Registro) -> timedelta:
+    return timedelta(minutes=consulta.get('duracao') or Config.CONSULTA_DURACAO_MINUTOS)
+
+
+class _Agenda:
+    """Intervalos ocupados de um profissional, ordenados pelo início"""
+
+    __slots__ = ('inicios', 'fins', 'maior_duracao')
+
+    def __init__(self):
+        self.inicios: List[Tuple[datetime, int]] = []
+        self.fins: Dict[int, datetime] = {}
+        self.maior_duracao = timedelta(0)
+
+    def incluir(self, inicio: datetime, fim: datetime, consulta_id: int) -> None:
+        insort(self.inicios, (inicio, consulta_id))
+        self.fins[consulta_id] = fim
+        self.maior_duracao = max(self.maior_duracao, fim - inicio)
+
+    def excluir(self, inicio: datetime, consulta_id: int) -> None:
+        pos = bisect_left(self.inicios, (inicio, consulta_id))
+        if pos < len(self.inicios) and self.inicios[pos] == (inicio, consulta_id):
+            del self.inicios[pos]
+        self.fins.pop(consulta_id, None)
+
+    def sobrepostos(self, inicio: datetime, fim: datetime) -> Iterable[Tuple[datetime, datetime, int]]:
+        inicios = self.inicios
+        for pos in range(bisect_left(inicios, (inicio - self.maior_duracao,)), len(inicios)):
+            item_inicio, consulta_id = inicios[pos]
+            if item_inicio >= fim:
+                break
+            item_fim = self.fins[consulta_id]
+            if item_fim > inicio:
+                yield item_inicio, item_fim, consulta_id
+
+
+class IndiceHorarios(Derivado):
+    """Horários ocupados por consultas AGENDADA (ver docstring do módulo)"""
+
+    colecao = 'consultas'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._exatos: Dict[Tuple[Any, Any], int] = {}
+        self._agendas: Dict[Any, _Agenda] = {}
+        self._ocupados: Dict[int, Tuple[Any, Any, Optional[datetime]]] = {}
+
+    # Manutenção (chamada pelo repositório)
+    def reconstruir(self, registros: Iterable[Registro]) -> None:
+        with self._lock:
+            self._exatos = {}
+            self._agendas = {}
+            self._ocupados = {}
+            for registro in registros:
+                self._incluir(registro)
+
+    def aplicar(self, anterior: Optional[Registro], novo: Optional[Registro]) -> None:
+        with self._lock:
+            if anterior is not None:
+                self._excluir(anterior['id'])
+            if novo is not None:
+                self._incluir(novo)
+
+    def _incluir(self, consulta: Registro) -> None:
+        if consulta.get('status') != 'AGENDADA':
+            return
+        profissional = consulta.get('profissional')
+        inicio = interpretar_data(consulta.get('data'))
+        chave = inicio if inicio is not None else consulta.get('data')
+        self._exatos[(profissional, chave)] = consulta['id']
+        self._ocupados[consulta['id']] = (profissional, chave, inicio)
+        if inicio is not None:
+            agenda = self._agendas.get(profissional)
+            if agenda is None:
+                agenda = self._agendas[profissional] = _Agenda()
+            agenda.incluir(inicio, inicio + duracao_de(consulta), consulta['id'])
+
+    def _excluir(self, consulta_id: int) -> None:
+        ocupado = self._ocupados.pop(consulta_id, None)
+        if ocupado is None:
+            return
+        profissional, chave, inicio = ocupado
+        if self._exatos.get((profissional, chave)) == consulta_id:
+            del self._exatos[(profissional, chave)]
+        if inicio is not None:
+            agenda = self._agendas[profissional]
+            agenda.excluir(inicio, consulta_id)
+            if not agenda.fins:
+                del self._agendas[profissional]
+
+    # Consultas
+    def conflito(self, profissional: Any, data: Any, duracao: Optional[int] = None,
+                 ignorar: Optional[int] = None) -> Optional[int]:
+        """Id de uma consulta AGENDADA que ocupa o horário pedido, ou None"""
+        inicio = interpretar_data(data)
+        chave = inicio if inicio is not None else data
+        with self._lock:
+            exato = self._exatos.get((profissional, chave))
+            if exato is not None and exato != ignorar:
+                return exato
+            agenda = self._agendas.get(profissional)
+            if inicio is None or agenda is None:
+                return None
+            fim = inicio + timedelta(minutes=duracao or Config.CONSULTA_DURACAO_MINUTOS)
+            for _, _, consulta_id in agenda.sobrepostos(inicio, fim):
+                if consulta_id != ignorar:
+                    return consulta_id
+        return None
+
+    def ocupados(self, profissional: Any, de: datetime, ate: datetime) -> List[Tuple[datetime, datetime, int]]:
+        """Intervalos ``(inicio, fim, consulta_id)`` que cruzam [de, ate), em ordem"""
+        with self._lock:
+            agenda = self._agendas.get(profissional)
+            return list(agenda.sobrepostos(de, ate)) if agenda else []
+
+
+class ReservasLote:
+    """Horários pedidos por um lote de consultas ainda não gravado (POST /consultas/bulk).
+
+    Acha conflitos entre as próprias linhas do lote, com a mesma regra do
+    índice; os conflitos com consultas já gravadas continuam com ``conflito``.
+    """
+
+    def __init__(self):
+        self._exatos: Dict[Tuple[Any, datetime], int] = {}
+        self._agendas: Dict[Any, _Agenda] = {}
+
+    def reservar(self, profissional: Any, inicio: datetime, duracao: int, linha: int) -> Optional[int]:
+        """Reserva o horário para ``linha``; se já estiver ocupado no lote, a linha que o ocupa"""
+        exato = self._exatos.get((profissional, inicio))
+        if exato is not None:
+            return exato
+        fim = inicio + timedelta(minutes=duracao)
+        agenda = self._agendas.get(profissional)
+        if agenda is None:
+            agenda = self._agendas[profissional] = _Agenda()
+        for _, _, outra in agenda.sobrepostos(inicio, fim):
+            return outra
+        self._exatos[(profissional, inicio)] = linha
+        agenda.incluir(inicio, fim, linha)
+        return None
+
+
+def expedientes(de: datetime, ate: datetime) -> Iterator[Tuple[datetime, datetime]]:
+    """Janelas de expediente ``(abertura, fechamento)`` dos dias de atendimento que cruzam [de, ate)"""
+    abertura, fechamento = time.fromisoformat(Config.EXPEDIENTE_INICIO), time.fromisoformat(Config.EXPEDIENTE_FIM)
+    dia: date = de.date()
+    while dia <= ate.date():
+        janela = datetime.combine(dia, abertura), datetime.combine(dia, fechamento)
+        if dia.weekday() in Config.EXPEDIENTE_DIAS and janela[0] < ate and janela[1] > de:
+            yield janela
+        dia += timedelta(days=1)
+
+
+def livres(ocupados: Iterable[Tuple[datetime, datetime, Any]], de: datetime, ate: datetime,
+           duracao: timedelta, passo: timedelta) -> List[Tuple[datetime, datetime]]:
+    """Horários ``(inicio, fim)`` de ``duracao`` livres no expediente dentro de [de, ate).
+
+    Os horários começam na abertura do expediente, de ``passo`` em ``passo``;
+    ``ocupados`` vem ordenado pelo início (``IndiceHorarios.ocupados``).
+    """
+    # Intervalos ocupados unidos: disjuntos e em ordem, percorridos uma única vez
+    unidos: List[List[datetime]] = []
+    for inicio, fim, _ in ocupados:
+        if unidos and inicio <= unidos[-1][1]:
+            unidos[-1][1] = max(unidos[-1][1], fim)
+        else:
+            unidos.append([inicio, fim])
+
+    resultado = []
+    j = 0
+    for abertura, fechamento in expedientes(de, ate):
+        limite = min(fechamento, ate)
+
+        def alinhar(instante: datetime) -> datetime:
+            # Primeiro horário da grade do dia a partir de ``instante``
+            if instante <= abertura:
+                return abertura
+            return abertura + passo * -((abertura - instante) // passo)
+
+        inicio = alinhar(de)
+        while inicio + duracao <= limite:
+            fim = inicio + duracao
+            while j < len(unidos) and unidos[j][1] <= inicio:
+                j += 1
+            if j < len(unidos) and unidos[j][0] < fim:
+                inicio = alinhar(unidos[j][1])
+                continue
+            resultado.append((inicio, fim))
+            inicio += passo
+    return resultado
+
+
+def indice() -> IndiceHorarios:
+    """Índice do processo, já sincronizado com as escritas de outros processos"""
+    return repositorio.derivado(IndiceHorarios)
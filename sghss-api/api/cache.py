@@ -0,0 +1,148 @@
+"""Cache de respostas GET com ETag forte e invalidação por versão de coleção.
+
+Uso, depois de ``token_required``::
+
+    @consultas_bp.route('', methods=['GET'])
+    @token_required
+    @cache.respostas('consultas', 'usuarios', 'profissionais')
+    def get_consultas(): ...
+
+A chave é (endpoint, user_id, perfil, query string, Accept). Cada entrada
+guarda as versões (``repositorio.versao``) das coleções das quais a resposta
+depende, lidas antes de executar a view: qualquer escrita nelas, feita por
+qualquer blueprint ou processo, muda a versão e invalida a entrada.
+
+O ETag é o hash do corpo, então é o mesmo em todos os workers; com
+``If-None-Match`` igual a resposta é 304 sem corpo. O cache é um LRU limitado
+por Config.CACHE_RESPOSTAS_MAX_BYTES; respostas que não são 200 ou que são
+transmitidas aos poucos (NDJSON) não são guardadas.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Dict, List, Tuple
+
+from flask import current_app, request
+
+from config import Config
+from storage import repositorio
+
+
+class CacheRespostas:
+    """LRU de respostas limitado pelo total de bytes dos corpos"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entradas: 'OrderedDict[Tuple, Tuple]' = OrderedDict()  # chave -> (versões, corpo, etag, cabeçalhos)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+        self.nao_modificados = 0
+        self.descartes = 0
+
+    def obter(self, chave: Tuple, versoes: Tuple[int, ...]):
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None and entrada[0] == versoes:
+                self._entradas.move_to_end(chave)
+                self.acertos += 1
+                return entrada
+            if entrada is not None:
+                self._remover(chave)
+            self.faltas += 1
+            return None
+
+    def guardar(self, chave: Tuple, versoes: Tuple[int, ...], corpo: bytes, etag: str,
+                cabecalhos: List[Tuple[str, str]]) -> None:
+        if len(corpo) > self.max_bytes:
+            return
+        with self._lock:
+            if chave in self._entradas:
+                self._remover(chave)
+            self._entradas[chave] = (versoes, corpo, etag, cabecalhos)
+            self._bytes += len(corpo)
+            while self._bytes > self.max_bytes:
+                self._remover(next(iter(self._entradas)))
+                self.descartes += 1
+
+    def _remover(self, chave: Tuple) -> None:
+        _, corpo, _, _ = self._entradas.pop(chave)
+        self._bytes -= len(corpo)
+
+    def contar_nao_modificado(self) -> None:
+        with self._lock:
+            self.nao_modificados += 1
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.acertos + self.faltas
+            return {
+                'entradas': len(self._entradas),
+                'bytes': self._bytes,
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+                'nao_modificados': self.nao_modificados,
+                'descartes': self.descartes,
+                'taxa_acerto': round(self.acertos / total, 4) if total else 0.0,
+            }
+
+
+cache = CacheRespostas(Config.CACHE_RESPOSTAS_MAX_BYTES)
+
+
+def gerar_etag(corpo: bytes) -> str:
+    return hashlib.blake2b(corpo, digest_size=16).hexdigest()
+
+
+# Cabeçalhos da resposta original que não são refeitos por _responder
+_RECALCULADOS = {'content-length', 'etag', 'cache-control', 'vary', 'set-cookie'}
+
+
+def _responder(corpo: bytes, etag: str, cabecalhos: List[Tuple[str, str]]):
+    """Resposta 200 com o corpo guardado, ou 304 se o cliente já tem o ETag"""
+    if request.if_none_match.contains(etag):
+        cache.contar_nao_modificado()
+        resposta = current_app.response_class(status=304)
+    else:
+        resposta = current_app.response_class(corpo, status=200)
+    for nome, valor in cabecalhos:
+        resposta.headers[nome] = valor
+    resposta.set_etag(etag)
+    resposta.headers['Cache-Control'] = 'private, no-cache'
+    resposta.vary.update(('Authorization', 'Accept'))
+    return resposta
+
+
+def respostas(*colecoes: str):
+    """Decorator: guarda a resposta da view até uma das ``colecoes`` mudar"""
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if not Config.CACHE_RESPOSTAS:
+                return f(*args, **kwargs)
+
+            chave = (request.endpoint, tuple(sorted(kwargs.items())), request.user_id, request.user_perfil,
+                     request.query_string, request.headers.get('Accept', ''))
+            versoes = tuple(repositorio.versao(nome) for nome in colecoes)
+            entrada = cache.obter(chave, versoes)
+            if entrada is not None:
+                _, corpo, etag, cabecalhos = entrada
+                return _responder(corpo, etag, cabecalhos)
+
+            resposta = current_app.make_response(f(*args, **kwargs))
+            if resposta.status_code != 200 or resposta.is_streamed:
+                return resposta
+            corpo = resposta.get_data()
+            etag = gerar_etag(corpo)
+            cabecalhos = [(n, v) for n, v in resposta.headers.items() if n.lower() not in _RECALCULADOS]
+            cache.guardar(chave, versoes, corpo, etag, cabecalhos)
+            return _responder(corpo, etag, cabecalhos)
+        return decorated
+    return decorator
@@ -1,180 +1,227 @@
 from flask import Blueprint, request, jsonify
+from pydantic import ValidationError
 from datetime import datetime
-import json
 from auth.utils import token_required, admin_required, profissional_required
-from config import Config
+from storage import repositorio
+from api import agenda, cache, lotes, paginacao
+from api.enriquecimento import NOMES_CONSULTA, juntar
+from api.esquemas import AtendimentoEntrada, ConsultaAtualizacao, ConsultaEntrada, ConsultaLote, mensagem, validar
+from api.notificacoes import notificar
+from api.receitas import emitir
 
 consultas_bp = Blueprint('consultas', __name__, url_prefix='/consultas')
 
-def carregar_dados(nome):
-    try:
-        with open(Config.FILES[nome], 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
-
-def salvar_dados(nome, dados):
-    with open(Config.FILES[nome], 'w', encoding='utf-8') as f:
-        json.dump(dados, f, indent=4, ensure_ascii=False)
-
-def gerar_id(lista):
-    if not lista:
-        return 1
-    return max(item.get('id', 0) for item in lista) + 1
-
-def notificar(paciente_id, mensagem):
-    notificacoes = carregar_dados('notificacoes')
-    notificacoes.append({
-        'paciente': paciente_id,
-        'mensagem': mensagem,
-        'data': datetime.now().isoformat()
-    })
-    salvar_dados('notificacoes', notificacoes)
-
 # Endpoints
 @consultas_bp.route('', methods=['GET'])
 @token_required
+@cache.respostas('consultas', 'usuarios', 'profissionais')
 def get_consultas():
-    """Lista consultas conforme perfil"""
-    consultas = carregar_dados('consultas')
+    """Lista consultas conforme perfil (paginação, filtros e fields: ver api/paginacao.py)"""
+    try:
+        pagina = paginacao.Pagina()
+        aceita = paginacao.filtro_consultas()
+        profissional = paginacao.inteiro('profissional')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     # Filtrar conforme perfil
     if request.user_perfil == 'PACIENTE':
-        consultas_filtradas = [c for c in consultas if c['paciente'] == request.user_id]
+        consultas = repositorio.iterar('consultas', 'paciente', request.user_id, pagina.cursor)
     elif request.user_perfil == 'PROFISSIONAL':
-        consultas_filtradas = [c for c in consultas if c['profissional'] == request.user_id]
+        consultas = repositorio.iterar('consultas', 'profissional', request.user_id, pagina.cursor)
+    elif profissional is not None:  # ADMIN filtrando por profissional
+        consultas = repositorio.iterar('consultas', 'profissional', profissional, pagina.cursor)
     else:  # ADMIN
-        consultas_filtradas = consultas
+        consultas = repositorio.iterar('consultas', apos=pagina.cursor)
     
-    # Adicionar informações
-    usuarios = carregar_dados('usuarios')
-    profissionais = carregar_dados('profissionais')
-    
-    for consulta in consultas_filtradas:
-        # Nome do paciente
-        paciente = next((u for u in usuarios if u['id'] == consulta['paciente']), None)
-        if paciente:
-            consulta['paciente_nome'] = paciente['nome']
-        
-        # Nome do profissional
-        profissional = next((p for p in profissionais if p['id'] == consulta['profissional']), None)
-        if profissional:
-            consulta['profissional_nome'] = profissional.get('nome')
-    
-    return jsonify(consultas_filtradas), 200
+    # Nomes do paciente e do profissional, juntados em lote por página
+    return pagina.responder((c for c in consultas if aceita(c)), juntar(NOMES_CONSULTA, pagina.campos))
 
 @consultas_bp.route('', methods=['POST'])
 @token_required
+@validar(ConsultaEntrada)
 def create_consulta():
     """Cria uma nova consulta"""
-    data = request.get_json()
-    
-    required_fields = ['profissional_id', 'data', 'tipo']
-    for field in required_fields:
-        if field not in data:
-            return jsonify({'error': f'Campo obrigatório faltando: {field}'}), 400
-    
-    # Verificar conflito de horário
-    consultas = carregar_dados('consultas')
-    conflito = any(
-        c['profissional'] == data['profissional_id'] and 
-        c['data'] == data['data'] and 
-        c['status'] == 'AGENDADA'
-        for c in consultas
-    )
-    
-    if conflito:
-        return jsonify({'error': 'Horário ocupado para este profissional'}), 409
+    dados = request.dados
     
     # Determinar paciente
     if request.user_perfil == 'PACIENTE':
         paciente_id = request.user_id
-    elif 'paciente_id' in data:
-        paciente_id = data['paciente_id']
+    elif dados.paciente_id is not None:
+        paciente_id = dados.paciente_id
     else:
         return jsonify({'error': 'ID do paciente é necessário'}), 400
     
     # Verificar permissão
-    if request.user_perfil == 'PROFISSIONAL' and data['profissional_id'] != request.user_id:
+    if request.user_perfil == 'PROFISSIONAL' and dados.profissional_id != request.user_id:
         return jsonify({'error': 'Você só pode agendar consultas para si mesmo'}), 403
     
-    # Gerar link para teleconsulta
-    link = f"https://telemed.local/consulta/{gerar_id(consultas)}" if data['tipo'] == 'O' else ""
+    data_consulta = dados.data.isoformat()
     
-    # Criar consulta
-    nova_consulta = {
-        'id': gerar_id(consultas),
-        'paciente': paciente_id,
-        'profissional': data['profissional_id'],
-        'data': data['data'],
-        'status': 'AGENDADA',
-        'tipo': data['tipo'],
-        'link': link,
-        'data_criacao': datetime.now().isoformat(),
-        'criado_por': request.user_id
-    }
-    
-    consultas.append(nova_consulta)
-    salvar_dados('consultas', consultas)
-    
-    # Notificar
-    notificar(paciente_id, f"Consulta agendada para {data['data']}")
+    # Conflito, criação e notificação na mesma transação: dois agendamentos
+    # simultâneos não podem ocupar o mesmo horário
+    with repositorio.transacao('consultas') as tx:
+        # Verificar conflito de horário (inclusive sobreposição de durações)
+        conflito = agenda.indice().conflito(dados.profissional_id, dados.data, dados.duracao)
+        
+        if conflito is not None:
+            return jsonify({'error': 'Horário ocupado para este profissional'}), 409
+        
+        # Gerar link para teleconsulta
+        novo_id = tx.reservar_id('consultas')
+        link = f"https://telemed.local/consulta/{novo_id}" if dados.tipo == 'O' else ""
+        
+        # Criar consulta
+        nova_consulta = tx.inserir('consultas', {
+            'id': novo_id,
+            'paciente': paciente_id,
+            'profissional': dados.profissional_id,
+            'data': data_consulta,
+            'duracao': dados.duracao,
+            'status': 'AGENDADA',
+            'tipo': dados.tipo,
+            'link': link,
+            'data_criacao': datetime.now().isoformat(),
+            'criado_por': request.user_id
+        })
+        
+        # Notificar
+        notificar(paciente_id, f"Consulta agendada para {data_consulta}", tx)
     
     return jsonify({
         'message': 'Consulta agendada com sucesso',
         'consulta': nova_consulta
     }), 201
 
+@consultas_bp.route('/bulk', methods=['POST'])
+@token_required
+@admin_required
+def create_consultas_bulk():
+    """Agenda várias consultas de uma vez (array JSON ou NDJSON; ver api/lotes.py)"""
+    try:
+        itens, erros = lotes.ler_itens()
+    except lotes.LoteInvalido as e:
+        return jsonify({'error': str(e)}), e.status
+    
+    validos = []
+    for linha, item in itens:
+        try:
+            validos.append((linha, ConsultaLote.model_validate(item)))
+        except ValidationError as e:
+            erros.append({'linha': linha, 'error': mensagem(e)})
+    
+    # Pacientes e profissionais do lote lidos de uma vez
+    pacientes = repositorio.obter_varios('pacientes', {dados.paciente_id for _, dados in validos})
+    profissionais = repositorio.obter_varios('profissionais', {dados.profissional_id for _, dados in validos})
+    
+    # Conflitos entre as próprias linhas do lote
+    reservas = agenda.ReservasLote()
+    aceitos = []
+    for linha, dados in validos:
+        if dados.paciente_id not in pacientes:
+            erros.append({'linha': linha, 'error': 'Paciente não encontrado'})
+        elif dados.profissional_id not in profissionais:
+            erros.append({'linha': linha, 'error': 'Profissional não encontrado'})
+        else:
+            outra = reservas.reservar(dados.profissional_id, dados.data, dados.duracao, linha)
+            if outra is not None:
+                erros.append({'linha': linha, 'error': f'Horário ocupado no próprio lote (linha {outra})'})
+            else:
+                aceitos.append((linha, dados))
+    
+    ids = []
+    agora = datetime.now().isoformat()
+    with repositorio.transacao('consultas') as tx:
+        # Conflitos com consultas já agendadas, com a coleção travada
+        indice = agenda.indice()
+        ocupados = {linha for linha, dados in aceitos
+                    if indice.conflito(dados.profissional_id, dados.data, dados.duracao) is not None}
+        erros.extend({'linha': linha, 'error': 'Horário ocupado para este profissional'} for linha in sorted(ocupados))
+        if erros and lotes.tudo_ou_nada():
+            return jsonify(lotes.resposta([], erros)[0]), 422
+        
+        for linha, dados in aceitos:
+            if linha in ocupados:
+                continue
+            novo_id = tx.reservar_id('consultas')
+            data_consulta = dados.data.isoformat()
+            tx.inserir('consultas', {
+                'id': novo_id,
+                'paciente': dados.paciente_id,
+                'profissional': dados.profissional_id,
+                'data': data_consulta,
+                'duracao': dados.duracao,
+                'status': 'AGENDADA',
+                'tipo': dados.tipo,
+                'link': f"https://telemed.local/consulta/{novo_id}" if dados.tipo == 'O' else "",
+                'data_criacao': agora,
+                'criado_por': request.user_id
+            })
+            ids.append(novo_id)
+            notificar(dados.paciente_id, f"Consulta agendada para {data_consulta}", tx)
+    
+    corpo, status = lotes.resposta(ids, erros)
+    return jsonify(corpo), status
+
 @consultas_bp.route('/<int:consulta_id>', methods=['PUT'])
 @token_required
+@validar(ConsultaAtualizacao)
 def update_consulta(consulta_id):
     """Atualiza uma consulta"""
-    data = request.get_json()
-    
-    consultas = carregar_dados('consultas')
-    consulta_index = next((i for i, c in enumerate(consultas) if c['id'] == consulta_id), None)
-    
-    if consulta_index is None:
-        return jsonify({'error': 'Consulta não encontrada'}), 404
-    
-    consulta = consultas[consulta_index]
-    
-    # Verificar permissão
-    if (request.user_perfil == 'PACIENTE' and consulta['paciente'] != request.user_id and 
-        'paciente_id' not in data):
-        return jsonify({'error': 'Acesso não autorizado'}), 403
+    dados = request.dados
+    enviados = dados.model_fields_set
     
-    if (request.user_perfil == 'PROFISSIONAL' and consulta['profissional'] != request.user_id and 
-        'profissional_id' not in data):
-        return jsonify({'error': 'Acesso não autorizado'}), 403
-    
-    # Atualizar dados
-    if 'data' in data:
-        # Verificar conflito
-        conflito = any(
-            c['profissional'] == consulta['profissional'] and 
-            c['data'] == data['data'] and 
-            c['status'] == 'AGENDADA' and 
-            c['id'] != consulta_id
-            for c in consultas
-        )
-        
-        if conflito:
-            return jsonify({'error': 'Horário ocupado'}), 409
-        
-        consultas[consulta_index]['data'] = data['data']
-        notificar(consulta['paciente'], f"Consulta reagendada para {data['data']}")
-    
-    if 'status' in data and data['status'] in ['AGENDADA', 'REALIZADA', 'CANCELADA']:
-        consultas[consulta_index]['status'] = data['status']
-        if data['status'] == 'CANCELADA':
-            notificar(consulta['paciente'], 'Consulta cancelada')
-    
-    salvar_dados('consultas', consultas)
+    with repositorio.transacao('consultas') as tx:
+        consulta = tx.obter('consultas', consulta_id)
+        
+        if consulta is None:
+            return jsonify({'error': 'Consulta não encontrada'}), 404
+        
+        # Verificar permissão
+        if (request.user_perfil == 'PACIENTE' and consulta['paciente'] != request.user_id and 
+            'paciente_id' not in enviados):
+            return jsonify({'error': 'Acesso não autorizado'}), 403
+        
+        if (request.user_perfil == 'PROFISSIONAL' and consulta['profissional'] != request.user_id and 
+            'profissional_id' not in enviados):
+            return jsonify({'error': 'Acesso não autorizado'}), 403
+        
+        # Atualizar dados
+        campos = {}
+        if dados.data is not None:
+            campos['data'] = dados.data.isoformat()
+        
+        if dados.duracao is not None:
+            campos['duracao'] = dados.duracao
+        
+        if dados.status in ['AGENDADA', 'REALIZADA', 'CANCELADA']:
+            campos['status'] = dados.status
+        
+        # Verificar conflito se o horário mudou ou a consulta voltou a ser AGENDADA
+        resultado = {**consulta, **campos}
+        if resultado['status'] == 'AGENDADA' and ('data' in campos or 'duracao' in campos or
+                                                   consulta['status'] != 'AGENDADA'):
+            inicio = dados.data if dados.data is not None else resultado['data']
+            conflito = agenda.indice().conflito(
+                resultado['profissional'], inicio, resultado.get('duracao'), ignorar=consulta_id
+            )
+            
+            if conflito is not None:
+                return jsonify({'error': 'Horário ocupado'}), 409
+        
+        if 'data' in campos:
+            notificar(consulta['paciente'], f"Consulta reagendada para {campos['data']}", tx)
+        
+        if campos.get('status') == 'CANCELADA':
+            notificar(consulta['paciente'], 'Consulta cancelada', tx)
+        
+        if campos:
+            campos['data_atualizacao'] = datetime.now().isoformat()
+            consulta = tx.atualizar('consultas', consulta_id, campos)
     
     return jsonify({
         'message': 'Consulta atualizada',
-        'consulta': consultas[consulta_index]
+        'consulta': consulta
     }), 200
 
 # Endpoint DELETE 
@@ -183,69 +230,59 @@ def update_consulta(consulta_id):
 def delete_consulta(consulta_id):
     """Deleta uma consulta do sistema"""
     
-    consultas = carregar_dados('consultas')
-    
-    # Encontrar consulta pelo ID
-    consulta_index = next((i for i, c in enumerate(consultas) if c['id'] == consulta_id), None)
-    
-    if consulta_index is None:
-        return jsonify({
-            'error': 'Consulta não encontrada',
-            'message': f'Não existe consulta com ID {consulta_id}'
-        }), 404
-    
-    consulta = consultas[consulta_index]
-    
-    # VERIFICAR PERMISSÕES
-    user_id = request.user_id
-    user_perfil = request.user_perfil
-    
-    pode_deletar = False
-    motivo = ""
-    
-    if user_perfil == 'ADMIN':
-        pode_deletar = True
-        motivo = 'Perfil ADMIN tem acesso total'
-    
-    elif user_perfil == 'PROFISSIONAL' and consulta['profissional'] == user_id:
-        pode_deletar = True
-        motivo = 'Profissional pode deletar seus próprios agendamentos'
-    
-    elif user_perfil == 'PACIENTE' and consulta['paciente'] == user_id:
-        pode_deletar = True
-        motivo = 'Paciente pode deletar seus próprios agendamentos'
-    
-    if not pode_deletar:
-        return jsonify({
-            'error': 'Permissão negada',
-            'message': 'Você não tem permissão para deletar esta consulta',
-            'detalhes': f'{user_perfil} só pode deletar suas próprias consultas'
-        }), 403
-    
-    # VERIFICAR SE CONSULTA JÁ FOI REALIZADA
-    if consulta['status'] == 'REALIZADA':
-        return jsonify({
-            'error': 'Não é possível deletar',
-            'message': 'Consultas já realizadas não podem ser removidas',
-            'sugestao': 'Altere o status para "CANCELADA" em vez de deletar'
-        }), 400
-    
-    # REMOVER CONSULTA
-    consulta_removida = consultas.pop(consulta_index)
-    salvar_dados('consultas', consultas)
-    
-    # NOTIFICAR OS ENVOLVIDOS
-    notificar(consulta['paciente'], f"Consulta do dia {consulta['data']} foi removida do sistema")
-    
-    # Se houver profissional, notificar também
-    if consulta['profissional']:
-        notificacoes = carregar_dados('notificacoes')
-        notificacoes.append({
-            'profissional': consulta['profissional'],
-            'mensagem': f"Consulta com {consulta['paciente']} foi removida",
-            'data': datetime.now().isoformat()
-        })
-        salvar_dados('notificacoes', notificacoes)
+    with repositorio.transacao('consultas') as tx:
+        # Encontrar consulta pelo ID
+        consulta = tx.obter('consultas', consulta_id)
+        
+        if consulta is None:
+            return jsonify({
+                'error': 'Consulta não encontrada',
+                'message': f'Não existe consulta com ID {consulta_id}'
+            }), 404
+        
+        # VERIFICAR PERMISSÕES
+        user_id = request.user_id
+        user_perfil = request.user_perfil
+        
+        pode_deletar = False
+        motivo = ""
+        
+        if user_perfil == 'ADMIN':
+            pode_deletar = True
+            motivo = 'Perfil ADMIN tem acesso total'
+        
+        elif user_perfil == 'PROFISSIONAL' and consulta['profissional'] == user_id:
+            pode_deletar = True
+            motivo = 'Profissional pode deletar seus próprios agendamentos'
+        
+        elif user_perfil == 'PACIENTE' and consulta['paciente'] == user_id:
+            pode_deletar = True
+            motivo = 'Paciente pode deletar seus próprios agendamentos'
+        
+        if not pode_deletar:
+            return jsonify({
+                'error': 'Permissão negada',
+                'message': 'Você não tem permissão para deletar esta consulta',
+                'detalhes': f'{user_perfil} só pode deletar suas próprias consultas'
+            }), 403
+        
+        # VERIFICAR SE CONSULTA JÁ FOI REALIZADA
+        if consulta['status'] == 'REALIZADA':
+            return jsonify({
+                'error': 'Não é possível deletar',
+                'message': 'Consultas já realizadas não podem ser removidas',
+                'sugestao': 'Altere o status para "CANCELADA" em vez de deletar'
+            }), 400
+        
+        # REMOVER CONSULTA
+        consulta_removida = tx.remover('consultas', consulta_id)
+        
+        # NOTIFICAR OS ENVOLVIDOS
+        notificar(consulta['paciente'], f"Consulta do dia {consulta['data']} foi removida do sistema", tx)
+        
+        # Se houver profissional, notificar também
+        if consulta['profissional']:
+            notificar(consulta['profissional'], f"Consulta com {consulta['paciente']} foi removida", tx)
     
     return jsonify({
         'success': True,
@@ -259,59 +296,53 @@ def delete_consulta(consulta_id):
 @consultas_bp.route('/<int:consulta_id>/atender', methods=['POST'])
 @token_required
 @profissional_required
+@validar(AtendimentoEntrada)
 def atender_consulta(consulta_id):
     """Registra atendimento"""
-    data = request.get_json()
-    
-    if 'observacoes' not in data:
-        return jsonify({'error': 'Observações são obrigatórias'}), 400
-    
-    consultas = carregar_dados('consultas')
-    consulta_index = next((i for i, c in enumerate(consultas) if c['id'] == consulta_id), None)
-    
-    if consulta_index is None:
-        return jsonify({'error': 'Consulta não encontrada'}), 404
-    
-    consulta = consultas[consulta_index]
-    
-    # Verificar se o profissional pode atender
-    if consulta['profissional'] != request.user_id:
-        return jsonify({'error': 'Esta consulta não é sua para atender'}), 403
-    
-    if consulta['status'] != 'AGENDADA':
-        return jsonify({'error': 'Consulta não está agendada'}), 400
-    
-    # Atualizar status
-    consultas[consulta_index]['status'] = 'REALIZADA'
-    salvar_dados('consultas', consultas)
-    
-    # Criar atendimento
-    atendimentos = carregar_dados('atendimentos')
-    novo_atendimento = {
-        'consulta': consulta_id,
-        'profissional': request.user_id,
-        'paciente': consulta['paciente'],
-        'data': datetime.now().isoformat(),
-        'observacoes': data['observacoes']
-    }
-    atendimentos.append(novo_atendimento)
-    salvar_dados('atendimentos', atendimentos)
-    
-    # Adicionar ao prontuário
-    prontuarios = carregar_dados('prontuarios')
-    novo_prontuario = {
-        'paciente': consulta['paciente'],
-        'data': datetime.now().isoformat(),
-        'descricao': data['observacoes'],
-        'profissional': request.user_id,
-        'consulta': consulta_id
-    }
-    prontuarios.append(novo_prontuario)
-    salvar_dados('prontuarios', prontuarios)
+    data = request.dados.model_dump()
     
-    notificar(consulta['paciente'], 'Atendimento realizado')
+    with repositorio.transacao('consultas', 'atendimentos', 'prontuarios', 'receitas') as tx:
+        consulta = tx.obter('consultas', consulta_id)
+        
+        if consulta is None:
+            return jsonify({'error': 'Consulta não encontrada'}), 404
+        
+        # Verificar se o profissional pode atender
+        if consulta['profissional'] != request.user_id:
+            return jsonify({'error': 'Esta consulta não é sua para atender'}), 403
+        
+        if consulta['status'] != 'AGENDADA':
+            return jsonify({'error': 'Consulta não está agendada'}), 400
+        
+        # Atualizar status
+        tx.atualizar('consultas', consulta_id, {'status': 'REALIZADA', 'data_atualizacao': datetime.now().isoformat()})
+        
+        # Criar atendimento
+        novo_atendimento = tx.inserir('atendimentos', {
+            'consulta': consulta_id,
+            'profissional': request.user_id,
+            'paciente': consulta['paciente'],
+            'data': datetime.now().isoformat(),
+            'observacoes': data['observacoes']
+        })
+        
+        # Adicionar ao prontuário
+        tx.inserir('prontuarios', {
+            'paciente': consulta['paciente'],
+            'data': datetime.now().isoformat(),
+            'descricao': data['observacoes'],
+            'profissional': request.user_id,
+            'consulta': consulta_id
+        })
+        
+        # Receitas emitidas no atendimento
+        receitas = [emitir(tx, consulta['paciente'], request.user_id, conteudo, consulta_id)
+                    for conteudo in request.dados.receitas]
+        
+        notificar(consulta['paciente'], 'Atendimento realizado', tx)
     
     return jsonify({
         'message': 'Atendimento registrado',
-        'atendimento': novo_atendimento
+        'atendimento': novo_atendimento,
+        'receitas': receitas
     }), 201
\ No newline at end of file
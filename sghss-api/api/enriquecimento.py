@@ -0,0 +1,49 @@
+"""Junção em lote dos nomes relacionados (paciente_nome, profissional_nome...).
+
+Para um bloco de registros (uma página ou um trecho do streaming), cada
+relação junta os ids distintos do bloco e os resolve com uma única leitura
+(``repositorio.obter_varios``); as respostas são cópias novas, os registros
+do repositório nunca são alterados. Relações cujo campo de destino ficou de
+fora da projeção (``fields=``) não são lidas.
+"""
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+import metricas
+from storage import repositorio
+from storage.base import Registro
+
+
+class Relacao(NamedTuple):
+    campo: str  # chave estrangeira no registro (ex.: 'paciente')
+    colecao: str  # coleção referenciada (ex.: 'usuarios')
+    destino: str  # campo acrescentado à resposta (ex.: 'paciente_nome')
+    atributo: str = 'nome'  # campo copiado do registro referenciado
+
+
+PACIENTE_NOME = Relacao('paciente', 'usuarios', 'paciente_nome')
+PROFISSIONAL_NOME = Relacao('profissional', 'profissionais', 'profissional_nome')
+NOMES_CONSULTA = (PACIENTE_NOME, PROFISSIONAL_NOME)
+
+
+def enriquecer(registros: Iterable[Registro], relacoes: Sequence[Relacao],
+               campos: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """Cópias de ``registros`` com os campos das ``relacoes`` preenchidos"""
+    with metricas.ENRIQUECIMENTO_DURACAO.cronometrar():
+        itens = [dict(r) for r in registros]
+        for relacao in relacoes:
+            if campos is not None and relacao.destino not in campos:
+                continue
+            ids = {item.get(relacao.campo) for item in itens}
+            ids.discard(None)
+            relacionados = repositorio.obter_varios(relacao.colecao, ids)
+            for item in itens:
+                relacionado = relacionados.get(item.get(relacao.campo))
+                if relacionado is not None:
+                    item[relacao.destino] = relacionado.get(relacao.atributo)
+    return itens
+
+
+def juntar(relacoes: Sequence[Relacao],
+           campos: Optional[Sequence[str]] = None) -> Callable[[List[Registro]], List[Dict[str, Any]]]:
+    """Etapa ``preparar`` de paginacao.Pagina.responder que aplica ``enriquecer``"""
+    return lambda bloco: enriquecer(bloco, relacoes, campos)
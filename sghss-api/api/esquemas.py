@@ -0,0 +1,209 @@
+"""Modelos (pydantic v2) dos corpos de requisição e o decorator ``validar``.
+
+Uso, depois de ``token_required``/``admin_required``::
+
+    @consultas_bp.route('', methods=['POST'])
+    @token_required
+    @validar(ConsultaEntrada)
+    def create_consulta():
+        dados = request.dados  # ConsultaEntrada já validada
+
+O validador de cada modelo é compilado uma vez, na definição da classe. O
+corpo é validado antes de a view rodar -- nenhum arquivo ou índice é lido
+para um corpo inválido --, com tipos convertidos (``"5"`` -> 5) e datas já
+interpretadas: ``Data`` aceita ISO com ou sem hora e devolve ``datetime``
+sem fuso, no horário local (a mesma regra de api.agenda.interpretar_data).
+Corpo ausente, que não é JSON ou com campos inválidos: 400.
+"""
+from datetime import datetime
+from functools import wraps
+from typing import Any, Dict, List, Literal, Optional
+
+from flask import jsonify, request
+from pydantic import BaseModel, BeforeValidator, Field, PositiveInt, ValidationError, model_validator
+from typing_extensions import Annotated
+
+from api.agenda import interpretar_data
+from config import Config
+
+
+def _data(valor: Any) -> datetime:
+    if isinstance(valor, (int, float)) or valor is None:
+        raise ValueError('Data inválida (use o formato ISO, ex.: 2024-01-15T10:30:00)')
+    data = interpretar_data(valor)
+    if data is None:
+        raise ValueError('Data inválida (use o formato ISO, ex.: 2024-01-15T10:30:00)')
+    return data
+
+
+Data = Annotated[datetime, BeforeValidator(_data)]
+Texto = Annotated[str, Field(min_length=1)]
+
+
+def _duracao_padrao() -> int:
+    return Config.CONSULTA_DURACAO_MINUTOS
+
+
+def _validade_padrao() -> int:
+    return Config.RECEITA_VALIDADE_DIAS
+
+
+# Autenticação
+class LoginEntrada(BaseModel):
+    email: Texto
+    senha: Texto
+
+
+class RegistroEntrada(BaseModel):
+    nome: Texto
+    email: Texto
+    senha: Texto
+    perfil: Literal['PACIENTE', 'PROFISSIONAL', 'ADMIN']
+    telefone: str = ''
+    data_nascimento: str = ''
+    endereco: Dict[str, Any] = Field(default_factory=dict)
+    especialidade: str = ''
+    crm: str = ''
+
+
+class RefreshEntrada(BaseModel):
+    refresh_token: Texto
+
+
+class LogoutEntrada(BaseModel):
+    refresh_token: Optional[str] = None
+
+
+# Pacientes
+class PacienteEntrada(BaseModel):
+    nome: Texto
+    email: Texto
+    senha: Texto
+    telefone: Texto
+    data_nascimento: str = ''
+    endereco: Dict[str, Any] = Field(default_factory=dict)
+
+
+class PacienteAtualizacao(BaseModel):
+    nome: Optional[Texto] = None
+    email: Optional[Texto] = None
+    telefone: Optional[str] = None
+    data_nascimento: Optional[str] = None
+    endereco: Optional[Dict[str, Any]] = None
+
+
+# Consultas
+class ConsultaEntrada(BaseModel):
+    profissional_id: int
+    paciente_id: Optional[int] = None
+    data: Data
+    tipo: Texto
+    duracao: PositiveInt = Field(default_factory=_duracao_padrao)
+
+
+class ConsultaLote(ConsultaEntrada):
+    paciente_id: int
+
+
+class ConsultaAtualizacao(BaseModel):
+    data: Optional[Data] = None
+    duracao: Optional[PositiveInt] = None
+    status: Optional[str] = None
+    paciente_id: Optional[int] = None
+    profissional_id: Optional[int] = None
+
+
+# Receitas
+class ItemReceita(BaseModel):
+    medicamento: Texto
+    posologia: Texto
+    dosagem: str = ''
+    quantidade: Optional[PositiveInt] = None
+
+
+class ReceitaConteudo(BaseModel):
+    itens: Annotated[List[ItemReceita], Field(min_length=1)]
+    observacoes: str = ''
+    validade_dias: PositiveInt = Field(default_factory=_validade_padrao)
+
+
+class ReceitaEntrada(ReceitaConteudo):
+    paciente_id: Optional[int] = None
+    consulta_id: Optional[int] = None
+
+    @model_validator(mode='after')
+    def _paciente_ou_consulta(self):
+        if self.paciente_id is None and self.consulta_id is None:
+            raise ValueError('Informe paciente_id ou consulta_id')
+        return self
+
+
+# Atendimento (POST /consultas/<id>/atender), com receitas opcionais
+class AtendimentoEntrada(BaseModel):
+    observacoes: Texto
+    receitas: List[ReceitaConteudo] = Field(default_factory=list)
+
+
+# Internações
+class InternacaoEntrada(BaseModel):
+    paciente_id: int
+    ala: Texto
+    leito: PositiveInt
+    motivo: str = ''
+
+
+class TransferenciaEntrada(BaseModel):
+    ala: Texto
+    leito: PositiveInt
+
+
+class AltaEntrada(BaseModel):
+    observacoes: str = ''
+
+
+# Notificações
+class MarcarLidasEntrada(BaseModel):
+    ids: Optional[List[int]] = None
+    ate: Optional[int] = None
+
+    @model_validator(mode='after')
+    def _ids_ou_ate(self):
+        if self.ids is None and self.ate is None:
+            raise ValueError('Informe ids (lista) ou ate (id)')
+        return self
+
+
+def mensagem(erro: ValidationError) -> str:
+    """Mensagem do primeiro erro, no formato das demais respostas 400"""
+    primeiro = erro.errors()[0]
+    campo = '.'.join(str(parte) for parte in primeiro['loc'])
+    if primeiro['type'] == 'missing':
+        return f'Campo obrigatório faltando: {campo}'
+    texto = primeiro['msg']
+    if texto.startswith('Value error, '):
+        texto = texto[len('Value error, '):]
+    return f'Campo inválido: {campo} ({texto})' if campo else texto
+
+
+def detalhes(erro: ValidationError) -> List[Dict[str, Any]]:
+    return [{'campo': '.'.join(str(parte) for parte in e['loc']), 'mensagem': e['msg']}
+            for e in erro.errors(include_url=False)]
+
+
+def validar(modelo, opcional: bool = False):
+    """Decorator: valida o corpo JSON com ``modelo`` e o deixa em ``request.dados``"""
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            corpo = request.get_json(silent=True)
+            if corpo is None and opcional and not request.get_data():
+                corpo = {}
+            if not isinstance(corpo, dict):
+                return jsonify({'error': 'Corpo da requisição deve ser um objeto JSON'}), 400
+            try:
+                request.dados = modelo.model_validate(corpo)
+            except ValidationError as e:
+                return jsonify({'error': mensagem(e), 'detalhes': detalhes(e)}), 400
+            return f(*args, **kwargs)
+        return decorated
+    return decorator
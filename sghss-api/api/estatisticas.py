@@ -0,0 +1,103 @@
+"""Contadores de consultas por status, profissional, tipo e dia (GET /admin/stats).
+
+Mantidos pelo repositório a cada mudança em 'consultas' (agendamento,
+importação em lote, atualização, remoção e atendimento), que desconta o
+registro anterior e soma o novo; são reconstruídos a partir dos dados na
+inicialização da API (app.py) e quando outro processo grava a coleção.
+
+Há um contador geral e um por dia da consulta: sem período, o resumo é uma
+cópia do geral; com ``de``/``ate``, soma só os dias do período, sem ler
+nenhuma consulta.
+"""
+import threading
+from collections import Counter
+from datetime import date, datetime, time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from api.agenda import interpretar_data
+from storage import repositorio
+from storage.base import Derivado, Registro
+
+DIMENSOES = ('status', 'profissional', 'tipo')
+TOTAL = ('total', None)
+
+Chave = Tuple[str, Any]
+
+
+def _chaves(consulta: Registro) -> Tuple[Optional[date], List[Chave]]:
+    data = interpretar_data(consulta.get('data'))
+    chaves = [(dimensao, consulta.get(dimensao)) for dimensao in DIMENSOES if consulta.get(dimensao) is not None]
+    chaves.append(TOTAL)
+    return (data.date() if data is not None else None), chaves
+
+
+class EstatisticasConsultas(Derivado):
+    """Contagem de consultas por dimensão, geral e por dia (ver docstring do módulo)"""
+
+    colecao = 'consultas'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._geral: Counter = Counter()
+        self._dias: Dict[date, Counter] = {}
+
+    # Manutenção (chamada pelo repositório)
+    def reconstruir(self, registros: Iterable[Registro]) -> None:
+        with self._lock:
+            self._geral = Counter()
+            self._dias = {}
+            for registro in registros:
+                self._somar(registro, 1)
+
+    def aplicar(self, anterior: Optional[Registro], novo: Optional[Registro]) -> None:
+        with self._lock:
+            if anterior is not None:
+                self._somar(anterior, -1)
+            if novo is not None:
+                self._somar(novo, 1)
+
+    def _somar(self, consulta: Registro, sinal: int) -> None:
+        dia, chaves = _chaves(consulta)
+        contadores = [self._geral]
+        if dia is not None:
+            contadores.append(self._dias.setdefault(dia, Counter()))
+        for contador in contadores:
+            for chave in chaves:
+                contador[chave] += sinal
+                if not contador[chave]:
+                    del contador[chave]
+        if dia is not None and not self._dias[dia]:
+            del self._dias[dia]
+
+    # Consultas
+    def resumo(self, inicio: Optional[datetime] = None, fim: Optional[datetime] = None) -> Dict[str, Any]:
+        """Totais por dimensão e por dia; com ``inicio``/``fim`` só os dias que cruzam [inicio, fim)"""
+        with self._lock:
+            if inicio is None and fim is None:
+                contador = Counter(self._geral)
+                dias = {dia: c[TOTAL] for dia, c in self._dias.items()}
+            else:
+                contador = Counter()
+                dias = {}
+                for dia, c in self._dias.items():
+                    if inicio is not None and dia < inicio.date():
+                        continue
+                    if fim is not None and datetime.combine(dia, time.min) >= fim:
+                        continue
+                    contador.update(c)
+                    dias[dia] = c[TOTAL]
+
+        resultado: Dict[str, Any] = {'total': contador[TOTAL]}
+        for dimensao in DIMENSOES:
+            resultado[f'por_{dimensao}'] = {}
+        for (dimensao, valor), quantidade in contador.items():
+            if dimensao in DIMENSOES:
+                # Chaves de objeto JSON são texto (ids de profissional inclusive)
+                resultado[f'por_{dimensao}'][str(valor)] = quantidade
+        resultado['por_dia'] = {dia.isoformat(): dias[dia] for dia in sorted(dias)}
+        return resultado
+
+
+def estatisticas() -> EstatisticasConsultas:
+    """Contadores do processo, já sincronizados com as escritas de outros processos"""
+    return repositorio.derivado(EstatisticasConsultas)
@@ -0,0 +1,220 @@
+from flask import Blueprint, request, jsonify
+from datetime import datetime
+from auth.utils import token_required, profissional_required
+from config import Config
+from storage import repositorio
+from api import cache, leitos, paginacao
+from api.enriquecimento import PACIENTE_NOME, juntar
+from api.esquemas import AltaEntrada, InternacaoEntrada, TransferenciaEntrada, validar
+from api.notificacoes import notificar
+
+internacoes_bp = Blueprint('internacoes', __name__, url_prefix='/internacoes')
+
+def leito_invalido(ala, leito):
+    """Mensagem de erro se o leito não existe em Config.INTERNACAO_ALAS, senão None"""
+    capacidade = Config.INTERNACAO_ALAS.get(ala)
+    if capacidade is None:
+        return f'Ala não encontrada: {ala}'
+    if leito > capacidade:
+        return f'A ala {ala} tem {capacidade} leitos'
+    return None
+
+# Endpoints
+@internacoes_bp.route('', methods=['GET'])
+@token_required
+@cache.respostas('internacoes', 'usuarios')
+def get_internacoes():
+    """Lista internações (filtros status, ala, paciente; paginação e fields: ver api/paginacao.py)"""
+    try:
+        pagina = paginacao.Pagina()
+        paciente = paginacao.inteiro('paciente')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    status = request.args.get('status')
+    ala = request.args.get('ala')
+
+    # Paciente vê só as próprias internações
+    if request.user_perfil == 'PACIENTE':
+        paciente = request.user_id
+
+    if paciente is not None:
+        internacoes = repositorio.iterar('internacoes', 'paciente', paciente, pagina.cursor)
+    else:
+        internacoes = repositorio.iterar('internacoes', apos=pagina.cursor)
+
+    def aceita(internacao):
+        return ((status is None or internacao.get('status') == status)
+                and (ala is None or internacao.get('ala') == ala))
+
+    return pagina.responder((i for i in internacoes if aceita(i)), juntar([PACIENTE_NOME], pagina.campos))
+
+@internacoes_bp.route('', methods=['POST'])
+@token_required
+@profissional_required
+@validar(InternacaoEntrada)
+def create_internacao():
+    """Admite um paciente num leito livre"""
+    dados = request.dados
+
+    erro = leito_invalido(dados.ala, dados.leito)
+    if erro:
+        return jsonify({'error': erro}), 400
+
+    if repositorio.obter('pacientes', dados.paciente_id) is None:
+        return jsonify({'error': 'Paciente não encontrado'}), 404
+
+    # Verificação e admissão na mesma transação: duas admissões simultâneas
+    # não podem ocupar o mesmo leito
+    with repositorio.transacao('internacoes') as tx:
+        ocupacao = leitos.ocupacao()
+        if ocupacao.internacao_do_paciente(dados.paciente_id) is not None:
+            return jsonify({'error': 'Paciente já está internado'}), 409
+        if ocupacao.ocupante(dados.ala, dados.leito) is not None:
+            return jsonify({'error': 'Leito ocupado'}), 409
+
+        nova_internacao = tx.inserir('internacoes', {
+            'paciente': dados.paciente_id,
+            'ala': dados.ala,
+            'leito': dados.leito,
+            'motivo': dados.motivo,
+            'status': 'ATIVA',
+            'data_admissao': datetime.now().isoformat(),
+            'transferencias': [],
+            'criado_por': request.user_id
+        })
+
+        notificar(dados.paciente_id, f"Internação registrada: {dados.ala}, leito {dados.leito}", tx)
+
+    return jsonify({
+        'message': 'Internação registrada',
+        'internacao': nova_internacao
+    }), 201
+
+@internacoes_bp.route('/censo', methods=['GET'])
+@token_required
+@profissional_required
+def get_censo():
+    """Ocupação atual de todas as alas, lida dos contadores em memória (O(alas))"""
+    alas = leitos.ocupacao().censo()
+    total_leitos = sum(ala['leitos'] or 0 for ala in alas)
+    total_ocupados = sum(ala['ocupados'] for ala in alas)
+
+    resposta = jsonify({
+        'alas': alas,
+        'total': {
+            'leitos': total_leitos,
+            'ocupados': total_ocupados,
+            'livres': sum(ala['livres'] or 0 for ala in alas),
+            'taxa_ocupacao': round(total_ocupados / total_leitos, 4) if total_leitos else None
+        },
+        'timestamp': datetime.now().isoformat()
+    })
+    resposta.headers['Cache-Control'] = 'no-store'
+    return resposta, 200
+
+@internacoes_bp.route('/censo/<ala>', methods=['GET'])
+@token_required
+@profissional_required
+def get_censo_ala(ala):
+    """Ocupação de uma ala, com os leitos ocupados"""
+    ocupacao = leitos.ocupacao()
+    censo = next((item for item in ocupacao.censo() if item['ala'] == ala), None)
+
+    if censo is None:
+        return jsonify({'error': 'Ala não encontrada'}), 404
+
+    resposta = jsonify({**censo, 'ocupacao': ocupacao.leitos(ala)})
+    resposta.headers['Cache-Control'] = 'no-store'
+    return resposta, 200
+
+@internacoes_bp.route('/<int:internacao_id>', methods=['GET'])
+@token_required
+def get_internacao(internacao_id):
+    """Obtém uma internação (ADMIN, profissionais ou o próprio paciente)"""
+    internacao = repositorio.obter('internacoes', internacao_id)
+
+    if internacao is None:
+        return jsonify({'error': 'Internação não encontrada'}), 404
+
+    if request.user_perfil == 'PACIENTE' and internacao['paciente'] != request.user_id:
+        return jsonify({'error': 'Acesso não autorizado'}), 403
+
+    return jsonify(juntar([PACIENTE_NOME])([internacao])[0]), 200
+
+@internacoes_bp.route('/<int:internacao_id>/transferir', methods=['POST'])
+@token_required
+@profissional_required
+@validar(TransferenciaEntrada)
+def transferir_internacao(internacao_id):
+    """Transfere o paciente internado para outro leito livre"""
+    dados = request.dados
+
+    erro = leito_invalido(dados.ala, dados.leito)
+    if erro:
+        return jsonify({'error': erro}), 400
+
+    with repositorio.transacao('internacoes') as tx:
+        internacao = tx.obter('internacoes', internacao_id)
+
+        if internacao is None:
+            return jsonify({'error': 'Internação não encontrada'}), 404
+
+        if internacao['status'] != 'ATIVA':
+            return jsonify({'error': 'Internação já encerrada'}), 400
+
+        if (internacao['ala'], internacao['leito']) == (dados.ala, dados.leito):
+            return jsonify({'error': 'O paciente já está neste leito'}), 400
+
+        if leitos.ocupacao().ocupante(dados.ala, dados.leito) is not None:
+            return jsonify({'error': 'Leito ocupado'}), 409
+
+        agora = datetime.now().isoformat()
+        transferencia = {
+            'de': {'ala': internacao['ala'], 'leito': internacao['leito']},
+            'para': {'ala': dados.ala, 'leito': dados.leito},
+            'data': agora,
+            'por': request.user_id
+        }
+        internacao_atualizada = tx.atualizar('internacoes', internacao_id, {
+            'ala': dados.ala,
+            'leito': dados.leito,
+            'transferencias': internacao.get('transferencias', []) + [transferencia],
+            'data_atualizacao': agora
+        })
+
+    return jsonify({
+        'message': 'Paciente transferido',
+        'internacao': internacao_atualizada
+    }), 200
+
+@internacoes_bp.route('/<int:internacao_id>/alta', methods=['POST'])
+@token_required
+@profissional_required
+@validar(AltaEntrada, opcional=True)
+def alta_internacao(internacao_id):
+    """Registra a alta e libera o leito"""
+    with repositorio.transacao('internacoes') as tx:
+        internacao = tx.obter('internacoes', internacao_id)
+
+        if internacao is None:
+            return jsonify({'error': 'Internação não encontrada'}), 404
+
+        if internacao['status'] != 'ATIVA':
+            return jsonify({'error': 'Internação já encerrada'}), 400
+
+        agora = datetime.now().isoformat()
+        internacao_atualizada = tx.atualizar('internacoes', internacao_id, {
+            'status': 'ALTA',
+            'data_alta': agora,
+            'observacoes_alta': request.dados.observacoes,
+            'alta_por': request.user_id,
+            'data_atualizacao': agora
+        })
+
+        notificar(internacao['paciente'], 'Alta registrada', tx)
+
+    return jsonify({
+        'message': 'Alta registrada',
+        'internacao': internacao_atualizada
+    }), 200
@@ -0,0 +1,111 @@
+"""Ocupação dos leitos (internações ATIVA) por ala e leito.
+
+Mantida pelo repositório a cada mudança em 'internacoes' (admissão,
+transferência e alta), sem varrer a coleção:
+
+- ``ala -> {leito: internação}``: o número de leitos ocupados de uma ala é o
+  tamanho do dicionário, então o censo de todas as alas é O(alas);
+- ``paciente -> internação``: um paciente não pode ter duas internações
+  ativas.
+
+As alas e o número de leitos de cada uma vêm de Config.INTERNACAO_ALAS; os
+leitos são numerados de 1 ao número de leitos da ala.
+"""
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import Config
+from storage import repositorio
+from storage.base import Derivado, Registro
+
+
+class OcupacaoLeitos(Derivado):
+    """Leitos ocupados por internações ATIVA (ver docstring do módulo)"""
+
+    colecao = 'internacoes'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._alas: Dict[str, Dict[int, Tuple[int, Any]]] = {}
+        self._pacientes: Dict[Any, int] = {}
+        self._ativas: Dict[int, Tuple[str, int, Any]] = {}
+
+    # Manutenção (chamada pelo repositório)
+    def reconstruir(self, registros: Iterable[Registro]) -> None:
+        with self._lock:
+            self._alas = {}
+            self._pacientes = {}
+            self._ativas = {}
+            for registro in registros:
+                self._incluir(registro)
+
+    def aplicar(self, anterior: Optional[Registro], novo: Optional[Registro]) -> None:
+        with self._lock:
+            if anterior is not None:
+                self._excluir(anterior['id'])
+            if novo is not None:
+                self._incluir(novo)
+
+    def _incluir(self, internacao: Registro) -> None:
+        if internacao.get('status') != 'ATIVA':
+            return
+        ala, leito, paciente = internacao.get('ala'), internacao.get('leito'), internacao.get('paciente')
+        self._alas.setdefault(ala, {})[leito] = (internacao['id'], paciente)
+        self._pacientes[paciente] = internacao['id']
+        self._ativas[internacao['id']] = (ala, leito, paciente)
+
+    def _excluir(self, internacao_id: int) -> None:
+        ativa = self._ativas.pop(internacao_id, None)
+        if ativa is None:
+            return
+        ala, leito, paciente = ativa
+        leitos = self._alas[ala]
+        if leitos.get(leito, (None,))[0] == internacao_id:
+            del leitos[leito]
+            if not leitos:
+                del self._alas[ala]
+        if self._pacientes.get(paciente) == internacao_id:
+            del self._pacientes[paciente]
+
+    # Consultas
+    def ocupante(self, ala: str, leito: int) -> Optional[int]:
+        """Id da internação ATIVA no leito, ou None"""
+        with self._lock:
+            ocupado = self._alas.get(ala, {}).get(leito)
+            return ocupado[0] if ocupado else None
+
+    def internacao_do_paciente(self, paciente: Any) -> Optional[int]:
+        """Id da internação ATIVA do paciente, ou None"""
+        with self._lock:
+            return self._pacientes.get(paciente)
+
+    def censo(self) -> List[Dict[str, Any]]:
+        """Ocupação de cada ala de Config.INTERNACAO_ALAS (e de alas removidas que ainda têm internados)"""
+        with self._lock:
+            ocupados = {ala: len(leitos) for ala, leitos in self._alas.items()}
+        alas = dict(Config.INTERNACAO_ALAS)
+        alas.update((ala, None) for ala in ocupados if ala not in alas)
+
+        resultado = []
+        for ala, capacidade in alas.items():
+            quantidade = ocupados.get(ala, 0)
+            resultado.append({
+                'ala': ala,
+                'leitos': capacidade,
+                'ocupados': quantidade,
+                'livres': max(capacidade - quantidade, 0) if capacidade is not None else None,
+                'taxa_ocupacao': round(quantidade / capacidade, 4) if capacidade else None
+            })
+        return resultado
+
+    def leitos(self, ala: str) -> List[Dict[str, Any]]:
+        """Leitos ocupados da ala, em ordem: ``{leito, internacao, paciente}``"""
+        with self._lock:
+            ocupados = sorted(self._alas.get(ala, {}).items())
+        return [{'leito': leito, 'internacao': internacao_id, 'paciente': paciente}
+                for leito, (internacao_id, paciente) in ocupados]
+
+
+def ocupacao() -> OcupacaoLeitos:
+    """Ocupação do processo, já sincronizada com as escritas de outros processos"""
+    return repositorio.derivado(OcupacaoLeitos)
@@ -0,0 +1,82 @@
+"""Leitura do corpo das importações em lote (POST /pacientes/bulk e /consultas/bulk).
+
+O corpo pode ser um array JSON ou NDJSON (um objeto por linha, com
+``Content-Type: application/x-ndjson``). O NDJSON é lido linha a linha do
+stream da requisição. Cada item vem numerado a partir de 1 (posição no array
+ou linha do NDJSON), e os erros são informados por essa ``linha``.
+
+Os endpoints validam tudo, gravam as linhas válidas numa única transação e
+respondem com os ids criados e a lista de erros. Com ``tudo_ou_nada=1``
+qualquer erro cancela o lote inteiro.
+"""
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from flask import request
+
+from config import Config
+from storage import codec
+
+Item = Tuple[int, Any]  # (linha, objeto)
+
+
+class LoteInvalido(ValueError):
+    """Corpo que não é um lote (status HTTP em ``status``)"""
+
+    def __init__(self, mensagem: str, status: int = 400):
+        super().__init__(mensagem)
+        self.status = status
+
+
+def _ndjson() -> bool:
+    return request.mimetype in ('application/x-ndjson', 'application/jsonlines', 'application/jsonl')
+
+
+def _linhas_ndjson() -> Iterator[Tuple[int, Any, Optional[str]]]:
+    for numero, linha in enumerate(request.stream, 1):
+        linha = linha.strip()
+        if not linha:
+            continue
+        try:
+            yield numero, codec.decodificar(linha), None
+        except ValueError:
+            yield numero, None, 'JSON inválido'
+
+
+def ler_itens() -> Tuple[List[Item], List[Dict[str, Any]]]:
+    """Itens do corpo e erros de leitura por linha; LoteInvalido se o corpo não for um lote"""
+    itens: List[Item] = []
+    erros: List[Dict[str, Any]] = []
+    if _ndjson():
+        linhas = _linhas_ndjson()
+    else:
+        corpo = request.get_json(silent=True)
+        if not isinstance(corpo, list):
+            raise LoteInvalido('Envie um array JSON ou NDJSON (Content-Type: application/x-ndjson)')
+        linhas = ((numero, item, None) for numero, item in enumerate(corpo, 1))
+
+    for numero, item, erro in linhas:
+        if len(itens) + len(erros) >= Config.LOTE_MAX_ITENS:
+            raise LoteInvalido(f'Lote maior que o limite de {Config.LOTE_MAX_ITENS} itens', 413)
+        if erro is None and not isinstance(item, dict):
+            erro = 'Cada item deve ser um objeto JSON'
+        if erro is not None:
+            erros.append({'linha': numero, 'error': erro})
+        else:
+            itens.append((numero, item))
+    if not itens and not erros:
+        raise LoteInvalido('Lote vazio')
+    return itens, erros
+
+
+def tudo_ou_nada() -> bool:
+    return request.args.get('tudo_ou_nada') in ('1', 'true')
+
+
+def resposta(ids: List[int], erros: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], int]:
+    """Corpo e status da resposta: 201 se algo foi criado, senão 422"""
+    corpo = {
+        'criados': len(ids),
+        'ids': ids,
+        'erros': sorted(erros, key=lambda e: e['linha'])
+    }
+    return corpo, 201 if ids else 422
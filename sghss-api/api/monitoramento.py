@@ -0,0 +1,80 @@
+"""Métricas por requisição e GET /metrics, no formato texto do Prometheus (ver metricas.py).
+
+``instalar(app)`` registra os hooks de cada requisição: contagem por
+método, endpoint e status, histograma de latência e requisições em
+andamento. O endpoint é a regra da rota (``/pacientes/<int:paciente_id>``),
+não a URL, para o número de séries não crescer com os ids; rotas
+inexistentes entram como ``desconhecido``. A latência vai até a resposta
+ficar pronta: em respostas em streaming (NDJSON, SSE, exportação) não inclui
+o envio do corpo.
+
+Com Config.METRICAS_TOKEN definido, /metrics exige
+``Authorization: Bearer <token>``.
+"""
+import hmac
+import time
+from typing import Dict, Iterator, Tuple
+
+from flask import Blueprint, Flask, Response, g, jsonify, request
+
+import metricas
+from api.cache import cache
+from api.notificacoes import fila
+from auth import senhas, tokens
+from config import Config
+
+monitoramento_bp = Blueprint('monitoramento', __name__)
+
+
+def _antes():
+    g.metricas_inicio = time.perf_counter()
+    g.metricas_em_andamento = True
+    metricas.HTTP_EM_ANDAMENTO.inc()
+
+
+def _depois(resposta):
+    inicio = g.pop('metricas_inicio', None)
+    if inicio is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'desconhecido'
+        metricas.HTTP_DURACAO.observar(time.perf_counter() - inicio, metodo=request.method, endpoint=endpoint)
+        metricas.HTTP_REQUISICOES.inc(metodo=request.method, endpoint=endpoint, status=resposta.status_code)
+    return resposta
+
+
+def _encerrar(erro):
+    # Roda sempre, mesmo quando a view levantou exceção
+    if g.pop('metricas_em_andamento', False):
+        metricas.HTTP_EM_ANDAMENTO.dec()
+
+
+def _estatisticas() -> Iterator[Tuple[str, str, Dict[str, str], float]]:
+    """Estatísticas dos caches, da fila de notificações e do executor do bcrypt"""
+    grupos = (
+        ('cache_respostas', 'Cache de respostas GET', cache.estatisticas()),
+        ('notificacoes_fila', 'Fila de notificações', fila.estatisticas()),
+        ('senhas_executor', 'Executor do bcrypt', senhas.executor.estatisticas()),
+        ('tokens_cache', 'Cache de tokens verificados', tokens.cache.estatisticas()),
+    )
+    for grupo, descricao, valores in grupos:
+        for chave, valor in valores.items():
+            if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                yield f'sghss_{grupo}_{chave}', f'{descricao}: {chave}', {}, valor
+
+
+def instalar(app: Flask) -> None:
+    app.before_request(_antes)
+    app.after_request(_depois)
+    app.teardown_request(_encerrar)
+    metricas.registro.coletor(_estatisticas)
+    app.register_blueprint(monitoramento_bp)
+
+
+# Endpoints
+@monitoramento_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Métricas do processo no formato texto do Prometheus"""
+    if Config.METRICAS_TOKEN:
+        esperado = f'Bearer {Config.METRICAS_TOKEN}'
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), esperado):
+            return jsonify({'error': 'Token de métricas inválido'}), 401
+    return Response(metricas.registro.exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,369 @@
+"""Notificações: fila em memória gravada em lotes por uma thread de fundo.
+
+``notificar`` monta o registro e o coloca numa fila limitada
+(Config.NOTIFICACOES_FILA_MAX); a thread ``notificacoes`` retira tudo o que
+estiver pendente (até Config.NOTIFICACOES_LOTE) e grava o lote numa única
+transação -- uma só gravação/anexação em 'notificacoes' para muitas
+notificações. Os endpoints de agendamento não esperam por essa escrita.
+
+Dentro de uma transação (``tx``) a notificação só entra na fila depois do
+commit, então uma operação desfeita não notifica ninguém; por isso as
+transações dos endpoints não incluem (nem travam) 'notificacoes'. Com a
+fila cheia o chamador espera até Config.NOTIFICACOES_ESPERA segundos (contrapressão) e,
+se ainda assim não houver espaço, grava a notificação ele mesmo. Na saída
+do processo a fila é esvaziada antes de encerrar. Com
+Config.NOTIFICACOES_ASSINCRONAS desligado a gravação é feita na hora.
+
+Leitura (``notificacoes_bp``): cada usuário vê só as suas, pelo índice
+``IndiceNotificacoes`` (ids por destinatário, em ordem, e contagem de não
+lidas). O cursor é o id da última notificação recebida; com ``espera`` a
+requisição fica aberta até chegar uma nova (long-poll) e /notificacoes/stream
+entrega as novas como Server-Sent Events. Quem espera é acordado assim que o
+lote é gravado neste processo; escritas de outros processos são vistas em até
+um segundo.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from bisect import bisect_right, insort
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from flask import Blueprint, Response, jsonify, make_response, request
+
+from api import paginacao
+from api.esquemas import MarcarLidasEntrada, validar
+from auth.utils import token_required
+from config import Config
+from storage import codec, repositorio
+from storage.base import Derivado, Registro
+
+logger = logging.getLogger(__name__)
+
+
+class FilaNotificacoes:
+    """Fila limitada + thread que grava as notificações em lotes"""
+
+    def __init__(self, tamanho: int, lote: int):
+        self.tamanho = tamanho
+        self.lote = lote
+        self._lock = threading.Lock()
+        self._fila: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+        self.gravadas = 0
+        self.lotes = 0
+        self.sincronas = 0  # gravadas pelo próprio chamador (fila cheia)
+
+    def _iniciar(self) -> queue.Queue:
+        # Após um fork (workers do gunicorn) a thread do pai não existe no filho
+        with self._lock:
+            if self._fila is None or self._pid != os.getpid():
+                self._fila = queue.Queue(self.tamanho)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._executar, args=(self._fila,),
+                                                name='notificacoes', daemon=True)
+                self._thread.start()
+            return self._fila
+
+    def enfileirar(self, registro: Registro) -> None:
+        fila = self._iniciar()
+        try:
+            fila.put(registro, timeout=Config.NOTIFICACOES_ESPERA)
+        except queue.Full:
+            repositorio.inserir('notificacoes', registro)
+            with self._lock:
+                self.sincronas += 1
+
+    def _executar(self, fila: queue.Queue) -> None:
+        while True:
+            lote = [fila.get()]
+            while len(lote) < self.lote:
+                try:
+                    lote.append(fila.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._gravar(lote)
+            finally:
+                for _ in lote:
+                    fila.task_done()
+
+    def _gravar(self, lote: List[Registro]) -> None:
+        for tentativa in range(3):
+            try:
+                with repositorio.transacao('notificacoes') as tx:
+                    for registro in lote:
+                        tx.inserir('notificacoes', registro)
+                break
+            except Exception:
+                logger.exception('Falha ao gravar %d notificações (tentativa %d)', len(lote), tentativa + 1)
+        else:
+            return
+        with self._lock:
+            self.gravadas += len(lote)
+            self.lotes += 1
+
+    def estatisticas(self):
+        with self._lock:
+            pendentes = self._fila.qsize() if self._fila is not None and self._pid == os.getpid() else 0
+            return {
+                'pendentes': pendentes,
+                'gravadas': self.gravadas,
+                'lotes': self.lotes,
+                'sincronas': self.sincronas,
+            }
+
+    def esvaziar(self) -> None:
+        """Espera até todas as notificações enfileiradas estarem gravadas"""
+        with self._lock:
+            fila = self._fila if self._pid == os.getpid() else None
+        if fila is not None:
+            fila.join()
+
+
+fila = FilaNotificacoes(Config.NOTIFICACOES_FILA_MAX, Config.NOTIFICACOES_LOTE)
+atexit.register(fila.esvaziar)
+
+
+def notificar(destinatario_id, mensagem, tx=None):
+    """Registra notificação para o usuário ``destinatario_id`` (gravada em segundo plano; com ``tx``, após o commit)"""
+    registro = {
+        'destinatario': destinatario_id,
+        'mensagem': mensagem,
+        'data': datetime.now().isoformat(),
+        'lida': False
+    }
+    if Config.NOTIFICACOES_ASSINCRONAS:
+        gravar = lambda: fila.enfileirar(registro)  # noqa: E731
+    else:
+        gravar = lambda: repositorio.inserir('notificacoes', registro)  # noqa: E731
+    if tx is not None:
+        tx.ao_confirmar(gravar)
+    else:
+        gravar()
+
+
+def destinatario_de(notificacao: Registro) -> Any:
+    # Registros antigos guardavam o destinatário em 'paciente' ou 'profissional'
+    destinatario = notificacao.get('destinatario')
+    if destinatario is None:
+        destinatario = notificacao.get('paciente', notificacao.get('profissional'))
+    return destinatario
+
+
+class IndiceNotificacoes(Derivado):
+    """Ids (ordenados) e não lidas das notificações de cada destinatário"""
+
+    colecao = 'notificacoes'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._novas = threading.Condition(self._lock)
+        self._ids: Dict[Any, List[int]] = {}
+        self._nao_lidas: Dict[Any, Set[int]] = {}
+        self._destinatarios: Dict[int, Any] = {}
+
+    # Manutenção (chamada pelo repositório)
+    def reconstruir(self, registros: Iterable[Registro]) -> None:
+        with self._lock:
+            self._ids = {}
+            self._nao_lidas = {}
+            self._destinatarios = {}
+            for registro in registros:
+                self._incluir(registro)
+            self._novas.notify_all()
+
+    def aplicar(self, anterior: Optional[Registro], novo: Optional[Registro]) -> None:
+        with self._lock:
+            if anterior is not None:
+                self._excluir(anterior['id'])
+            if novo is not None:
+                self._incluir(novo)
+                if anterior is None:
+                    self._novas.notify_all()
+
+    def _incluir(self, notificacao: Registro) -> None:
+        destinatario = destinatario_de(notificacao)
+        if destinatario is None:
+            return
+        ids = self._ids.setdefault(destinatario, [])
+        if ids and ids[-1] > notificacao['id']:
+            insort(ids, notificacao['id'])
+        else:
+            ids.append(notificacao['id'])
+        self._destinatarios[notificacao['id']] = destinatario
+        if not notificacao.get('lida'):
+            self._nao_lidas.setdefault(destinatario, set()).add(notificacao['id'])
+
+    def _excluir(self, notificacao_id: int) -> None:
+        destinatario = self._destinatarios.pop(notificacao_id, None)
+        if destinatario is None:
+            return
+        ids = self._ids[destinatario]
+        pos = bisect_right(ids, notificacao_id) - 1
+        if pos >= 0 and ids[pos] == notificacao_id:
+            del ids[pos]
+        if not ids:
+            del self._ids[destinatario]
+        nao_lidas = self._nao_lidas.get(destinatario)
+        if nao_lidas is not None:
+            nao_lidas.discard(notificacao_id)
+            if not nao_lidas:
+                del self._nao_lidas[destinatario]
+
+    # Consultas
+    def apos(self, destinatario: Any, cursor: Optional[int] = None, nao_lidas: bool = False) -> List[int]:
+        """Ids das notificações de ``destinatario`` depois de ``cursor``, em ordem"""
+        with self._lock:
+            ids = self._ids.get(destinatario, [])
+            ids = ids[bisect_right(ids, cursor):] if cursor is not None else list(ids)
+            if nao_lidas:
+                pendentes = self._nao_lidas.get(destinatario, ())
+                ids = [i for i in ids if i in pendentes]
+            return ids
+
+    def contar_nao_lidas(self, destinatario: Any) -> int:
+        with self._lock:
+            return len(self._nao_lidas.get(destinatario, ()))
+
+    def pertencem(self, destinatario: Any, ids: Iterable[int]) -> List[int]:
+        """Dos ``ids``, os que são notificações não lidas de ``destinatario``"""
+        with self._lock:
+            pendentes = self._nao_lidas.get(destinatario, ())
+            return [i for i in ids if i in pendentes]
+
+    def _tem_novas(self, destinatario: Any, cursor: Optional[int]) -> bool:
+        ids = self._ids.get(destinatario)
+        return bool(ids) and (cursor is None or ids[-1] > cursor)
+
+    def esperar(self, destinatario: Any, cursor: Optional[int], segundos: float) -> bool:
+        """Espera até ``segundos`` por notificação depois de ``cursor``; True se houver"""
+        with self._novas:
+            if not self._tem_novas(destinatario, cursor):
+                self._novas.wait(segundos)
+            return self._tem_novas(destinatario, cursor)
+
+
+def indice() -> IndiceNotificacoes:
+    """Índice do processo, já sincronizado com as escritas de outros processos"""
+    return repositorio.derivado(IndiceNotificacoes)
+
+
+def aguardar(destinatario: Any, cursor: Optional[int], segundos: float) -> bool:
+    """Long-poll: True assim que houver notificação nova, False se o tempo acabar"""
+    limite = time.monotonic() + segundos
+    while True:
+        # Reler o índice a cada segundo traz as escritas de outros processos
+        restante = limite - time.monotonic()
+        if indice().esperar(destinatario, cursor, max(0.0, min(restante, 1.0))):
+            return True
+        if restante <= 1.0:
+            return False
+
+
+def carregar(ids: List[int]) -> Iterator[Registro]:
+    """Notificações dos ``ids``, na mesma ordem, lidas em blocos"""
+    for inicio in range(0, len(ids), paginacao.LOTE):
+        bloco = ids[inicio:inicio + paginacao.LOTE]
+        registros = repositorio.obter_varios('notificacoes', bloco)
+        for notificacao_id in bloco:
+            registro = registros.get(notificacao_id)
+            if registro is not None:
+                yield registro
+
+
+def _formatar(notificacao: Registro) -> Dict[str, Any]:
+    return {
+        'id': notificacao['id'],
+        'mensagem': notificacao.get('mensagem'),
+        'data': notificacao.get('data'),
+        'lida': bool(notificacao.get('lida'))
+    }
+
+
+notificacoes_bp = Blueprint('notificacoes', __name__, url_prefix='/notificacoes')
+
+@notificacoes_bp.route('', methods=['GET'])
+@token_required
+def get_notificacoes():
+    """Notificações do usuário logado depois de ``cursor`` (``espera`` segundos de long-poll)"""
+    try:
+        pagina = paginacao.Pagina()
+        espera = paginacao.inteiro('espera', minimo=0)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    nao_lidas = request.args.get('nao_lidas') in ('1', 'true')
+
+    ids = indice().apos(request.user_id, pagina.cursor, nao_lidas)
+    if not ids and espera:
+        if aguardar(request.user_id, pagina.cursor, min(espera, Config.NOTIFICACOES_ESPERA_MAX)):
+            ids = indice().apos(request.user_id, pagina.cursor, nao_lidas)
+
+    resposta = make_response(pagina.responder(carregar(ids), lambda bloco: [_formatar(n) for n in bloco]))
+    resposta.headers['X-Nao-Lidas'] = str(indice().contar_nao_lidas(request.user_id))
+    resposta.headers['Cache-Control'] = 'no-store'
+    return resposta
+
+
+@notificacoes_bp.route('/lidas', methods=['POST'])
+@token_required
+@validar(MarcarLidasEntrada)
+def marcar_lidas():
+    """Marca como lidas as notificações ``ids`` (ou todas até o id ``ate``)"""
+    ids, ate = request.dados.ids, request.dados.ate
+
+    agora = datetime.now().isoformat()
+    with repositorio.transacao('notificacoes') as tx:
+        atual = indice()
+        if ids is None:
+            ids = [i for i in atual.apos(request.user_id, nao_lidas=True) if i <= ate]
+        marcar = atual.pertencem(request.user_id, ids)
+        for notificacao_id in marcar:
+            tx.atualizar('notificacoes', notificacao_id, {'lida': True, 'lida_em': agora})
+
+    return jsonify({
+        'message': 'Notificações marcadas como lidas',
+        'marcadas': len(marcar),
+        'nao_lidas': indice().contar_nao_lidas(request.user_id)
+    }), 200
+
+
+@notificacoes_bp.route('/stream', methods=['GET'])
+@token_required
+def stream_notificacoes():
+    """Server-Sent Events com as notificações novas do usuário logado"""
+    try:
+        cursor = paginacao.inteiro('cursor')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    ultimo_evento = request.headers.get('Last-Event-ID', '')
+    if cursor is None and ultimo_evento.isdigit():
+        cursor = int(ultimo_evento)
+    if cursor is None:
+        # Sem cursor, só o que chegar daqui em diante
+        existentes = indice().apos(request.user_id)
+        cursor = existentes[-1] if existentes else 0
+    destinatario = request.user_id
+
+    def eventos():
+        ultimo = cursor
+        fim = time.monotonic() + Config.NOTIFICACOES_SSE_DURACAO
+        yield 'retry: 3000\n\n'
+        while time.monotonic() < fim:
+            ids = indice().apos(destinatario, ultimo)
+            for notificacao in carregar(ids):
+                dados = codec.texto(_formatar(notificacao))
+                yield f"id: {notificacao['id']}\nevent: notificacao\ndata: {dados}\n\n"
+            if ids:
+                ultimo = ids[-1]
+            elif not aguardar(destinatario, ultimo, min(15.0, max(0.0, fim - time.monotonic()))):
+                yield ': ping\n\n'  # mantém a conexão viva atrás de proxies
+
+    resposta = Response(eventos(), mimetype='text/event-stream')
+    resposta.headers['Cache-Control'] = 'no-store'
+    resposta.headers['X-Accel-Buffering'] = 'no'
+    return resposta
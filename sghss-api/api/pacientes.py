@@ -1,36 +1,35 @@
 from flask import Blueprint, request, jsonify
+from pydantic import ValidationError
 from datetime import datetime
-import json
-from auth.utils import token_required, admin_required
-from config import Config
+from auth.utils import token_required, admin_required, usuario_atual
+from auth import senhas
+from storage import repositorio
+from api import cache, lotes, paginacao
+from api.enriquecimento import PROFISSIONAL_NOME, juntar
+from api.esquemas import PacienteAtualizacao, PacienteEntrada, mensagem, validar
 
 pacientes_bp = Blueprint('pacientes', __name__, url_prefix='/pacientes')
 
-# Funções auxiliares
-def carregar_dados(nome):
-    try:
-        with open(Config.FILES[nome], 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
-
-def salvar_dados(nome, dados):
-    with open(Config.FILES[nome], 'w', encoding='utf-8') as f:
-        json.dump(dados, f, indent=4, ensure_ascii=False)
-
 # Endpoints
 @pacientes_bp.route('', methods=['GET'])
 @token_required
 @admin_required
+@cache.respostas('pacientes', 'usuarios')
 def get_pacientes():
-    """Lista todos os pacientes (apenas ADMIN)"""
-    pacientes = carregar_dados('pacientes')
-    usuarios = carregar_dados('usuarios')
+    """Lista todos os pacientes (apenas ADMIN; paginação e fields: ver api/paginacao.py)"""
+    try:
+        pagina = paginacao.Pagina()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    # Combinar dados
+    return pagina.responder(repositorio.iterar('pacientes', apos=pagina.cursor), combinar_pacientes)
+
+def combinar_pacientes(pacientes):
+    """Dados do paciente combinados com nome e email do usuário"""
+    usuarios = repositorio.obter_varios('usuarios', [p['id'] for p in pacientes])
     pacientes_completos = []
     for paciente in pacientes:
-        usuario = next((u for u in usuarios if u['id'] == paciente['id']), None)
+        usuario = usuarios.get(paciente['id'])
         if usuario:
             paciente_completo = {
                 'id': paciente['id'],
@@ -43,53 +42,45 @@ def get_pacientes():
             }
             pacientes_completos.append(paciente_completo)
     
-    return jsonify(pacientes_completos), 200
+    return pacientes_completos
 
 @pacientes_bp.route('', methods=['POST'])
 @token_required
 @admin_required
+@validar(PacienteEntrada)
 def create_paciente():
     """Cria um novo paciente (apenas ADMIN)"""
-    data = request.get_json()
-    
-    required_fields = ['nome', 'email', 'senha', 'telefone']
-    for field in required_fields:
-        if field not in data:
-            return jsonify({'error': f'Campo obrigatório faltando: {field}'}), 400
+    data = request.dados.model_dump()
     
     # Verificar se email já existe
-    usuarios = carregar_dados('usuarios')
-    if any(u['email'] == data['email'] for u in usuarios):
+    if repositorio.buscar_um('usuarios', 'email', data['email']):
         return jsonify({'error': 'Email já cadastrado'}), 409
     
     from auth.utils import hash_password
+    senha_hash = hash_password(data['senha'])
     
-    # Criar usuário
-    novo_id = max([u['id'] for u in usuarios], default=0) + 1
-    novo_usuario = {
-        'id': novo_id,
-        'nome': data['nome'],
-        'email': data['email'],
-        'senha': hash_password(data['senha']),
-        'perfil': 'PACIENTE',
-        'data_cadastro': datetime.now().isoformat()
-    }
-    
-    usuarios.append(novo_usuario)
-    salvar_dados('usuarios', usuarios)
-    
-    # Criar paciente
-    pacientes = carregar_dados('pacientes')
-    novo_paciente = {
-        'id': novo_id,
-        'telefone': data['telefone'],
-        'data_nascimento': data.get('data_nascimento', ''),
-        'endereco': data.get('endereco', {}),
-        'data_cadastro': datetime.now().isoformat()
-    }
-    
-    pacientes.append(novo_paciente)
-    salvar_dados('pacientes', pacientes)
+    with repositorio.transacao('usuarios', 'pacientes') as tx:
+        if tx.buscar_um('usuarios', 'email', data['email']):
+            return jsonify({'error': 'Email já cadastrado'}), 409
+        
+        # Criar usuário
+        novo_usuario = tx.inserir('usuarios', {
+            'nome': data['nome'],
+            'email': data['email'],
+            'senha': senha_hash,
+            'perfil': 'PACIENTE',
+            'data_cadastro': datetime.now().isoformat()
+        })
+        novo_id = novo_usuario['id']
+        
+        # Criar paciente
+        tx.inserir('pacientes', {
+            'id': novo_id,
+            'telefone': data['telefone'],
+            'data_nascimento': data['data_nascimento'],
+            'endereco': data['endereco'],
+            'data_cadastro': datetime.now().isoformat()
+        })
     
     return jsonify({
         'message': 'Paciente criado com sucesso',
@@ -101,23 +92,90 @@ def create_paciente():
         }
     }), 201
 
+@pacientes_bp.route('/bulk', methods=['POST'])
+@token_required
+@admin_required
+def create_pacientes_bulk():
+    """Cria vários pacientes de uma vez (array JSON ou NDJSON; ver api/lotes.py)"""
+    try:
+        itens, erros = lotes.ler_itens()
+    except lotes.LoteInvalido as e:
+        return jsonify({'error': str(e)}), e.status
+    
+    # Validação e emails repetidos no próprio lote
+    validos = []
+    emails = {}
+    for linha, item in itens:
+        try:
+            data = PacienteEntrada.model_validate(item).model_dump()
+        except ValidationError as e:
+            erros.append({'linha': linha, 'error': mensagem(e)})
+            continue
+        if data['email'] in emails:
+            erros.append({'linha': linha, 'error': f"Email repetido no lote (linha {emails[data['email']]})"})
+        else:
+            emails[data['email']] = linha
+            validos.append((linha, data))
+    
+    # Emails já cadastrados (índice de email), antes de gastar bcrypt com eles
+    existentes = {linha for linha, data in validos if repositorio.buscar_um('usuarios', 'email', data['email'])}
+    erros.extend({'linha': linha, 'error': 'Email já cadastrado'} for linha in sorted(existentes))
+    validos = [(linha, data) for linha, data in validos if linha not in existentes]
+    
+    if erros and lotes.tudo_ou_nada():
+        return jsonify(lotes.resposta([], erros)[0]), 422
+    
+    # Hashes em paralelo no executor de senhas, fora da transação
+    hashes = senhas.gerar_hashes([data['senha'] for _, data in validos])
+    
+    ids = []
+    agora = datetime.now().isoformat()
+    with repositorio.transacao('usuarios', 'pacientes') as tx:
+        # Nova verificação com as coleções travadas (cadastros simultâneos)
+        ocupados = {linha for linha, data in validos if tx.buscar_um('usuarios', 'email', data['email'])}
+        erros.extend({'linha': linha, 'error': 'Email já cadastrado'} for linha in sorted(ocupados))
+        if erros and lotes.tudo_ou_nada():
+            return jsonify(lotes.resposta([], erros)[0]), 422
+        
+        for (linha, data), senha_hash in zip(validos, hashes):
+            if linha in ocupados:
+                continue
+            novo_usuario = tx.inserir('usuarios', {
+                'nome': data['nome'],
+                'email': data['email'],
+                'senha': senha_hash,
+                'perfil': 'PACIENTE',
+                'data_cadastro': agora
+            })
+            tx.inserir('pacientes', {
+                'id': novo_usuario['id'],
+                'telefone': data['telefone'],
+                'data_nascimento': data['data_nascimento'],
+                'endereco': data['endereco'],
+                'data_cadastro': agora
+            })
+            ids.append(novo_usuario['id'])
+    
+    corpo, status = lotes.resposta(ids, erros)
+    return jsonify(corpo), status
+
 @pacientes_bp.route('/<int:paciente_id>', methods=['GET'])
 @token_required
+@cache.respostas('pacientes', 'usuarios')
 def get_paciente(paciente_id):
     """Obtém dados de um paciente específico"""
     # Verificar permissão
     if request.user_perfil != 'ADMIN' and request.user_id != paciente_id:
         return jsonify({'error': 'Acesso não autorizado'}), 403
     
-    pacientes = carregar_dados('pacientes')
-    paciente = next((p for p in pacientes if p['id'] == paciente_id), None)
+    paciente = repositorio.obter('pacientes', paciente_id)
     
     if not paciente:
         return jsonify({'error': 'Paciente não encontrado'}), 404
     
-    # Adicionar dados do usuário
-    usuarios = carregar_dados('usuarios')
-    usuario = next((u for u in usuarios if u['id'] == paciente_id), None)
+    # Adicionar dados do usuário (sobre uma cópia do registro em cache)
+    paciente = dict(paciente)
+    usuario = usuario_atual() if paciente_id == request.user_id else repositorio.obter('usuarios', paciente_id)
     
     if usuario:
         paciente['nome'] = usuario['nome']
@@ -127,66 +185,88 @@ def get_paciente(paciente_id):
 
 @pacientes_bp.route('/<int:paciente_id>', methods=['PUT'])
 @token_required
+@validar(PacienteAtualizacao)
 def update_paciente(paciente_id):
     """Atualiza dados de um paciente"""
     # Verificar permissão
     if request.user_perfil != 'ADMIN' and request.user_id != paciente_id:
         return jsonify({'error': 'Acesso não autorizado'}), 403
     
-    data = request.get_json()
+    # Só os campos enviados
+    data = request.dados.model_dump(exclude_unset=True, exclude_none=True)
     
-    pacientes = carregar_dados('pacientes')
-    paciente_index = next((i for i, p in enumerate(pacientes) if p['id'] == paciente_id), None)
-    
-    if paciente_index is None:
-        return jsonify({'error': 'Paciente não encontrado'}), 404
-    
-    # Atualizar dados do paciente
-    if 'telefone' in data:
-        pacientes[paciente_index]['telefone'] = data['telefone']
-    if 'data_nascimento' in data:
-        pacientes[paciente_index]['data_nascimento'] = data['data_nascimento']
-    if 'endereco' in data:
-        pacientes[paciente_index]['endereco'] = data['endereco']
-    
-    salvar_dados('pacientes', pacientes)
-    
-    # Atualizar dados do usuário se fornecido
-    if 'nome' in data or 'email' in data:
-        usuarios = carregar_dados('usuarios')
-        usuario_index = next((i for i, u in enumerate(usuarios) if u['id'] == paciente_id), None)
+    with repositorio.transacao('pacientes', 'usuarios') as tx:
+        if not tx.obter('pacientes', paciente_id):
+            return jsonify({'error': 'Paciente não encontrado'}), 404
+        
+        # Verificar se email já existe (exceto para o próprio usuário)
+        if 'email' in data:
+            existente = tx.buscar_um('usuarios', 'email', data['email'])
+            if existente and existente['id'] != paciente_id:
+                return jsonify({'error': 'Email já está em uso'}), 409
         
-        if usuario_index is not None:
-            if 'nome' in data:
-                usuarios[usuario_index]['nome'] = data['nome']
-            if 'email' in data:
-                # Verificar se email já existe (exceto para o próprio usuário)
-                if any(u['email'] == data['email'] for i, u in enumerate(usuarios) if i != usuario_index):
-                    return jsonify({'error': 'Email já está em uso'}), 409
-                usuarios[usuario_index]['email'] = data['email']
-            salvar_dados('usuarios', usuarios)
+        # Atualizar dados do paciente
+        agora = datetime.now().isoformat()
+        campos = {campo: data[campo] for campo in ('telefone', 'data_nascimento', 'endereco') if campo in data}
+        if campos:
+            tx.atualizar('pacientes', paciente_id, {**campos, 'data_atualizacao': agora})
+        
+        # Atualizar dados do usuário se fornecido
+        campos_usuario = {campo: data[campo] for campo in ('nome', 'email') if campo in data}
+        if campos_usuario:
+            tx.atualizar('usuarios', paciente_id, {**campos_usuario, 'data_atualizacao': agora})
     
     return jsonify({'message': 'Paciente atualizado com sucesso'}), 200
 
 @pacientes_bp.route('/<int:paciente_id>/consultas', methods=['GET'])
 @token_required
+@cache.respostas('consultas', 'profissionais')
 def get_consultas_paciente(paciente_id):
-    """Lista consultas de um paciente"""
+    """Lista consultas de um paciente (paginação, filtros e fields: ver api/paginacao.py)"""
     # Verificar permissão
     if request.user_perfil != 'ADMIN' and request.user_id != paciente_id:
         return jsonify({'error': 'Acesso não autorizado'}), 403
     
-    consultas = carregar_dados('consultas')
-    consultas_paciente = [c for c in consultas if c['paciente'] == paciente_id]
+    try:
+        pagina = paginacao.Pagina()
+        aceita = paginacao.filtro_consultas()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    # Adicionar informações
-    usuarios = carregar_dados('usuarios')
-    profissionais = carregar_dados('profissionais')
+    consultas_paciente = repositorio.iterar('consultas', 'paciente', paciente_id, pagina.cursor)
+    return pagina.responder((c for c in consultas_paciente if aceita(c)),
+                            juntar([PROFISSIONAL_NOME], pagina.campos))
+
+def pode_ver_prontuario(paciente_id):
+    """ADMIN, o próprio paciente ou um profissional que tem/teve consulta com ele"""
+    if request.user_perfil == 'ADMIN' or request.user_id == paciente_id:
+        return True
+    if request.user_perfil != 'PROFISSIONAL':
+        return False
+    # Índice de consultas por paciente: só o histórico deste paciente é lido
+    return any(c.get('profissional') == request.user_id
+               for c in repositorio.iterar('consultas', 'paciente', paciente_id))
+
+@pacientes_bp.route('/<int:paciente_id>/prontuario', methods=['GET'])
+@token_required
+@cache.respostas('prontuarios', 'profissionais', 'consultas')
+def get_prontuario_paciente(paciente_id):
+    """Linha do tempo do prontuário de um paciente (de, ate; paginação e fields: ver api/paginacao.py)"""
+    if not pode_ver_prontuario(paciente_id):
+        return jsonify({'error': 'Acesso não autorizado'}), 403
+    
+    if repositorio.obter('pacientes', paciente_id) is None:
+        return jsonify({'error': 'Paciente não encontrado'}), 404
     
-    for consulta in consultas_paciente:
-        # Nome do profissional
-        profissional = next((p for p in profissionais if p['id'] == consulta['profissional']), None)
-        if profissional:
-            consulta['profissional_nome'] = profissional.get('nome')
+    try:
+        pagina = paginacao.Pagina()
+        periodo = paginacao.filtro_periodo()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    return jsonify(consultas_paciente), 200
\ No newline at end of file
+    # Índice de prontuários por paciente: o custo é o do histórico dele, não o da coleção;
+    # os registros só são anexados, então a ordem de id é a cronológica
+    registros = repositorio.iterar('prontuarios', 'paciente', paciente_id, pagina.cursor)
+    if periodo is not None:
+        registros = (r for r in registros if periodo(r))
+    return pagina.responder(registros, juntar([PROFISSIONAL_NOME], pagina.campos))
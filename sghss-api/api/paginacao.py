@@ -0,0 +1,165 @@
+"""Paginação por cursor, projeção de campos, filtros e streaming NDJSON.
+
+Parâmetros aceitos pelas listagens (GET /consultas, /pacientes,
+/pacientes/{id}/consultas e /pacientes/{id}/prontuario):
+
+- ``limit``: tamanho da página (no máximo Config.PAGINA_MAXIMA); sem ele a
+  listagem vem inteira, como antes;
+- ``cursor``: id do último registro já recebido; a página começa depois
+  dele. A ordem é sempre a dos ids, então o cursor é estável mesmo com
+  inserções concorrentes. O próximo cursor vem no cabeçalho X-Next-Cursor;
+- ``fields``: campos a devolver, separados por vírgula (ex.: ``id,data``);
+- ``formato=ndjson`` (ou ``Accept: application/x-ndjson``): um registro JSON
+  por linha, gerado aos poucos -- a memória não cresce com a listagem.
+
+Filtros das listagens de consultas: ``status`` (um ou vários, separados por
+vírgula), ``profissional``, ``paciente``, ``de`` e ``ate`` (datas ISO;
+``ate`` só com a data inclui o dia inteiro). O prontuário aceita ``de`` e
+``ate``.
+"""
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from flask import Response, jsonify, request, stream_with_context
+
+from api.agenda import interpretar_data
+from config import Config
+from storage import codec
+from storage.base import Registro
+
+LOTE = 256  # registros preparados (e enviados, no NDJSON) de cada vez
+
+Preparar = Callable[[List[Registro]], List[Dict[str, Any]]]
+
+
+def inteiro(nome: str, minimo: Optional[int] = None) -> Optional[int]:
+    """Parâmetro inteiro da query string; ValueError se inválido"""
+    valor = request.args.get(nome)
+    if valor is None or valor == '':
+        return None
+    try:
+        numero = int(valor)
+    except ValueError:
+        raise ValueError(f'Parâmetro {nome} deve ser um número inteiro') from None
+    if minimo is not None and numero < minimo:
+        raise ValueError(f'Parâmetro {nome} deve ser maior ou igual a {minimo}')
+    return numero
+
+
+class Pagina:
+    """Parâmetros de paginação/projeção/formato de uma requisição"""
+
+    def __init__(self):
+        self.limite = inteiro('limit', minimo=1)
+        if self.limite is not None:
+            self.limite = min(self.limite, Config.PAGINA_MAXIMA)
+        self.cursor = inteiro('cursor')
+        campos = request.args.get('fields')
+        self.campos = [c.strip() for c in campos.split(',') if c.strip()] if campos else None
+        formato = request.args.get('formato')
+        if formato is None:
+            aceitos = request.accept_mimetypes
+            ndjson = aceitos.best_match(['application/json', 'application/x-ndjson']) == 'application/x-ndjson'
+        elif formato in ('json', 'ndjson'):
+            ndjson = formato == 'ndjson'
+        else:
+            raise ValueError('Parâmetro formato deve ser json ou ndjson')
+        self.ndjson = ndjson
+
+    def _projetar(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        if self.campos is None:
+            return item
+        return {campo: item[campo] for campo in self.campos if campo in item}
+
+    def _itens(self, registros: Iterable[Registro], preparar: Optional[Preparar]) -> Iterator[Dict[str, Any]]:
+        registros = iter(registros)
+        if self.limite is not None:
+            registros = islice(registros, self.limite)
+        while True:
+            bloco = list(islice(registros, LOTE))
+            if not bloco:
+                return
+            itens = preparar(bloco) if preparar else bloco
+            for item in itens:
+                yield self._projetar(item)
+
+    def responder(self, registros: Iterable[Registro], preparar: Optional[Preparar] = None):
+        """Resposta com os registros (em ordem de id) já paginados.
+
+        ``preparar`` recebe blocos de registros e devolve os objetos da
+        resposta (cópias enriquecidas); ``registros`` é consumido sob demanda.
+        """
+        if self.ndjson:
+            def linhas():
+                for item in self._itens(registros, preparar):
+                    yield codec.codificar(item) + b'\n'
+            return Response(stream_with_context(linhas()), mimetype='application/x-ndjson')
+
+        if self.limite is None:
+            return jsonify(list(self._itens(registros, preparar))), 200
+
+        # Um registro a mais diz se existe próxima página
+        registros = iter(registros)
+        pagina = list(islice(registros, self.limite))
+        tem_mais = next(registros, None) is not None
+        resposta = jsonify(list(self._itens(pagina, preparar)))
+        if tem_mais and pagina:
+            proximo = pagina[-1]['id']
+            resposta.headers['X-Next-Cursor'] = str(proximo)
+            args = request.args.to_dict()
+            args['cursor'] = proximo
+            resposta.headers['Link'] = f'<{request.path}?{urlencode(args)}>; rel="next"'
+        return resposta, 200
+
+
+def intervalo_datas() -> Tuple[Optional[datetime], Optional[datetime]]:
+    """Parâmetros ``de`` e ``ate`` (datas ISO) como o intervalo [inicio, fim); ValueError se inválidos"""
+    de = request.args.get('de')
+    ate = request.args.get('ate')
+    inicio = interpretar_data(de) if de else None
+    fim = interpretar_data(ate) if ate else None
+    if (de and inicio is None) or (ate and fim is None):
+        raise ValueError('Parâmetros de e ate devem ser datas ISO (ex.: 2024-01-15 ou 2024-01-15T10:30:00)')
+    if fim is not None:
+        # Limite inclusivo; só a data inclui o dia inteiro
+        fim += timedelta(days=1) if len(ate) == 10 else timedelta(microseconds=1)
+    return inicio, fim
+
+
+def filtro_periodo(campo: str = 'data') -> Optional[Callable[[Registro], bool]]:
+    """Predicado de ``de``/``ate`` sobre ``campo``; None sem os parâmetros, ValueError se inválidos"""
+    inicio, fim = intervalo_datas()
+    if inicio is None and fim is None:
+        return None
+
+    def aceita(registro: Registro) -> bool:
+        data = interpretar_data(registro.get(campo))
+        if data is None:
+            return False
+        if inicio is not None and data < inicio:
+            return False
+        return fim is None or data < fim
+
+    return aceita
+
+
+def filtro_consultas() -> Callable[[Registro], bool]:
+    """Predicado com os filtros de consultas da query string; ValueError se inválidos"""
+    status = request.args.get('status')
+    status = {s.strip() for s in status.split(',') if s.strip()} if status else None
+    profissional = inteiro('profissional')
+    paciente = inteiro('paciente')
+    periodo = filtro_periodo()
+
+    def aceita(consulta: Registro) -> bool:
+        if status is not None and consulta.get('status') not in status:
+            return False
+        if profissional is not None and consulta.get('profissional') != profissional:
+            return False
+        if paciente is not None and consulta.get('paciente') != paciente:
+            return False
+        return periodo is None or periodo(consulta)
+
+    return aceita
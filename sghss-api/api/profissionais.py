@@ -0,0 +1,92 @@
+from flask import Blueprint, request, jsonify
+from datetime import datetime, timedelta
+from auth.utils import token_required
+from config import Config
+from storage import repositorio
+from api import agenda, paginacao
+
+profissionais_bp = Blueprint('profissionais', __name__, url_prefix='/profissionais')
+
+def periodo():
+    """Período [de, ate) e duração pedidos (padrão: de agora a 7 dias, Config.CONSULTA_DURACAO_MINUTOS)"""
+    de, ate = paginacao.intervalo_datas()
+    de = de or datetime.now().replace(second=0, microsecond=0)
+    ate = ate or de + timedelta(days=7)
+    if ate <= de:
+        raise ValueError('Parâmetro ate deve ser posterior a de')
+    if ate - de > timedelta(days=Config.AGENDA_MAX_DIAS):
+        raise ValueError(f'Período maior que o limite de {Config.AGENDA_MAX_DIAS} dias')
+    duracao = paginacao.inteiro('duracao', minimo=1) or Config.CONSULTA_DURACAO_MINUTOS
+    return de, ate, timedelta(minutes=duracao)
+
+def horarios_livres(profissional_id, de, ate, duracao):
+    """Horários livres do profissional no período; horários já passados não são oferecidos"""
+    de = max(de, datetime.now())
+    if de >= ate:
+        return []
+    ocupados = agenda.indice().ocupados(profissional_id, de, ate)
+    passo = timedelta(minutes=Config.AGENDA_PASSO_MINUTOS)
+    return [{'inicio': inicio.isoformat(), 'fim': fim.isoformat()}
+            for inicio, fim in agenda.livres(ocupados, de, ate, duracao, passo)]
+
+# Endpoints
+@profissionais_bp.route('/<int:profissional_id>/agenda', methods=['GET'])
+@token_required
+def get_agenda(profissional_id):
+    """Horários ocupados e livres de um profissional (de, ate, duracao)"""
+    profissional = repositorio.obter('profissionais', profissional_id)
+    if profissional is None:
+        return jsonify({'error': 'Profissional não encontrado'}), 404
+
+    try:
+        de, ate, duracao = periodo()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Ids das consultas só para ADMIN e para o próprio profissional
+    mostrar_ids = request.user_perfil == 'ADMIN' or request.user_id == profissional_id
+    ocupados = []
+    for inicio, fim, consulta_id in agenda.indice().ocupados(profissional_id, de, ate):
+        ocupado = {'inicio': inicio.isoformat(), 'fim': fim.isoformat()}
+        if mostrar_ids:
+            ocupado['consulta_id'] = consulta_id
+        ocupados.append(ocupado)
+
+    return jsonify({
+        'profissional': {
+            'id': profissional_id,
+            'nome': profissional.get('nome'),
+            'especialidade': profissional.get('especialidade')
+        },
+        'de': de.isoformat(),
+        'ate': ate.isoformat(),
+        'duracao': int(duracao.total_seconds() // 60),
+        'ocupados': ocupados,
+        'livres': horarios_livres(profissional_id, de, ate, duracao)
+    }), 200
+
+@profissionais_bp.route('/disponibilidade', methods=['GET'])
+@token_required
+def get_disponibilidade():
+    """Horários livres por profissional (especialidade, de, ate, duracao; paginação e fields: ver api/paginacao.py)"""
+    try:
+        pagina = paginacao.Pagina()
+        de, ate, duracao = periodo()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    especialidade = request.args.get('especialidade')
+    if especialidade:
+        profissionais = repositorio.iterar('profissionais', 'especialidade', especialidade, apos=pagina.cursor)
+    else:
+        profissionais = repositorio.iterar('profissionais', apos=pagina.cursor)
+
+    def preparar(bloco):
+        return [{
+            'id': profissional['id'],
+            'nome': profissional.get('nome'),
+            'especialidade': profissional.get('especialidade'),
+            'livres': horarios_livres(profissional['id'], de, ate, duracao)
+        } for profissional in bloco]
+
+    return pagina.responder(profissionais, preparar)
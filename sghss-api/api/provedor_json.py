@@ -0,0 +1,31 @@
+"""Provedor JSON do Flask sobre storage.codec (orjson quando instalado).
+
+Usado por ``jsonify``, ``request.get_json`` e pelas respostas que devolvem
+dict/list. Diferente do provedor padrão do Flask, as chaves saem na ordem de
+inserção (sem ordenação) e datas em ISO 8601; com Config.JSON_PRETTY=1 as
+respostas saem indentadas.
+"""
+import time
+from typing import Any
+
+from flask.json.provider import JSONProvider
+
+import metricas
+from config import Config
+from storage import codec
+
+
+class ProvedorJSON(JSONProvider):
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return codec.texto(obj, Config.JSON_PRETTY)
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        return codec.decodificar(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        inicio = time.perf_counter()
+        corpo = codec.codificar(obj, Config.JSON_PRETTY) + b'\n'
+        metricas.JSON_RESPOSTA_DURACAO.observar(time.perf_counter() - inicio)
+        metricas.JSON_RESPOSTA_BYTES.inc(len(corpo))
+        return self._app.response_class(corpo, mimetype='application/json')
@@ -0,0 +1,210 @@
+"""Receitas: emissão (avulsa, em lote ou no atendimento), listagens e validação por código.
+
+Cada receita recebe um ``codigo`` aleatório de 16 caracteres (base32, 80
+bits), único no índice ``codigo`` de storage/repositorio.py. A farmácia
+valida a receita por GET /receitas/validar/<codigo>, que é uma busca O(1)
+nesse índice e não exige token JWT: o código impresso na receita é a
+credencial. As listagens usam os índices por consulta, paciente e
+profissional.
+"""
+import base64
+import secrets
+from datetime import date, datetime, timedelta
+
+from flask import Blueprint, request, jsonify
+from pydantic import ValidationError
+from auth.utils import token_required, profissional_required
+from storage import repositorio
+from api import cache, lotes, paginacao
+from api.enriquecimento import NOMES_CONSULTA, juntar
+from api.esquemas import ReceitaEntrada, mensagem, validar
+from api.notificacoes import notificar
+
+receitas_bp = Blueprint('receitas', __name__, url_prefix='/receitas')
+
+# Filtros das listagens, em ordem de seletividade: o primeiro informado escolhe o índice
+FILTROS = ('consulta', 'paciente', 'profissional')
+
+def gerar_codigo():
+    return base64.b32encode(secrets.token_bytes(10)).decode()
+
+def emitir(tx, paciente_id, profissional_id, conteudo, consulta_id=None):
+    """Grava uma receita (``conteudo``: ReceitaConteudo) em ``tx``, que deve incluir 'receitas'"""
+    codigo = gerar_codigo()
+    while tx.buscar_um('receitas', 'codigo', codigo) is not None:
+        codigo = gerar_codigo()
+
+    agora = datetime.now()
+    return tx.inserir('receitas', {
+        'codigo': codigo,
+        'paciente': paciente_id,
+        'profissional': profissional_id,
+        'consulta': consulta_id,
+        'itens': [item.model_dump(exclude_none=True) for item in conteudo.itens],
+        'observacoes': conteudo.observacoes,
+        'data_emissao': agora.isoformat(),
+        'validade': (agora.date() + timedelta(days=conteudo.validade_dias)).isoformat(),
+        'status': 'ATIVA'
+    })
+
+def ler(colecao, ids):
+    """{id: registro} dos ids informados (None ignorado), numa única leitura"""
+    return repositorio.obter_varios(colecao, {i for i in ids if i is not None})
+
+def paciente_da_receita(dados, consultas, pacientes):
+    """Paciente de ``dados`` (ReceitaEntrada): (paciente_id, None) ou (None, (erro, status))"""
+    if dados.consulta_id is not None:
+        consulta = consultas.get(dados.consulta_id)
+        if consulta is None:
+            return None, ('Consulta não encontrada', 404)
+        if consulta['profissional'] != request.user_id:
+            return None, ('Esta consulta não é sua', 403)
+        if dados.paciente_id is not None and dados.paciente_id != consulta['paciente']:
+            return None, ('paciente_id não é o paciente da consulta', 400)
+        return consulta['paciente'], None
+
+    if dados.paciente_id not in pacientes:
+        return None, ('Paciente não encontrado', 404)
+    return dados.paciente_id, None
+
+# Endpoints
+@receitas_bp.route('', methods=['GET'])
+@token_required
+@cache.respostas('receitas', 'usuarios', 'profissionais')
+def get_receitas():
+    """Lista receitas conforme perfil (filtros consulta, paciente, profissional; paginação: ver api/paginacao.py)"""
+    try:
+        pagina = paginacao.Pagina()
+        filtros = {campo: paginacao.inteiro(campo) for campo in FILTROS}
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Paciente e profissional veem só as próprias receitas
+    if request.user_perfil == 'PACIENTE':
+        filtros['paciente'] = request.user_id
+    elif request.user_perfil == 'PROFISSIONAL':
+        filtros['profissional'] = request.user_id
+    filtros = {campo: valor for campo, valor in filtros.items() if valor is not None}
+
+    # Um índice percorrido; os demais filtros são aplicados sobre ele
+    if filtros:
+        campo = next(iter(filtros))
+        receitas = repositorio.iterar('receitas', campo, filtros[campo], pagina.cursor)
+        receitas = (r for r in receitas if all(r.get(c) == v for c, v in filtros.items()))
+    else:  # ADMIN
+        receitas = repositorio.iterar('receitas', apos=pagina.cursor)
+
+    return pagina.responder(receitas, juntar(NOMES_CONSULTA, pagina.campos))
+
+@receitas_bp.route('', methods=['POST'])
+@token_required
+@profissional_required
+@validar(ReceitaEntrada)
+def create_receita():
+    """Emite uma receita (apenas o profissional; com consulta_id, ligada à consulta)"""
+    if request.user_perfil != 'PROFISSIONAL':
+        return jsonify({'error': 'Apenas profissionais emitem receitas'}), 403
+
+    dados = request.dados
+    paciente_id, erro = paciente_da_receita(dados, ler('consultas', [dados.consulta_id]),
+                                            ler('pacientes', [dados.paciente_id]))
+    if erro is not None:
+        return jsonify({'error': erro[0]}), erro[1]
+
+    with repositorio.transacao('receitas') as tx:
+        receita = emitir(tx, paciente_id, request.user_id, dados, dados.consulta_id)
+        notificar(paciente_id, 'Nova receita emitida', tx)
+
+    return jsonify({
+        'message': 'Receita emitida',
+        'receita': receita
+    }), 201
+
+@receitas_bp.route('/bulk', methods=['POST'])
+@token_required
+@profissional_required
+def create_receitas_bulk():
+    """Emite várias receitas de uma vez (array JSON ou NDJSON; ver api/lotes.py)"""
+    if request.user_perfil != 'PROFISSIONAL':
+        return jsonify({'error': 'Apenas profissionais emitem receitas'}), 403
+
+    try:
+        itens, erros = lotes.ler_itens()
+    except lotes.LoteInvalido as e:
+        return jsonify({'error': str(e)}), e.status
+
+    validos = []
+    for linha, item in itens:
+        try:
+            validos.append((linha, ReceitaEntrada.model_validate(item)))
+        except ValidationError as e:
+            erros.append({'linha': linha, 'error': mensagem(e)})
+
+    # Consultas e pacientes do lote lidos de uma vez
+    consultas = ler('consultas', (dados.consulta_id for _, dados in validos))
+    pacientes = ler('pacientes', (dados.paciente_id for _, dados in validos))
+    aceitos = []
+    for linha, dados in validos:
+        paciente_id, erro = paciente_da_receita(dados, consultas, pacientes)
+        if erro is not None:
+            erros.append({'linha': linha, 'error': erro[0]})
+        else:
+            aceitos.append((paciente_id, dados))
+
+    if erros and lotes.tudo_ou_nada():
+        return jsonify(lotes.resposta([], erros)[0]), 422
+
+    ids = []
+    with repositorio.transacao('receitas') as tx:
+        for paciente_id, dados in aceitos:
+            ids.append(emitir(tx, paciente_id, request.user_id, dados, dados.consulta_id)['id'])
+            notificar(paciente_id, 'Nova receita emitida', tx)
+
+    corpo, status = lotes.resposta(ids, erros)
+    return jsonify(corpo), status
+
+@receitas_bp.route('/<int:receita_id>', methods=['GET'])
+@token_required
+def get_receita(receita_id):
+    """Obtém uma receita (ADMIN, o paciente ou o profissional que a emitiu)"""
+    receita = repositorio.obter('receitas', receita_id)
+
+    if receita is None:
+        return jsonify({'error': 'Receita não encontrada'}), 404
+
+    if request.user_perfil != 'ADMIN' and request.user_id not in (receita['paciente'], receita['profissional']):
+        return jsonify({'error': 'Acesso não autorizado'}), 403
+
+    return jsonify(juntar(NOMES_CONSULTA)([receita])[0]), 200
+
+@receitas_bp.route('/validar/<codigo>', methods=['GET'])
+def validar_codigo(codigo):
+    """Validação pela farmácia: a receita do código e se ela pode ser dispensada (sem token)"""
+    receita = repositorio.buscar_um('receitas', 'codigo', codigo.strip().upper())
+
+    if receita is None:
+        return jsonify({'error': 'Receita não encontrada'}), 404
+
+    status = receita.get('status')
+    if status == 'ATIVA' and date.fromisoformat(receita['validade']) < date.today():
+        status = 'VENCIDA'
+
+    profissional = repositorio.obter('profissionais', receita['profissional']) or {}
+    paciente = repositorio.obter('usuarios', receita['paciente']) or {}
+    resposta = jsonify({
+        'codigo': receita['codigo'],
+        'valida': status == 'ATIVA',
+        'status': status,
+        'data_emissao': receita['data_emissao'],
+        'validade': receita['validade'],
+        'itens': receita['itens'],
+        'observacoes': receita.get('observacoes', ''),
+        'paciente_nome': paciente.get('nome'),
+        'profissional': {
+            'nome': profissional.get('nome'),
+            'crm': profissional.get('crm'),
+            'especialidade': profissional.get('especialidade')
+        }
+    })
+    resposta.headers['Cache-Control'] = 'no-store'
+    return resposta, 200
@@ -1,14 +1,30 @@
 from flask import Flask, jsonify
 from flask_cors import CORS
+from datetime import datetime
 import os
+import time
 from config import Config
 
 # Importar blueprints
 from auth.routes import auth_bp
 from api.pacientes import pacientes_bp
 from api.consultas import consultas_bp
+from api.profissionais import profissionais_bp
+from api.receitas import receitas_bp
+from api.internacoes import internacoes_bp
+from api.admin import admin_bp
+from api.provedor_json import ProvedorJSON
+from api import monitoramento
+from api.cache import cache
+from api.estatisticas import estatisticas
+from api.notificacoes import notificacoes_bp, fila as fila_notificacoes
+from auth import senhas, tokens
+from storage import codec
+
+INICIO = time.monotonic()
 
 app = Flask(__name__)
+app.json = ProvedorJSON(app)
 CORS(app)
 
 # Configuração
@@ -17,48 +33,101 @@ app.config.from_object(Config)
 # Criar diretório database se não existir
 os.makedirs(Config.DATA_DIR, exist_ok=True)
 
-# Inicializar arquivos JSON
-for nome, arquivo in Config.FILES.items():
-    if not os.path.exists(arquivo):
-        with open(arquivo, 'w', encoding='utf-8') as f:
-            import json
-            json.dump([], f, indent=4, ensure_ascii=False)
+# Inicializar arquivos JSON (no modo 'sqlite' o banco é criado pelo repositório)
+if Config.STORAGE_MODE != 'sqlite':
+    for nome, arquivo in Config.FILES.items():
+        if not os.path.exists(arquivo):
+            with open(arquivo, 'wb') as f:
+                codec.gravar([], f)
 
 # Registrar blueprints
 app.register_blueprint(auth_bp)
 app.register_blueprint(pacientes_bp)
 app.register_blueprint(consultas_bp)
+app.register_blueprint(profissionais_bp)
+app.register_blueprint(receitas_bp)
+app.register_blueprint(internacoes_bp)
+app.register_blueprint(notificacoes_bp)
+app.register_blueprint(admin_bp)
+monitoramento.instalar(app)
+
+# Contadores de GET /admin/stats reconstruídos já na inicialização, não na primeira requisição
+estatisticas()
 
 # Health check
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({
         'status': 'online',
-        'timestamp': '2024-01-15T10:30:00',
+        'timestamp': datetime.now().isoformat(),
+        'uptime_segundos': round(time.monotonic() - INICIO, 1),
         'version': '2.0.0',
+        'json': codec.nome,
+        'cache': cache.estatisticas(),
+        'notificacoes': fila_notificacoes.estatisticas(),
+        'senhas': senhas.executor.estatisticas(),
+        'tokens': tokens.cache.estatisticas(),
         'endpoints': {
             'auth': [
                 'POST /auth/login', 
                 'POST /auth/register', 
+                'POST /auth/refresh',
+                'POST /auth/logout',
                 'GET /auth/me'
             ],
             'pacientes': [
                 'GET /pacientes', 
                 'POST /pacientes', 
+                'POST /pacientes/bulk',
                 'GET /pacientes/{id}',
                 'PUT /pacientes/{id}',
-                'GET /pacientes/{id}/consultas'
+                'GET /pacientes/{id}/consultas',
+                'GET /pacientes/{id}/prontuario'
             ],
             'consultas': [
                 'GET /consultas', 
                 'POST /consultas', 
+                'POST /consultas/bulk',
                 'PUT /consultas/{id}',
                 'DELETE /consultas/{id}', 
                 'POST /consultas/{id}/atender'
+            ],
+            'profissionais': [
+                'GET /profissionais/{id}/agenda',
+                'GET /profissionais/disponibilidade'
+            ],
+            'receitas': [
+                'GET /receitas',
+                'POST /receitas',
+                'POST /receitas/bulk',
+                'GET /receitas/{id}',
+                'GET /receitas/validar/{codigo}'
+            ],
+            'internacoes': [
+                'GET /internacoes',
+                'POST /internacoes',
+                'GET /internacoes/censo',
+                'GET /internacoes/censo/{ala}',
+                'GET /internacoes/{id}',
+                'POST /internacoes/{id}/transferir',
+                'POST /internacoes/{id}/alta'
+            ],
+            'notificacoes': [
+                'GET /notificacoes',
+                'POST /notificacoes/lidas',
+                'GET /notificacoes/stream'
+            ],
+            'admin': [
+                'GET /admin/export/{colecao}',
+                'GET /admin/stats'
+            ],
+            'monitoramento': [
+                'GET /health',
+                'GET /metrics'
             ]
         },
         'notas': {
-            'autenticacao': 'Todos os endpoints (exceto /auth/* e /health) requerem token JWT no header Authorization: Bearer {token}',
+            'autenticacao': 'Todos os endpoints (exceto /auth/*, /health e /receitas/validar/*) requerem token JWT no header Authorization: Bearer {token}',
             'perfis': {
                 'ADMIN': 'Acesso completo a todos os endpoints',
                 'PROFISSIONAL': 'Pode gerenciar suas consultas e pacientes relacionados',
@@ -77,6 +146,10 @@ def not_found(error):
 def internal_error(error):
     return jsonify({'error': 'Erro interno do servidor'}), 500
 
+@app.errorhandler(senhas.SenhasOcupadas)
+def senhas_ocupadas(error):
+    return jsonify({'error': 'Servidor ocupado, tente novamente em instantes'}), 503, {'Retry-After': '1'}
+
 if __name__ == '__main__':
     print("=" * 50)
     print("API REST TELEMED - Versão 2.1") 
@@ -84,6 +157,7 @@ if __name__ == '__main__':
     print("\nEndpoints principais:")
     print("  POST   /auth/login        - Login (retorna JWT)")
     print("  POST   /auth/register     - Registro")
+    print("  POST   /auth/refresh      - Renovar tokens (refresh token)")
     print("  GET    /auth/me           - Meus dados")
     print("  GET    /pacientes         - Listar pacientes (ADMIN)")
     print("  POST   /pacientes         - Criar paciente (ADMIN)")
@@ -94,6 +168,7 @@ if __name__ == '__main__':
     print("  PUT    /consultas/{id}    - Atualizar consulta")
     print("  DELETE /consultas/{id}    - Deletar consulta (NOVO)") 
     print("  POST   /consultas/{id}/atender - Realizar atendimento")
+    print("  GET    /notificacoes      - Minhas notificações")
     print("  GET    /health            - Health check")
     print("\nDocumentação completa: http://localhost:5000/health")
     print("=" * 50)
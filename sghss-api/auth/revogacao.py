@@ -0,0 +1,91 @@
+"""Tokens revogados (logout e refresh tokens já usados), identificados pelo ``jti``.
+
+Os revogados são gravados na coleção 'tokens_revogados' (``jti`` com índice
+único, então o mesmo refresh token não pode ser usado duas vezes nem por
+requisições simultâneas). Para a checagem em toda requisição cada processo
+mantém ``TokensRevogados``, um ``dict`` jti -> exp sincronizado pelo
+repositório: a consulta é O(1).
+
+Um token expirado já é recusado pela verificação do JWT, então a revogação
+só precisa durar até o ``exp``: de tempos em tempos
+(Config.REVOGACAO_PODA_INTERVALO) os registros vencidos são apagados junto com
+uma nova revogação.
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config import Config
+from storage import repositorio
+from storage.base import Derivado, Registro
+
+
+class TokensRevogados(Derivado):
+    """jti -> (id do registro, exp) dos tokens revogados"""
+
+    colecao = 'tokens_revogados'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._revogados: Dict[str, Tuple[int, float]] = {}
+
+    def reconstruir(self, registros: Iterable[Registro]) -> None:
+        revogados = {r['jti']: (r['id'], r.get('exp') or 0) for r in registros if r.get('jti')}
+        with self._lock:
+            self._revogados = revogados
+
+    def aplicar(self, anterior: Optional[Registro], novo: Optional[Registro]) -> None:
+        with self._lock:
+            if anterior is not None:
+                self._revogados.pop(anterior.get('jti'), None)
+            if novo is not None and novo.get('jti'):
+                self._revogados[novo['jti']] = (novo['id'], novo.get('exp') or 0)
+
+    def contem(self, jti: Any) -> bool:
+        return jti in self._revogados
+
+    def vencidos(self, agora: float) -> List[int]:
+        """Ids dos registros cujo token já expirou"""
+        with self._lock:
+            return [registro_id for registro_id, exp in self._revogados.values() if exp <= agora]
+
+    def __len__(self) -> int:
+        return len(self._revogados)
+
+
+def indice() -> TokensRevogados:
+    """Revogados do processo, já sincronizados com as escritas de outros processos"""
+    return repositorio.derivado(TokensRevogados)
+
+
+def revogado(payload: Dict[str, Any]) -> bool:
+    jti = payload.get('jti')
+    return jti is not None and indice().contem(jti)
+
+
+_ultima_poda = 0.0
+
+
+def revogar(payload: Dict[str, Any]) -> bool:
+    """Revoga o token de ``payload``; False se ele já estava revogado"""
+    global _ultima_poda
+    jti = payload.get('jti')
+    if not jti:
+        return False
+    agora = time.time()
+    with repositorio.transacao('tokens_revogados') as tx:
+        if tx.buscar_um('tokens_revogados', 'jti', jti):
+            return False
+        tx.inserir('tokens_revogados', {
+            'jti': jti,
+            'tipo': payload.get('tipo', 'access'),
+            'user_id': payload.get('user_id'),
+            'exp': payload.get('exp'),
+            'data': datetime.now().isoformat()
+        })
+        if agora - _ultima_poda >= Config.REVOGACAO_PODA_INTERVALO:
+            _ultima_poda = agora
+            for registro_id in indice().vencidos(agora):
+                tx.remover('tokens_revogados', registro_id)
+    return True
@@ -1,42 +1,23 @@
 from flask import Blueprint, request, jsonify
 from datetime import datetime
-import json
-import os
-from auth.utils import hash_password, check_password, generate_token, token_required
-from config import Config
+from auth.utils import (hash_password, check_password, generate_token, generate_refresh_token, token_required,
+                        usuario_atual, verify_token)
+from auth import revogacao, senhas
+from storage import repositorio
+from api import cache
+from api.esquemas import LoginEntrada, LogoutEntrada, RefreshEntrada, RegistroEntrada, validar
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
-# Funções auxiliares
-def carregar_dados(nome):
-    try:
-        with open(Config.FILES[nome], 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return []
-
-def salvar_dados(nome, dados):
-    with open(Config.FILES[nome], 'w', encoding='utf-8') as f:
-        json.dump(dados, f, indent=4, ensure_ascii=False)
-
-def gerar_id(lista):
-    if not lista:
-        return 1
-    return max(item.get('id', 0) for item in lista) + 1
-
 # Endpoints
 @auth_bp.route('/login', methods=['POST'])
+@validar(LoginEntrada)
 def login():
     """Login de usuário - retorna token JWT"""
-    data = request.get_json()
-    
-    if not data or 'email' not in data or 'senha' not in data:
-        return jsonify({'error': 'Email e senha são obrigatórios'}), 400
-    
-    usuarios = carregar_dados('usuarios')
+    data = request.dados.model_dump()
     
     # Buscar usuário
-    usuario = next((u for u in usuarios if u['email'] == data['email']), None)
+    usuario = repositorio.buscar_um('usuarios', 'email', data['email'])
     
     if not usuario:
         return jsonify({'error': 'Credenciais inválidas'}), 401
@@ -45,6 +26,10 @@ def login():
     if not check_password(data['senha'], usuario['senha']):
         return jsonify({'error': 'Credenciais inválidas'}), 401
     
+    # Hash com custo diferente de Config.BCRYPT_ROUNDS: regravar sem atrasar o login
+    if senhas.precisa_refazer(usuario['senha']):
+        senhas.refazer_em_segundo_plano(usuario['id'], data['senha'], usuario['senha'])
+    
     # Gerar token JWT
     token = generate_token(usuario['id'], usuario['perfil'])
     
@@ -52,6 +37,7 @@ def login():
     response_data = {
         'message': 'Login realizado com sucesso',
         'access_token': token,
+        'refresh_token': generate_refresh_token(usuario['id'], usuario['perfil']),
         'token_type': 'Bearer',
         'user': {
             'id': usuario['id'],
@@ -63,14 +49,12 @@ def login():
     
     # Adicionar informações específicas do perfil
     if usuario['perfil'] == 'PACIENTE':
-        pacientes = carregar_dados('pacientes')
-        paciente = next((p for p in pacientes if p['id'] == usuario['id']), None)
+        paciente = repositorio.obter('pacientes', usuario['id'])
         if paciente:
             response_data['user']['telefone'] = paciente.get('telefone')
     
     elif usuario['perfil'] == 'PROFISSIONAL':
-        profissionais = carregar_dados('profissionais')
-        profissional = next((p for p in profissionais if p['id'] == usuario['id']), None)
+        profissional = repositorio.obter('profissionais', usuario['id'])
         if profissional:
             response_data['user']['nome_completo'] = profissional.get('nome')
             response_data['user']['especialidade'] = profissional.get('especialidade', '')
@@ -78,62 +62,51 @@ def login():
     return jsonify(response_data), 200
 
 @auth_bp.route('/register', methods=['POST'])
+@validar(RegistroEntrada)
 def register():
     """Registro de novo usuário"""
-    data = request.get_json()
-    
-    # Validações básicas
-    required_fields = ['nome', 'email', 'senha', 'perfil']
-    for field in required_fields:
-        if field not in data:
-            return jsonify({'error': f'Campo obrigatório faltando: {field}'}), 400
-    
-    if data['perfil'] not in ['PACIENTE', 'PROFISSIONAL', 'ADMIN']:
-        return jsonify({'error': 'Perfil inválido'}), 400
+    data = request.dados.model_dump()
     
     # Verificar se email já existe
-    usuarios = carregar_dados('usuarios')
-    if any(u['email'] == data['email'] for u in usuarios):
+    if repositorio.buscar_um('usuarios', 'email', data['email']):
         return jsonify({'error': 'Email já cadastrado'}), 409
     
-    # Criar novo usuário
-    novo_id = gerar_id(usuarios)
-    novo_usuario = {
-        'id': novo_id,
-        'nome': data['nome'],
-        'email': data['email'],
-        'senha': hash_password(data['senha']),  # Senha com hash
-        'perfil': data['perfil'],
-        'data_cadastro': datetime.now().isoformat()
-    }
-    
-    usuarios.append(novo_usuario)
-    salvar_dados('usuarios', usuarios)
-    
-    # Criar registro específico do perfil
-    if data['perfil'] == 'PACIENTE':
-        pacientes = carregar_dados('pacientes')
-        novo_paciente = {
-            'id': novo_id,
-            'telefone': data.get('telefone', ''),
-            'data_nascimento': data.get('data_nascimento', ''),
-            'endereco': data.get('endereco', {}),
-            'data_cadastro': datetime.now().isoformat()
-        }
-        pacientes.append(novo_paciente)
-        salvar_dados('pacientes', pacientes)
+    # Hash fora da transação: bcrypt é lento e as coleções ficariam travadas
+    senha_hash = hash_password(data['senha'])
     
-    elif data['perfil'] == 'PROFISSIONAL':
-        profissionais = carregar_dados('profissionais')
-        novo_profissional = {
-            'id': novo_id,
+    with repositorio.transacao('usuarios', 'pacientes', 'profissionais') as tx:
+        # Nova verificação com as coleções travadas (cadastros simultâneos)
+        if tx.buscar_um('usuarios', 'email', data['email']):
+            return jsonify({'error': 'Email já cadastrado'}), 409
+        
+        # Criar novo usuário
+        novo_usuario = tx.inserir('usuarios', {
             'nome': data['nome'],
-            'especialidade': data.get('especialidade', ''),
-            'crm': data.get('crm', ''),
+            'email': data['email'],
+            'senha': senha_hash,  # Senha com hash
+            'perfil': data['perfil'],
             'data_cadastro': datetime.now().isoformat()
-        }
-        profissionais.append(novo_profissional)
-        salvar_dados('profissionais', profissionais)
+        })
+        novo_id = novo_usuario['id']
+        
+        # Criar registro específico do perfil
+        if data['perfil'] == 'PACIENTE':
+            tx.inserir('pacientes', {
+                'id': novo_id,
+                'telefone': data['telefone'],
+                'data_nascimento': data['data_nascimento'],
+                'endereco': data['endereco'],
+                'data_cadastro': datetime.now().isoformat()
+            })
+        
+        elif data['perfil'] == 'PROFISSIONAL':
+            tx.inserir('profissionais', {
+                'id': novo_id,
+                'nome': data['nome'],
+                'especialidade': data['especialidade'],
+                'crm': data['crm'],
+                'data_cadastro': datetime.now().isoformat()
+            })
     
     # Gerar token automaticamente após registro
     token = generate_token(novo_id, data['perfil'])
@@ -141,6 +114,7 @@ def register():
     return jsonify({
         'message': 'Usuário criado com sucesso',
         'access_token': token,
+        'refresh_token': generate_refresh_token(novo_id, data['perfil']),
         'token_type': 'Bearer',
         'user': {
             'id': novo_id,
@@ -150,12 +124,49 @@ def register():
         }
     }), 201
 
+@auth_bp.route('/refresh', methods=['POST'])
+@validar(RefreshEntrada)
+def refresh():
+    """Troca um refresh token por novos tokens de acesso e de renovação (sem senha)"""
+    payload = verify_token(request.dados.refresh_token)
+    if not payload or payload.get('tipo') != 'refresh':
+        return jsonify({'error': 'Refresh token inválido ou expirado'}), 401
+    
+    # Perfil atual do usuário (pode ter mudado desde o login)
+    usuario = repositorio.obter('usuarios', payload['user_id'])
+    if not usuario:
+        return jsonify({'error': 'Refresh token inválido ou expirado'}), 401
+    
+    # Cada refresh token vale uma vez: revogar falha se ele já foi usado
+    if not revogacao.revogar(payload):
+        return jsonify({'error': 'Token revogado'}), 401
+    
+    return jsonify({
+        'access_token': generate_token(usuario['id'], usuario['perfil']),
+        'refresh_token': generate_refresh_token(usuario['id'], usuario['perfil']),
+        'token_type': 'Bearer'
+    }), 200
+
+@auth_bp.route('/logout', methods=['POST'])
+@token_required
+@validar(LogoutEntrada, opcional=True)
+def logout():
+    """Revoga o token de acesso atual e, se enviado, o refresh token"""
+    revogacao.revogar(request.token_payload)
+    
+    if request.dados.refresh_token:
+        payload = verify_token(request.dados.refresh_token)
+        if payload and payload.get('tipo') == 'refresh' and payload.get('user_id') == request.user_id:
+            revogacao.revogar(payload)
+    
+    return jsonify({'message': 'Logout realizado com sucesso'}), 200
+
 @auth_bp.route('/me', methods=['GET'])
 @token_required
+@cache.respostas('usuarios', 'pacientes', 'profissionais')
 def get_me():
     """Obtém informações do usuário logado"""
-    usuarios = carregar_dados('usuarios')
-    usuario = next((u for u in usuarios if u['id'] == request.user_id), None)
+    usuario = usuario_atual()
     
     if not usuario:
         return jsonify({'error': 'Usuário não encontrado'}), 404
@@ -170,16 +181,14 @@ def get_me():
     
     # Adicionar informações específicas do perfil
     if usuario['perfil'] == 'PACIENTE':
-        pacientes = carregar_dados('pacientes')
-        paciente = next((p for p in pacientes if p['id'] == usuario['id']), None)
+        paciente = repositorio.obter('pacientes', usuario['id'])
         if paciente:
             response_data['telefone'] = paciente.get('telefone')
             response_data['data_nascimento'] = paciente.get('data_nascimento')
             response_data['endereco'] = paciente.get('endereco', {})
     
     elif usuario['perfil'] == 'PROFISSIONAL':
-        profissionais = carregar_dados('profissionais')
-        profissional = next((p for p in profissionais if p['id'] == usuario['id']), None)
+        profissional = repositorio.obter('profissionais', usuario['id'])
         if profissional:
             response_data['nome_completo'] = profissional.get('nome')
             response_data['especialidade'] = profissional.get('especialidade')
@@ -0,0 +1,162 @@
+"""Hash e verificação de senhas (bcrypt) num executor dedicado e limitado.
+
+O bcrypt é lento de propósito e solta o GIL enquanto calcula, então um pico
+de logins ocuparia todos os núcleos e todas as threads de requisição. Aqui
+ele roda em no máximo Config.BCRYPT_THREADS threads; a requisição espera o
+resultado, mas só Config.BCRYPT_FILA_MAX operações podem estar pendentes
+(em execução ou na fila) ao mesmo tempo. Acima disso ``SenhasOcupadas`` é
+levantada na hora e a API responde 503 com Retry-After, em vez de acumular
+requisições paradas -- o resto da API (e /health) continua respondendo.
+
+O custo é Config.BCRYPT_ROUNDS. Hashes gravados com outro custo continuam
+válidos e são refeitos com o custo atual no próximo login bem-sucedido
+(``precisa_refazer`` + ``refazer_em_segundo_plano``).
+"""
+import logging
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import bcrypt
+
+import metricas
+from config import Config
+from storage import repositorio
+
+logger = logging.getLogger(__name__)
+
+
+class SenhasOcupadas(Exception):
+    """Fila do executor de senhas cheia; a requisição deve ser recusada (503)"""
+
+
+class ExecutorSenhas:
+    """ThreadPoolExecutor com limite de operações pendentes"""
+
+    def __init__(self, threads: int, fila_max: int):
+        self.threads = threads
+        self.fila_max = fila_max
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid = None
+        self._pendentes = 0
+        self.executadas = 0
+        self.recusadas = 0
+
+    def enviar(self, funcao: Callable, *args) -> Future:
+        """Agenda ``funcao`` sem esperar; SenhasOcupadas se a fila estiver cheia"""
+        with self._lock:
+            if self._pendentes >= self.fila_max:
+                self.recusadas += 1
+                raise SenhasOcupadas()
+            if self._executor is None or self._pid != os.getpid():
+                # Após um fork as threads do pai não existem no filho
+                self._executor = ThreadPoolExecutor(self.threads, thread_name_prefix='bcrypt')
+                self._pid = os.getpid()
+                self._pendentes = 0
+            self._pendentes += 1
+        try:
+            futuro = self._executor.submit(funcao, *args)
+        except BaseException:
+            self._concluida(None)
+            raise
+        futuro.add_done_callback(self._concluida)
+        return futuro
+
+    def _concluida(self, _futuro: Optional[Future]) -> None:
+        with self._lock:
+            self._pendentes -= 1
+            self.executadas += 1
+
+    def executar(self, funcao: Callable, *args) -> Any:
+        """Roda ``funcao`` no executor e espera o resultado; SenhasOcupadas se cheio"""
+        return self.enviar(funcao, *args).result()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'threads': self.threads,
+                'pendentes': self._pendentes,
+                'executadas': self.executadas,
+                'recusadas': self.recusadas,
+            }
+
+
+executor = ExecutorSenhas(Config.BCRYPT_THREADS, Config.BCRYPT_FILA_MAX)
+
+
+def _hash(senha: str) -> str:
+    with metricas.BCRYPT_DURACAO.cronometrar(operacao='hash'):
+        return bcrypt.hashpw(senha.encode('utf-8'), bcrypt.gensalt(Config.BCRYPT_ROUNDS)).decode('utf-8')
+
+
+def _verificar(senha: str, hashed: str) -> bool:
+    with metricas.BCRYPT_DURACAO.cronometrar(operacao='verificar'):
+        return bcrypt.checkpw(senha.encode('utf-8'), hashed.encode('utf-8'))
+
+
+def gerar_hash(senha: str) -> str:
+    return executor.executar(_hash, senha)
+
+
+def verificar(senha: str, hashed: str) -> bool:
+    return executor.executar(_verificar, senha, hashed)
+
+
+def gerar_hashes(lista: List[str]) -> List[str]:
+    """Hashes de várias senhas em paralelo no executor, sem ocupar a fila inteira"""
+    janela = max(1, min(executor.threads * 2, executor.fila_max // 2))
+    futuros: Deque[Future] = deque()
+    resultados: List[str] = []
+    for senha in lista:
+        if len(futuros) >= janela:
+            resultados.append(futuros.popleft().result())
+        while True:
+            try:
+                futuros.append(executor.enviar(_hash, senha))
+                break
+            except SenhasOcupadas:
+                # Fila tomada por outras requisições: espera uma das nossas
+                if not futuros:
+                    raise
+                resultados.append(futuros.popleft().result())
+    resultados.extend(futuro.result() for futuro in futuros)
+    return resultados
+
+
+def custo(hashed: str) -> Optional[int]:
+    """Custo (rounds) de um hash bcrypt ``$2b$12$...``; None se não reconhecido"""
+    partes = hashed.split('$')
+    if len(partes) < 4 or not partes[2].isdigit():
+        return None
+    return int(partes[2])
+
+
+def precisa_refazer(hashed: str) -> bool:
+    return custo(hashed) != Config.BCRYPT_ROUNDS
+
+
+def _refazer(usuario_id: int, senha: str, hashed: str) -> None:
+    novo = _hash(senha)
+    with repositorio.transacao('usuarios') as tx:
+        usuario = tx.obter('usuarios', usuario_id)
+        # A senha pode ter sido trocada enquanto o hash era calculado
+        if usuario is not None and usuario.get('senha') == hashed:
+            tx.atualizar('usuarios', usuario_id, {'senha': novo})
+
+
+def refazer_em_segundo_plano(usuario_id: int, senha: str, hashed: str) -> None:
+    """Regrava o hash com Config.BCRYPT_ROUNDS sem atrasar o login (ignorado com a fila cheia)"""
+    try:
+        futuro = executor.enviar(_refazer, usuario_id, senha, hashed)
+    except SenhasOcupadas:
+        return  # fica para o próximo login
+    futuro.add_done_callback(lambda f: _registrar_falha(f, usuario_id))
+
+
+def _registrar_falha(futuro: Future, usuario_id: int) -> None:
+    erro = futuro.exception()
+    if erro is not None:
+        logger.error('Falha ao refazer o hash do usuário %s', usuario_id, exc_info=erro)
@@ -0,0 +1,82 @@
+"""Cache dos tokens JWT já verificados.
+
+Os clientes reusam o mesmo token por até uma hora, e ``jwt.decode`` (HMAC e
+checagem de datas) é refeito em toda requisição. ``CacheTokens`` é um LRU
+limitado (Config.TOKEN_CACHE_MAX) de hash do token -> payload verificado:
+a chave é o blake2b do token, então o token em si não fica em memória, e uma
+entrada só vale até o ``exp`` do payload -- depois disso o token volta a ser
+recusado como expirado. Tokens inválidos nunca entram no cache.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from config import Config
+
+
+class CacheTokens:
+    """LRU de payloads JWT verificados, respeitando ``exp``"""
+
+    def __init__(self, max_entradas: int):
+        self.max_entradas = max_entradas
+        self._entradas: 'OrderedDict[bytes, Tuple[float, Dict[str, Any]]]' = OrderedDict()  # hash -> (exp, payload)
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+        self.expirados = 0
+
+    @staticmethod
+    def chave(token: str) -> bytes:
+        return hashlib.blake2b(token.encode('utf-8'), digest_size=16).digest()
+
+    def obter(self, token: str) -> Optional[Dict[str, Any]]:
+        """Payload já verificado de ``token``, ou None (falta ou expirado)"""
+        chave = self.chave(token)
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                self.faltas += 1
+                return None
+            if entrada[0] <= time.time():
+                del self._entradas[chave]
+                self.expirados += 1
+                self.faltas += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.acertos += 1
+            return entrada[1]
+
+    def guardar(self, token: str, payload: Dict[str, Any]) -> None:
+        exp = payload.get('exp')
+        if self.max_entradas <= 0 or not isinstance(exp, (int, float)):
+            return
+        chave = self.chave(token)
+        with self._lock:
+            self._entradas[chave] = (exp, payload)
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def remover(self, token: str) -> None:
+        with self._lock:
+            self._entradas.pop(self.chave(token), None)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.acertos + self.faltas
+            return {
+                'entradas': len(self._entradas),
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+                'expirados': self.expirados,
+                'taxa_acerto': round(self.acertos / total, 4) if total else 0.0,
+            }
+
+
+cache = CacheTokens(Config.TOKEN_CACHE_MAX)
@@ -1,38 +1,58 @@
 import jwt
-import bcrypt
+import time
+import uuid
 from datetime import datetime, timedelta
 from functools import wraps
-from flask import request, jsonify
+from flask import g, request, jsonify
+import metricas
 from config import Config
+from auth import revogacao, senhas, tokens
+from storage import repositorio
 
 def hash_password(password):
-    """Gera hash da senha usando bcrypt"""
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+    """Gera hash da senha usando bcrypt (no executor de senhas; SenhasOcupadas se saturado)"""
+    return senhas.gerar_hash(password)
 
 def check_password(password, hashed):
-    """Verifica se a senha corresponde ao hash"""
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    """Verifica se a senha corresponde ao hash (no executor de senhas; SenhasOcupadas se saturado)"""
+    return senhas.verificar(password, hashed)
 
-def generate_token(user_id, perfil, expires_in=3600):
-    """Gera token JWT"""
+def generate_token(user_id, perfil, expires_in=None, tipo='access'):
+    """Gera token JWT (de acesso ou, com tipo='refresh', de renovação); jti identifica o token na revogação"""
+    if expires_in is None:
+        validade = Config.JWT_REFRESH_TOKEN_EXPIRES if tipo == 'refresh' else Config.JWT_ACCESS_TOKEN_EXPIRES
+        expires_in = int(validade.total_seconds())
     payload = {
         'user_id': user_id,
         'perfil': perfil,
+        'tipo': tipo,
+        'jti': uuid.uuid4().hex,
         'exp': datetime.utcnow() + timedelta(seconds=expires_in),
         'iat': datetime.utcnow()
     }
     return jwt.encode(payload, Config.JWT_SECRET_KEY, algorithm='HS256')
 
+def generate_refresh_token(user_id, perfil):
+    """Gera refresh token (Config.JWT_REFRESH_TOKEN_EXPIRES), trocado por tokens novos em /auth/refresh"""
+    return generate_token(user_id, perfil, tipo='refresh')
+
 def verify_token(token):
-    """Verifica e decodifica token JWT"""
+    """Verifica e decodifica token JWT (tokens já verificados vêm do cache até o exp)"""
+    inicio = time.perf_counter()
+    payload = tokens.cache.obter(token)
+    if payload is not None:
+        metricas.JWT_VERIFICACAO.observar(time.perf_counter() - inicio, origem='cache')
+        return payload
     try:
         payload = jwt.decode(token, Config.JWT_SECRET_KEY, algorithms=['HS256'])
+        tokens.cache.guardar(token, payload)
         return payload
     except jwt.ExpiredSignatureError:
         return None  # Token expirado
     except jwt.InvalidTokenError:
         return None  # Token inválido
+    finally:
+        metricas.JWT_VERIFICACAO.observar(time.perf_counter() - inicio, origem='jwt')
 
 # Decorators para proteção de rotas
 def token_required(f):
@@ -48,12 +68,16 @@ def token_required(f):
         if not token:
             return jsonify({'error': 'Token de autenticação ausente'}), 401
         
-        # Verificar token
+        # Verificar token (refresh tokens só servem para /auth/refresh)
         payload = verify_token(token)
-        if not payload:
+        if not payload or payload.get('tipo', 'access') != 'access':
             return jsonify({'error': 'Token inválido ou expirado'}), 401
         
-        # Adicionar informações do usuário 
+        if revogacao.revogado(payload):
+            return jsonify({'error': 'Token revogado'}), 401
+        
+        request.token_payload = payload
+        # Adicionar informações do usuário (o registro completo só com usuario_atual())
         request.user_id = payload['user_id']
         request.user_perfil = payload['perfil']
         
@@ -61,6 +85,12 @@ def token_required(f):
     
     return decorated
 
+def usuario_atual():
+    """Registro do usuário logado, lido uma vez por requisição (None se não existir)"""
+    if '_usuario' not in g:
+        g._usuario = repositorio.obter('usuarios', request.user_id)
+    return g._usuario
+
 def admin_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
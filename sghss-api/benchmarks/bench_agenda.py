@@ -0,0 +1,94 @@
+"""Benchmark da disponibilidade (GET /profissionais/disponibilidade) contra as alternativas antigas.
+
+Uso (a partir de sghss-api/):
+
+    python -m benchmarks.bench_agenda             # 10^5 e 10^6 consultas
+    python -m benchmarks.bench_agenda 1000 50000
+
+Para cada tamanho, monta o IndiceHorarios com consultas sintéticas (uma
+semana cheia de agendamentos por profissional, 1/5 deles cardiologistas) e
+mede o tempo de obter os horários livres de uma semana de todos os
+cardiologistas:
+  - livres: ``IndiceHorarios.ocupados`` + ``agenda.livres`` (uma busca por bisect
+    por profissional);
+  - tentativas: um ``conflito`` por horário candidato, como o cliente que
+    tenta POST /consultas até não receber 409;
+  - linear: cada horário candidato comparado com todas as consultas.
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import agenda  # noqa: E402
+from api.agenda import IndiceHorarios  # noqa: E402
+
+SEMANA = datetime(2030, 3, 4)  # segunda-feira
+DURACAO = timedelta(minutes=30)
+
+
+def medir(funcao, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes
+
+
+def gerar(n):
+    n_profissionais = max(5, n // 200)
+    consultas = []
+    for i in range(1, n + 1):
+        # Metade no histórico, metade espalhada pela semana medida
+        if i % 2:
+            data = datetime(2020, 1, 1, 8) + timedelta(minutes=30 * i)
+        else:
+            data = SEMANA + timedelta(days=random.randint(0, 4), hours=8, minutes=30 * random.randint(0, 19))
+        consultas.append({'id': i, 'profissional': random.randint(1, n_profissionais), 'data': data.isoformat(),
+                          'duracao': 30, 'status': 'AGENDADA' if i % 2 == 0 or i % 7 == 0 else 'REALIZADA'})
+    cardiologistas = [p for p in range(1, n_profissionais + 1) if p % 5 == 0]
+    return consultas, cardiologistas
+
+
+def executar(n):
+    consultas, cardiologistas = gerar(n)
+    horarios = IndiceHorarios()
+    horarios.reconstruir(consultas)
+    de, ate = SEMANA, SEMANA + timedelta(days=7)
+    candidatos = [inicio for abertura, fechamento in agenda.expedientes(de, ate)
+                  for inicio in (abertura + DURACAO * k for k in range((fechamento - abertura) // DURACAO))]
+
+    def por_livres():
+        return [agenda.livres(horarios.ocupados(p, de, ate), de, ate, DURACAO, DURACAO) for p in cardiologistas]
+
+    def por_tentativas():
+        return [[c for c in candidatos if horarios.conflito(p, c, 30) is None] for p in cardiologistas]
+
+    def por_varredura():
+        agendadas = [(c['profissional'], datetime.fromisoformat(c['data'])) for c in consultas
+                     if c['status'] == 'AGENDADA']
+        return [[c for c in candidatos
+                 if not any(prof == p and inicio < c + DURACAO and c < inicio + DURACAO for prof, inicio in agendadas)]
+                for p in cardiologistas[:3]]
+
+    assert por_livres() == [[(c, c + DURACAO) for c in livres] for livres in por_tentativas()]
+    resultados = {
+        'livres': medir(por_livres, 20),
+        'tentativas': medir(por_tentativas, 3),
+        # Só 3 profissionais, extrapolado: a varredura é O(candidatos x consultas)
+        'linear': medir(por_varredura, 1) * len(cardiologistas) / 3 if n <= 200000 else None,
+    }
+
+    print(f'\n{n} consultas, {len(cardiologistas)} cardiologistas, {len(candidatos)} horários por semana')
+    for nome, tempo in resultados.items():
+        texto = f'{tempo * 1000:>12.2f}ms' if tempo is not None else f"{'(omitido)':>14}"
+        ganho = f"{tempo / resultados['livres']:>9.0f}x" if tempo is not None else ''
+        print(f'{nome:<12}{texto}{ganho}')
+
+
+if __name__ == '__main__':
+    tamanhos = [int(a) for a in sys.argv[1:]] or [10 ** 5, 10 ** 6]
+    for tamanho in tamanhos:
+        executar(tamanho)
@@ -0,0 +1,511 @@
+"""Benchmark de carga da API: todos os endpoints de app.py em várias escalas.
+
+Uso (a partir de sghss-api/):
+
+    python -m benchmarks.bench_api                          # 10^3, 10^5 e 10^6 consultas
+    python -m benchmarks.bench_api 1000 20000 --concorrencia 16 --saida antes.json
+    python -m benchmarks.bench_api 1000 --saida depois.json --comparar antes.json
+    BCRYPT_ROUNDS=4 STORAGE_MODE=sqlite python -m benchmarks.bench_api 1000
+
+Cada escala roda num processo próprio, num diretório temporário: gera a
+pasta database/ com n consultas sintéticas, n/10 pacientes e n/1000
+profissionais (mais um ADMIN), já no formato gravado pela API, e mede cada
+endpoint de duas formas:
+  - cliente: ``app.test_client()``, uma requisição por vez (custo da
+    aplicação, sem rede);
+  - servidor: servidor WSGI local (werkzeug, com threads) e
+    ``--concorrencia`` clientes HTTP simultâneos.
+
+Para cada endpoint: requisições, status, vazão (req/s) e latências p50, p95,
+p99 e máxima (ms). Por escala: tempo de carga das coleções e pico de memória
+(RSS) do processo. O resultado vai em JSON para ``--saida``, com o commit
+atual, e ``--comparar`` mostra a razão de vazão e de p95 contra um resultado
+anterior.
+
+As listagens usam limit=100 e a exportação traz só as últimas 1000
+consultas: sem isso, a 10^6 uma única requisição levaria minutos. Endpoints
+que passam pelo bcrypt (login, cadastro, importação de pacientes) fazem
+``--requisicoes-senha`` requisições, no custo de Config.BCRYPT_ROUNDS. O
+stream de notificações roda com NOTIFICACOES_SSE_DURACAO=0 (mede só a
+abertura). PUT, DELETE e atendimento agem sobre consultas criadas antes da
+medição, uma por requisição. Os dados gerados são apagados ao fim de cada
+escala, a menos que se use ``--manter``.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+SENHA = 'senha123'
+BASE_HISTORICO = datetime(2020, 1, 1, 8, 0)
+BASE_FUTURO = datetime(2035, 1, 1, 8, 0)  # horários novos, um por requisição: nunca conflitam
+ITEM_RECEITA = {'medicamento': 'Dipirona', 'posologia': '6/6h se dor', 'dosagem': '500mg'}
+
+
+# Dados sintéticos
+def tamanhos(n):
+    return max(5, n // 1000), max(10, n // 10)  # profissionais, pacientes
+
+
+def semear(n):
+    """Grava a pasta database/ do diretório atual com n consultas"""
+    import bcrypt
+    from config import Config
+    from storage import codec
+
+    n_profissionais, n_pacientes = tamanhos(n)
+    profissionais = range(2, n_profissionais + 2)
+    pacientes = range(n_profissionais + 2, n_profissionais + n_pacientes + 2)
+    senha = bcrypt.hashpw(SENHA.encode(), bcrypt.gensalt(Config.BCRYPT_ROUNDS)).decode()
+    cadastro = BASE_HISTORICO.isoformat()
+    especialidades = ['Cardiologia', 'Clínica Geral', 'Pediatria', 'Dermatologia', 'Ortopedia']
+
+    def usuarios():
+        yield {'id': 1, 'nome': 'Admin', 'email': 'admin@bench.local', 'senha': senha, 'perfil': 'ADMIN',
+               'data_cadastro': cadastro}
+        for i in profissionais:
+            yield {'id': i, 'nome': f'Profissional {i}', 'email': f'prof{i}@bench.local', 'senha': senha,
+                   'perfil': 'PROFISSIONAL', 'data_cadastro': cadastro}
+        for i in pacientes:
+            yield {'id': i, 'nome': f'Paciente {i}', 'email': f'pac{i}@bench.local', 'senha': senha,
+                   'perfil': 'PACIENTE', 'data_cadastro': cadastro}
+
+    def consultas():
+        aleatorio = random.Random(n)
+        for i in range(1, n + 1):
+            # Histórico: a maior parte já foi realizada ou cancelada
+            status = aleatorio.choices(['AGENDADA', 'REALIZADA', 'CANCELADA'], [1, 7, 2])[0]
+            tipo = aleatorio.choice('PO')
+            yield {'id': i, 'paciente': aleatorio.choice(pacientes), 'profissional': aleatorio.choice(profissionais),
+                   'data': (BASE_HISTORICO + timedelta(minutes=30 * i)).isoformat(), 'duracao': 30,
+                   'status': status, 'tipo': tipo,
+                   'link': f'https://telemed.local/consulta/{i}' if tipo == 'O' else '',
+                   'data_criacao': cadastro, 'criado_por': 1}
+
+    def prontuarios():
+        # Um registro por consulta realizada, como em POST /consultas/<id>/atender
+        for consulta in consultas():
+            if consulta['status'] == 'REALIZADA':
+                yield {'paciente': consulta['paciente'], 'data': consulta['data'], 'descricao': 'Retorno em 30 dias',
+                       'profissional': consulta['profissional'], 'consulta': consulta['id']}
+
+    def receitas():
+        # Uma receita por consulta, com código previsível (cenário de validação pela farmácia)
+        for consulta in consultas():
+            yield {'id': consulta['id'], 'codigo': f"BENCH{consulta['id']:011d}", 'paciente': consulta['paciente'],
+                   'profissional': consulta['profissional'], 'consulta': consulta['id'], 'itens': [ITEM_RECEITA],
+                   'observacoes': '', 'data_emissao': consulta['data'], 'validade': '2099-12-31', 'status': 'ATIVA'}
+
+    def internacoes():
+        # Histórico de altas e metade dos leitos de cada ala ocupada
+        aleatorio = random.Random(n)
+        historico = max(1, n // 10)
+        for i in range(1, historico + 1):
+            ala = aleatorio.choice(list(Config.INTERNACAO_ALAS))
+            yield {'id': i, 'paciente': aleatorio.choice(pacientes), 'ala': ala,
+                   'leito': aleatorio.randint(1, Config.INTERNACAO_ALAS[ala]), 'motivo': '', 'status': 'ALTA',
+                   'data_admissao': cadastro, 'data_alta': cadastro, 'transferencias': [], 'criado_por': 1}
+        internados = iter(pacientes)
+        proximo_id = historico + 1
+        for ala, quantidade in Config.INTERNACAO_ALAS.items():
+            for leito in range(1, quantidade // 2 + 1):
+                yield {'id': proximo_id, 'paciente': next(internados), 'ala': ala, 'leito': leito, 'motivo': '',
+                       'status': 'ATIVA', 'data_admissao': cadastro, 'transferencias': [], 'criado_por': 1}
+                proximo_id += 1
+
+    colecoes = {
+        'usuarios': usuarios(),
+        'profissionais': ({'id': i, 'nome': f'Profissional {i}', 'especialidade': especialidades[i % 5],
+                           'crm': f'CRM-{i}', 'data_cadastro': cadastro} for i in profissionais),
+        'pacientes': ({'id': i, 'telefone': f'119{i:08d}', 'data_nascimento': '1990-01-01',
+                       'endereco': {'cidade': 'São Paulo', 'uf': 'SP'}, 'data_cadastro': cadastro}
+                      for i in pacientes),
+        'consultas': consultas(),
+        'prontuarios': ({'id': i, **registro} for i, registro in enumerate(prontuarios(), 1)),
+        'receitas': receitas(),
+        'internacoes': internacoes(),
+    }
+    os.makedirs(Config.DATA_DIR, exist_ok=True)
+    for nome, arquivo in Config.FILES.items():
+        with open(arquivo, 'wb') as f:
+            codec.gravar(colecoes.get(nome, ()), f, indentar=False)
+    if Config.STORAGE_MODE == 'sqlite':
+        from storage import migrar
+        migrar.migrar(Config.SQLITE_PATH, substituir=True)
+    return list(profissionais), list(pacientes)
+
+
+# Cenários: (nome, método, url(ctx, i), corpo(ctx, i), perfil do token, pesado)
+def _slot(ctx):
+    return (BASE_FUTURO + timedelta(minutes=30 * next(ctx['slots']))).isoformat()
+
+
+def _email(ctx):
+    return f"bench{next(ctx['emails'])}-{os.getpid()}@bench.local"
+
+
+def _consulta(ctx):
+    return {'paciente_id': random.choice(ctx['pacientes']), 'profissional_id': random.choice(ctx['profissionais']),
+            'data': _slot(ctx), 'tipo': 'P'}
+
+
+def _receita(ctx):
+    return {'paciente_id': random.choice(ctx['pacientes']), 'itens': [ITEM_RECEITA]}
+
+
+def _paciente(ctx):
+    return {'nome': 'Paciente Bench', 'email': _email(ctx), 'senha': SENHA, 'telefone': '11999990000'}
+
+
+CENARIOS = [
+    ('GET /health', 'GET', lambda ctx, i: '/health', None, None, False),
+    ('POST /auth/login', 'POST', lambda ctx, i: '/auth/login',
+     lambda ctx, i: {'email': f"pac{random.choice(ctx['pacientes'])}@bench.local", 'senha': SENHA}, None, True),
+    ('POST /auth/register', 'POST', lambda ctx, i: '/auth/register',
+     lambda ctx, i: {**_paciente(ctx), 'perfil': 'PACIENTE'}, None, True),
+    ('POST /auth/refresh', 'POST', lambda ctx, i: '/auth/refresh',
+     lambda ctx, i: {'refresh_token': ctx['pool'][i]}, None, False),
+    ('POST /auth/logout', 'POST', lambda ctx, i: '/auth/logout', None, lambda ctx, i: ctx['pool'][i], False),
+    ('GET /auth/me', 'GET', lambda ctx, i: '/auth/me', None, 'paciente', False),
+    ('GET /pacientes', 'GET', lambda ctx, i: f'/pacientes?limit=100&cursor={random.choice(ctx["pacientes"])}',
+     None, 'admin', False),
+    ('POST /pacientes', 'POST', lambda ctx, i: '/pacientes', lambda ctx, i: _paciente(ctx), 'admin', True),
+    ('POST /pacientes/bulk', 'POST', lambda ctx, i: '/pacientes/bulk',
+     lambda ctx, i: [_paciente(ctx) for _ in range(10)], 'admin', True),
+    ('GET /pacientes/<id>', 'GET', lambda ctx, i: f'/pacientes/{random.choice(ctx["pacientes"])}',
+     None, 'admin', False),
+    ('PUT /pacientes/<id>', 'PUT', lambda ctx, i: f'/pacientes/{random.choice(ctx["pacientes"])}',
+     lambda ctx, i: {'telefone': f'1198{i:07d}'}, 'admin', False),
+    ('GET /pacientes/<id>/consultas', 'GET',
+     lambda ctx, i: f'/pacientes/{random.choice(ctx["pacientes"])}/consultas?limit=100', None, 'admin', False),
+    ('GET /pacientes/<id>/prontuario', 'GET',
+     lambda ctx, i: f'/pacientes/{random.choice(ctx["pacientes"])}/prontuario?limit=100&de=2021-01-01', None, 'admin',
+     False),
+    ('GET /consultas', 'GET', lambda ctx, i: f'/consultas?limit=100&cursor={random.randint(0, ctx["n"])}',
+     None, 'admin', False),
+    ('GET /consultas (profissional)', 'GET', lambda ctx, i: '/consultas?limit=100&status=AGENDADA',
+     None, 'profissional', False),
+    ('POST /consultas', 'POST', lambda ctx, i: '/consultas', lambda ctx, i: _consulta(ctx), 'admin', False),
+    ('POST /consultas/bulk', 'POST', lambda ctx, i: '/consultas/bulk',
+     lambda ctx, i: [_consulta(ctx) for _ in range(100)], 'admin', False),
+    ('PUT /consultas/<id>', 'PUT', lambda ctx, i: f"/consultas/{ctx['pool'][i]}",
+     lambda ctx, i: {'duracao': 20}, 'admin', False),
+    ('DELETE /consultas/<id>', 'DELETE', lambda ctx, i: f"/consultas/{ctx['pool'][i]}", None, 'admin', False),
+    ('POST /consultas/<id>/atender', 'POST', lambda ctx, i: f"/consultas/{ctx['pool'][i]}/atender",
+     lambda ctx, i: {'observacoes': 'Retorno em 30 dias'}, 'profissional', False),
+    ('POST /receitas/bulk', 'POST', lambda ctx, i: '/receitas/bulk',
+     lambda ctx, i: [_receita(ctx) for _ in range(100)], 'profissional', False),
+    ('GET /receitas/validar/<codigo>', 'GET',
+     lambda ctx, i: f"/receitas/validar/BENCH{random.randint(1, ctx['n']):011d}", None, None, False),
+    ('GET /internacoes/censo', 'GET', lambda ctx, i: '/internacoes/censo', None, 'profissional', False),
+    ('GET /notificacoes', 'GET', lambda ctx, i: '/notificacoes?limit=100', None, 'paciente', False),
+    ('POST /notificacoes/lidas', 'POST', lambda ctx, i: '/notificacoes/lidas',
+     lambda ctx, i: {'ate': 10 ** 12}, 'paciente', False),
+    ('GET /notificacoes/stream', 'GET', lambda ctx, i: '/notificacoes/stream', None, 'paciente', False),
+    ('GET /admin/stats', 'GET', lambda ctx, i: '/admin/stats?de=2020-01-01&ate=2020-03-31', None, 'admin', False),
+    ('GET /admin/export/consultas', 'GET',
+     lambda ctx, i: f"/admin/export/consultas?since_id={max(0, ctx['n'] - 1000)}", None, 'admin', False),
+]
+
+
+def preparar(nome, ctx, quantidade):
+    """Tokens ou consultas consumidos um por requisição (criados fora da medição)"""
+    from auth.utils import generate_refresh_token, generate_token
+    from storage import repositorio
+
+    if nome == 'POST /auth/refresh':
+        return [generate_refresh_token(ctx['paciente_id'], 'PACIENTE') for _ in range(quantidade)]
+    if nome == 'POST /auth/logout':
+        return [generate_token(ctx['paciente_id'], 'PACIENTE') for _ in range(quantidade)]
+    if nome in ('PUT /consultas/<id>', 'DELETE /consultas/<id>', 'POST /consultas/<id>/atender'):
+        ids = []
+        with repositorio.transacao('consultas') as tx:
+            for _ in range(quantidade):
+                ids.append(tx.inserir('consultas', {
+                    'paciente': ctx['paciente_id'], 'profissional': ctx['profissional_id'], 'data': _slot(ctx),
+                    'duracao': 30, 'status': 'AGENDADA', 'tipo': 'P', 'link': '',
+                    'data_criacao': datetime.now().isoformat(), 'criado_por': 1
+                })['id'])
+        return ids
+    return None
+
+
+# Medição
+def percentil(ordenadas, p):
+    if not ordenadas:
+        return None
+    return ordenadas[min(len(ordenadas) - 1, int(round(p / 100 * (len(ordenadas) - 1))))]
+
+
+def resumir(latencias, status, duracao):
+    ordenadas = sorted(latencias)
+    return {
+        'requisicoes': len(latencias),
+        'status': {str(codigo): total for codigo, total in sorted(status.items())},
+        'erros': sum(total for codigo, total in status.items() if not 200 <= codigo < 400),
+        'vazao_rps': round(len(latencias) / duracao, 1) if duracao else None,
+        'p50_ms': round(percentil(ordenadas, 50) * 1000, 3) if ordenadas else None,
+        'p95_ms': round(percentil(ordenadas, 95) * 1000, 3) if ordenadas else None,
+        'p99_ms': round(percentil(ordenadas, 99) * 1000, 3) if ordenadas else None,
+        'max_ms': round(ordenadas[-1] * 1000, 3) if ordenadas else None,
+    }
+
+
+def montar(cenario, ctx, i):
+    _, metodo, url, corpo, perfil, _ = cenario
+    token = perfil(ctx, i) if callable(perfil) else ctx['tokens'].get(perfil)
+    headers = {'Authorization': f'Bearer {token}'} if token else {}
+    return metodo, url(ctx, i), corpo(ctx, i) if corpo else None, headers
+
+
+def via_cliente(app, cenario, ctx, quantidade):
+    cliente = app.test_client()
+    latencias, status = [], Counter()
+    inicio_total = time.perf_counter()
+    for i in range(quantidade):
+        metodo, url, corpo, headers = montar(cenario, ctx, i)
+        inicio = time.perf_counter()
+        resposta = cliente.open(url, method=metodo, json=corpo, headers=headers)
+        resposta.get_data()
+        latencias.append(time.perf_counter() - inicio)
+        status[resposta.status_code] += 1
+    return resumir(latencias, status, time.perf_counter() - inicio_total)
+
+
+def via_servidor(porta, cenario, ctx, quantidade, concorrencia):
+    indices = iter(range(quantidade))
+    lock = threading.Lock()
+    latencias, status = [], Counter()
+
+    def cliente():
+        while True:
+            with lock:
+                i = next(indices, None)
+            if i is None:
+                return
+            metodo, url, corpo, headers = montar(cenario, ctx, i)
+            dados = json.dumps(corpo).encode() if corpo is not None else None
+            if dados is not None:
+                headers = {**headers, 'Content-Type': 'application/json'}
+            inicio = time.perf_counter()
+            try:
+                conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=120)
+                conexao.request(metodo, url, body=dados, headers=headers)
+                resposta = conexao.getresponse()
+                resposta.read()
+                codigo = resposta.status
+                conexao.close()
+            except OSError:
+                codigo = 599  # falha de conexão
+            decorrido = time.perf_counter() - inicio
+            with lock:
+                latencias.append(decorrido)
+                status[codigo] += 1
+
+    threads = [threading.Thread(target=cliente) for _ in range(concorrencia)]
+    inicio_total = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return resumir(latencias, status, time.perf_counter() - inicio_total)
+
+
+def rss_pico_mb():
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(pico / 1024 / (1024 if sys.platform == 'darwin' else 1), 1)  # bytes no macOS, KiB no Linux
+
+
+def executar_escala(n, opcoes):
+    """Roda num processo novo: gera os dados, sobe a API e mede os cenários"""
+    import logging
+
+    os.environ['NOTIFICACOES_SSE_DURACAO'] = '0'
+    diretorio = tempfile.mkdtemp(prefix=f'bench_api_{n}_')
+    os.chdir(diretorio)
+    random.seed(n)
+
+    inicio = time.perf_counter()
+    profissionais, pacientes = semear(n)
+    geracao = time.perf_counter() - inicio
+
+    from werkzeug.serving import make_server
+
+    from app import app
+    from auth.utils import generate_token
+    from config import Config
+    from storage import codec, repositorio
+
+    inicio = time.perf_counter()
+    for nome in Config.FILES:
+        repositorio.sincronizar(nome)
+    carga = time.perf_counter() - inicio
+
+    ctx = {
+        'n': n,
+        'profissionais': profissionais,
+        'pacientes': pacientes,
+        'paciente_id': pacientes[0],
+        'profissional_id': profissionais[0],
+        'tokens': {'admin': generate_token(1, 'ADMIN'), 'paciente': generate_token(pacientes[0], 'PACIENTE'),
+                   'profissional': generate_token(profissionais[0], 'PROFISSIONAL')},
+        'slots': itertools.count(),
+        'emails': itertools.count(),
+    }
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    servidor = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+    resultado = {'cliente': {}, 'servidor': {}}
+    try:
+        for cenario in CENARIOS:
+            nome, pesado = cenario[0], cenario[5]
+            if opcoes.endpoints and not any(filtro in nome for filtro in opcoes.endpoints):
+                continue
+            quantidade = opcoes.requisicoes_senha if pesado else opcoes.requisicoes
+            for modo in ('cliente', 'servidor'):
+                # Uma requisição de aquecimento (índices derivados, caches) fora da medição
+                ctx['pool'] = preparar(nome, ctx, quantidade + 1)
+                aquecimento = {**ctx, 'pool': ctx['pool'][-1:] if ctx['pool'] else None}
+                via_cliente(app, cenario, aquecimento, 1)
+                if modo == 'cliente':
+                    medida = via_cliente(app, cenario, ctx, quantidade)
+                else:
+                    medida = via_servidor(servidor.server_port, cenario, ctx, quantidade, opcoes.concorrencia)
+                resultado[modo][nome] = medida
+                print(f"  [{n}] {modo:<8} {nome:<32} {medida['vazao_rps']:>9} req/s  "
+                      f"p50 {medida['p50_ms']:>9.2f}  p95 {medida['p95_ms']:>9.2f}  p99 {medida['p99_ms']:>9.2f} ms"
+                      f"{'  erros: ' + str(medida['erros']) if medida['erros'] else ''}", flush=True)
+    finally:
+        servidor.shutdown()
+
+    from api.notificacoes import fila
+    fila.esvaziar()
+    return {
+        'consultas': n,
+        'pacientes': len(pacientes),
+        'profissionais': len(profissionais),
+        'storage_mode': Config.STORAGE_MODE,
+        'json_codec': codec.nome,
+        'bcrypt_rounds': Config.BCRYPT_ROUNDS,
+        'geracao_s': round(geracao, 3),
+        'carga_s': round(carga, 3),
+        'rss_pico_mb': rss_pico_mb(),
+        'diretorio': diretorio,
+        **resultado,
+    }
+
+
+def _processo(n, opcoes, fila):
+    try:
+        fila.put(executar_escala(n, opcoes))
+    except BaseException as e:  # noqa: B902 -- o erro volta para o processo principal
+        fila.put({'consultas': n, 'erro': repr(e)})
+        raise
+
+
+def commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(atual, anterior):
+    """Razão vazão atual/anterior e p95 atual/anterior, por escala, modo e endpoint"""
+    escalas = {e['consultas']: e for e in anterior.get('escalas', [])}
+    for escala in atual['escalas']:
+        base = escalas.get(escala['consultas'])
+        if base is None or 'erro' in escala:
+            continue
+        print(f"\n{escala['consultas']} consultas: {atual.get('commit')} x {anterior.get('commit')}")
+        print(f"{'modo':<10}{'endpoint':<34}{'vazão':>10}{'p95':>10}")
+        for modo in ('cliente', 'servidor'):
+            for nome, medida in escala.get(modo, {}).items():
+                antes = base.get(modo, {}).get(nome)
+                if not antes or not antes['vazao_rps'] or not antes['p95_ms']:
+                    continue
+                print(f"{modo:<10}{nome:<34}{medida['vazao_rps'] / antes['vazao_rps']:>9.2f}x"
+                      f"{medida['p95_ms'] / antes['p95_ms']:>9.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de carga dos endpoints da API')
+    parser.add_argument('escalas', nargs='*', type=int, default=[10 ** 3, 10 ** 5, 10 ** 6],
+                        help='quantidades de consultas geradas (uma rodada por escala)')
+    parser.add_argument('--requisicoes', type=int, default=200, help='requisições por endpoint e modo')
+    parser.add_argument('--requisicoes-senha', type=int, default=20,
+                        help='requisições dos endpoints que passam pelo bcrypt')
+    parser.add_argument('--concorrencia', type=int, default=8, help='clientes simultâneos no modo servidor')
+    parser.add_argument('--endpoints', nargs='*', help='só os endpoints cujo nome contém um destes textos')
+    parser.add_argument('--saida', default='bench_api.json', help='arquivo JSON com os resultados')
+    parser.add_argument('--comparar', help='resultado anterior (JSON) para comparação')
+    parser.add_argument('--manter', action='store_true', help='não apaga os diretórios temporários com os dados')
+    opcoes = parser.parse_args(argv)
+
+    resultado = {
+        'commit': commit_atual(),
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'requisicoes': opcoes.requisicoes,
+        'requisicoes_senha': opcoes.requisicoes_senha,
+        'concorrencia': opcoes.concorrencia,
+        'escalas': [],
+    }
+    contexto = multiprocessing.get_context('spawn')
+    for n in opcoes.escalas:
+        print(f'\n== {n} consultas', flush=True)
+        fila = contexto.Queue()
+        processo = contexto.Process(target=_processo, args=(n, opcoes, fila))
+        processo.start()
+        while True:
+            try:
+                escala = fila.get(timeout=1)
+                break
+            except queue.Empty:
+                if not processo.is_alive():
+                    escala = {'consultas': n, 'erro': f'processo terminou com código {processo.exitcode}'}
+                    break
+        processo.join()
+        if not opcoes.manter and escala.get('diretorio'):
+            shutil.rmtree(escala.pop('diretorio'), ignore_errors=True)
+        resultado['escalas'].append(escala)
+        if 'erro' in escala:
+            print(f"  falhou: {escala['erro']}")
+        else:
+            print(f"  geração {escala['geracao_s']}s, carga {escala['carga_s']}s, "
+                  f"pico de memória {escala['rss_pico_mb']} MiB")
+
+    with open(opcoes.saida, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print(f'\nResultados em {opcoes.saida}')
+
+    if opcoes.comparar:
+        with open(opcoes.comparar, 'r', encoding='utf-8') as f:
+            comparar(resultado, json.load(f))
+    return 0 if all('erro' not in e for e in resultado['escalas']) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
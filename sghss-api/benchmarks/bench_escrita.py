@@ -0,0 +1,62 @@
+"""Benchmark do custo de uma escrita nos modos 'json', 'wal' e 'sqlite'.
+
+Uso (a partir de sghss-api/):
+
+    python -m benchmarks.bench_escrita              # 10^3, 10^4 e 10^5 registros
+    python -m benchmarks.bench_escrita 1000 200000
+
+Para cada tamanho, cria uma coleção de notificações pré-populada e mede o
+tempo médio de ``inserir`` (equivalente a um ``notificar``). No modo 'json'
+o custo cresce com a coleção; nos modos 'wal' e 'sqlite' deve ficar constante.
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+from storage.colecao import Colecao  # noqa: E402
+from storage.sqlite import BackendSQLite  # noqa: E402
+from storage.wal import ColecaoLog  # noqa: E402
+
+INSERCOES = 200
+
+
+def medir(classe, n):
+    with tempfile.TemporaryDirectory() as diretorio:
+        arquivo = os.path.join(diretorio, 'notificacoes.json')
+        with open(arquivo, 'w', encoding='utf-8') as f:
+            json.dump([{'id': i, 'paciente': i % 500, 'mensagem': 'Consulta agendada', 'data': '2024-01-15T10:00:00'}
+                       for i in range(1, n + 1)], f)
+        colecao = classe('notificacoes', arquivo)
+        colecao.sincronizar()
+
+        inicio = time.perf_counter()
+        for i in range(INSERCOES):
+            colecao.inserir({'paciente': i, 'mensagem': 'Consulta agendada', 'data': '2024-01-15T10:00:00'})
+        return (time.perf_counter() - inicio) / INSERCOES
+
+
+def medir_sqlite(n):
+    with tempfile.TemporaryDirectory() as diretorio:
+        banco = BackendSQLite(os.path.join(diretorio, 'sghss.db'), ['notificacoes'], {})
+        banco.importar('notificacoes', ({'id': i, 'paciente': i % 500, 'mensagem': 'Consulta agendada',
+                                         'data': '2024-01-15T10:00:00'} for i in range(1, n + 1)))
+
+        inicio = time.perf_counter()
+        for i in range(INSERCOES):
+            banco.inserir('notificacoes', {'paciente': i, 'mensagem': 'Consulta agendada', 'data': '2024-01-15T10:00:00'})
+        return (time.perf_counter() - inicio) / INSERCOES
+
+
+if __name__ == '__main__':
+    tamanhos = [int(a) for a in sys.argv[1:]] or [10 ** 3, 10 ** 4, 10 ** 5]
+    # Sem compactação durante a medição
+    Config.WAL_COMPACTAR_APOS = INSERCOES + 1
+    print(f"{'registros':>10}{'json':>14}{'wal':>14}{'sqlite':>14}")
+    for tamanho in tamanhos:
+        tempos = (medir(Colecao, tamanho), medir(ColecaoLog, tamanho), medir_sqlite(tamanho))
+        print(f'{tamanho:>10}' + ''.join(f'{t * 1e3:>12.3f}ms' for t in tempos))
@@ -0,0 +1,108 @@
+"""Benchmark dos índices do repositório contra a varredura linear antiga.
+
+Uso (a partir de sghss-api/):
+
+    python -m benchmarks.bench_indices            # 10^5 e 10^6 registros
+    python -m benchmarks.bench_indices 1000 50000 # tamanhos escolhidos
+
+Para cada tamanho, gera usuários e consultas sintéticos num diretório
+temporário e mede o tempo médio por operação de:
+  - login: usuário por email (índice único x ``next(...)``)
+  - obter: usuário por id (índice primário x ``next(...)``)
+  - filtro: consultas de um paciente (índice secundário x list comprehension)
+  - junção: nome do paciente para uma página de 100 consultas
+  - conflito: horário livre de um profissional (IndiceHorarios x ``any(...)``)
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.agenda import IndiceHorarios  # noqa: E402
+from storage.colecao import Colecao  # noqa: E402
+from storage.repositorio import INDICES  # noqa: E402
+
+
+def medir(funcao, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes
+
+
+def gerar(diretorio, n):
+    n_usuarios = max(n // 10, 1)
+    usuarios = [{'id': i, 'nome': f'Usuario {i}', 'email': f'u{i}@exemplo.com', 'perfil': 'PACIENTE'}
+                for i in range(1, n_usuarios + 1)]
+    # Histórico: a maior parte das consultas já foi realizada ou cancelada
+    base = datetime(2020, 1, 1, 8, 0)
+    consultas = [{'id': i, 'paciente': random.randint(1, n_usuarios), 'profissional': random.randint(1, 50),
+                  'data': (base + timedelta(minutes=30 * i)).isoformat(), 'tipo': 'P',
+                  'status': random.choices(['AGENDADA', 'REALIZADA', 'CANCELADA'], [1, 7, 2])[0]}
+                 for i in range(1, n + 1)]
+    arquivos = {}
+    for nome, dados in (('usuarios', usuarios), ('consultas', consultas)):
+        arquivos[nome] = os.path.join(diretorio, f'{nome}.json')
+        with open(arquivos[nome], 'w', encoding='utf-8') as f:
+            json.dump(dados, f)
+    return arquivos, usuarios, consultas
+
+
+def executar(n):
+    with tempfile.TemporaryDirectory() as diretorio:
+        arquivos, usuarios, consultas = gerar(diretorio, n)
+        col_usuarios = Colecao('usuarios', arquivos['usuarios'], INDICES['usuarios'])
+        col_consultas = Colecao('consultas', arquivos['consultas'], INDICES['consultas'])
+        horarios = IndiceHorarios()
+        col_consultas.registrar_derivado(horarios)
+
+        inicio = time.perf_counter()
+        col_usuarios.sincronizar()
+        col_consultas.sincronizar()
+        carga = time.perf_counter() - inicio
+
+        alvo = usuarios[-1]
+        pagina = consultas[-100:]
+        # A varredura linear é O(n): poucas repetições bastam
+        rep_linear = max(1, 200000 // n)
+
+        resultados = {
+            'login': (
+                medir(lambda: col_usuarios.buscar('email', alvo['email']), 10000),
+                medir(lambda: next((u for u in usuarios if u['email'] == alvo['email']), None), rep_linear),
+            ),
+            'obter': (
+                medir(lambda: col_usuarios.obter(alvo['id']), 10000),
+                medir(lambda: next((u for u in usuarios if u['id'] == alvo['id']), None), rep_linear),
+            ),
+            'filtro': (
+                medir(lambda: col_consultas.buscar('paciente', alvo['id']), 10000),
+                medir(lambda: [c for c in consultas if c['paciente'] == alvo['id']], rep_linear),
+            ),
+            'juncao': (
+                medir(lambda: [col_usuarios.obter(c['paciente']) for c in pagina], 1000),
+                medir(lambda: [next((u for u in usuarios if u['id'] == c['paciente']), None)
+                               for c in pagina[:5]], 1) * 20,
+            ),
+            'conflito': (
+                medir(lambda: horarios.conflito(7, pagina[0]['data']), 10000),
+                medir(lambda: any(c['profissional'] == 7 and c['data'] == pagina[0]['data'] and
+                                  c['status'] == 'AGENDADA' for c in consultas), rep_linear),
+            ),
+        }
+
+    print(f'\n{n} consultas / {len(usuarios)} usuários (carga inicial: {carga:.2f}s)')
+    print(f"{'operação':<10}{'indexado':>14}{'linear':>14}{'ganho':>10}")
+    for nome, (indexado, linear) in resultados.items():
+        print(f'{nome:<10}{indexado * 1e6:>12.2f}µs{linear * 1e6:>12.0f}µs{linear / indexado:>9.0f}x')
+
+
+if __name__ == '__main__':
+    tamanhos = [int(a) for a in sys.argv[1:]] or [10 ** 5, 10 ** 6]
+    for tamanho in tamanhos:
+        executar(tamanho)
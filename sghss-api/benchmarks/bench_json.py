@@ -0,0 +1,86 @@
+"""Benchmark da gravação/leitura das coleções: storage.codec x ``json.dump(indent=4)`` antigo.
+
+Uso (a partir de sghss-api/):
+
+    python -m benchmarks.bench_json               # 10^5 e 10^6 consultas
+    python -m benchmarks.bench_json 1000 50000    # tamanhos escolhidos
+
+Para cada tamanho grava e lê o mesmo arquivo de consultas sintéticas num
+diretório temporário e mostra o tempo de gravação, o de leitura e o tamanho
+do arquivo em cada formato:
+  - antigo: ``json.dump(indent=4)`` / ``json.load``, como era salvar_dados
+  - json: Codec da biblioteca padrão, compacto
+  - json indentado: o mesmo com JSON_PRETTY=1
+  - orjson e orjson indentado, se o pacote estiver instalado
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import codec  # noqa: E402
+
+
+def medir(funcao):
+    inicio = time.perf_counter()
+    funcao()
+    return time.perf_counter() - inicio
+
+
+def gerar(n):
+    base = datetime(2020, 1, 1, 8, 0)
+    return [{'id': i, 'paciente': random.randint(1, n // 10 + 1), 'profissional': random.randint(1, 50),
+             'data': (base + timedelta(minutes=30 * i)).isoformat(), 'duracao': 30,
+             'status': random.choices(['AGENDADA', 'REALIZADA', 'CANCELADA'], [1, 7, 2])[0],
+             'tipo': random.choice('PO'), 'link': '', 'observacoes': 'Retorno em 30 dias, sem intercorrências',
+             'data_criacao': (base + timedelta(minutes=i)).isoformat(), 'criado_por': 1}
+            for i in range(1, n + 1)]
+
+
+def formatos():
+    def antigo_gravar(registros, caminho):
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(registros, f, indent=4, ensure_ascii=False)
+
+    def antigo_ler(caminho):
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    lista = [('antigo', antigo_gravar, antigo_ler)]
+    implementacoes = [codec.Codec(False)] + ([codec.Codec(True)] if codec.orjson is not None else [])
+    for implementacao in implementacoes:
+        for indentar in (False, True):
+            def gravar(registros, caminho, c=implementacao, indentar=indentar):
+                with open(caminho, 'wb') as f:
+                    c.gravar(registros, f, indentar)
+
+            def ler(caminho, c=implementacao):
+                with open(caminho, 'rb') as f:
+                    return c.ler(f)
+
+            lista.append((implementacao.nome + (' indentado' if indentar else ''), gravar, ler))
+    return lista
+
+
+def executar(n):
+    registros = gerar(n)
+    print(f'\n{n} consultas')
+    print(f"{'formato':<18}{'gravação':>10}{'leitura':>10}{'tamanho':>12}")
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, 'consultas.json')
+        for nome, gravar, ler in formatos():
+            t_gravar = medir(lambda: gravar(registros, caminho))
+            t_ler = medir(lambda: ler(caminho))
+            tamanho = os.path.getsize(caminho)
+            print(f'{nome:<18}{t_gravar:>9.2f}s{t_ler:>9.2f}s{tamanho / 2 ** 20:>9.1f} MiB')
+
+
+if __name__ == '__main__':
+    tamanhos = [int(a) for a in sys.argv[1:]] or [10 ** 5, 10 ** 6]
+    for tamanho in tamanhos:
+        executar(tamanho)
@@ -0,0 +1,92 @@
+"""Benchmark da listagem de consultas do ADMIN (GET /consultas).
+
+Uso (a partir de sghss-api/):
+
+    python -m benchmarks.bench_listagem            # 10^4 e 5*10^4 consultas
+    python -m benchmarks.bench_listagem 100000
+
+Gera usuários, profissionais e consultas sintéticos num diretório temporário
+e compara a junção de paciente_nome/profissional_nome feita registro a
+registro (um ``obter`` por linha e relação, como antes) com a junção em lote
+de api/enriquecimento.py; depois mede a requisição completa pelo test client,
+em JSON e em NDJSON.
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def gerar(n):
+    n_usuarios = max(n // 10, 1)
+    usuarios = [{'id': i, 'nome': f'Usuario {i}', 'email': f'u{i}@exemplo.com', 'senha': '', 'perfil': 'PACIENTE'}
+                for i in range(1, n_usuarios + 1)]
+    profissionais = [{'id': i, 'nome': f'Profissional {i}', 'especialidade': 'Clínica'} for i in range(1, 51)]
+    consultas = [{'id': i, 'paciente': random.randint(1, n_usuarios), 'profissional': random.randint(1, 50),
+                  'data': '2024-01-15T10:00:00', 'status': 'REALIZADA', 'tipo': 'P'}
+                 for i in range(1, n + 1)]
+    os.makedirs('database', exist_ok=True)
+    for nome, dados in (('usuarios', usuarios), ('profissionais', profissionais), ('consultas', consultas)):
+        with open(os.path.join('database', f'{nome}.json'), 'w', encoding='utf-8') as f:
+            json.dump(dados, f)
+
+
+def por_registro(consultas, repositorio):
+    itens = [dict(c) for c in consultas]
+    for item in itens:
+        paciente = repositorio.obter('usuarios', item['paciente'])
+        if paciente:
+            item['paciente_nome'] = paciente['nome']
+        profissional = repositorio.obter('profissionais', item['profissional'])
+        if profissional:
+            item['profissional_nome'] = profissional.get('nome')
+    return itens
+
+
+def medir(funcao, repeticoes=3):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes
+
+
+def executar(n):
+    from api.enriquecimento import NOMES_CONSULTA, enriquecer
+    from app import app
+    from auth.utils import generate_token
+    from storage import repositorio
+
+    gerar(n)
+    consultas = repositorio.listar('consultas')
+    repositorio.listar('usuarios')
+    repositorio.listar('profissionais')
+    token = generate_token(1, 'ADMIN')
+    cliente = app.test_client()
+    cabecalhos = {'Authorization': f'Bearer {token}'}
+
+    print(f'\n{n} consultas')
+    print(f"{'etapa':<22}{'tempo':>12}")
+    for nome, funcao in (
+        ('junção por registro', lambda: por_registro(consultas, repositorio)),
+        ('junção em lote', lambda: enriquecer(consultas, NOMES_CONSULTA)),
+        ('GET /consultas', lambda: cliente.get('/consultas', headers=cabecalhos).get_data()),
+        ('GET ... ndjson', lambda: cliente.get('/consultas?formato=ndjson', headers=cabecalhos).get_data()),
+        ('GET ... limit=100', lambda: cliente.get('/consultas?limit=100', headers=cabecalhos).get_data()),
+    ):
+        print(f'{nome:<22}{medir(funcao) * 1e3:>10.1f}ms')
+
+
+if __name__ == '__main__':
+    tamanhos = [int(a) for a in sys.argv[1:]] or [10 ** 4, 5 * 10 ** 4]
+    raiz = os.getcwd()
+    for tamanho in tamanhos:
+        with tempfile.TemporaryDirectory() as diretorio:
+            os.chdir(diretorio)
+            try:
+                executar(tamanho)
+            finally:
+                os.chdir(raiz)
@@ -0,0 +1,91 @@
+"""Benchmark da validação dos corpos: modelos pydantic (api/esquemas.py) x checagens manuais.
+
+Uso (a partir de sghss-api/):
+
+    python -m benchmarks.bench_validacao          # 100000 validações por caso
+    python -m benchmarks.bench_validacao 20000
+
+Para cada corpo mede o tempo médio de uma validação com o modelo (validador
+compilado uma vez, na definição da classe) e com as checagens manuais que as
+views faziam antes (``'campo' in data``, ``isinstance`` e
+``interpretar_data``), para um corpo válido e um inválido.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import ValidationError  # noqa: E402
+
+from api.agenda import interpretar_data  # noqa: E402
+from api.esquemas import ConsultaLote, LoginEntrada, PacienteEntrada  # noqa: E402
+
+
+def medir(funcao, repeticoes):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        funcao()
+    return (time.perf_counter() - inicio) / repeticoes
+
+
+def pydantic(modelo, corpo):
+    try:
+        return modelo.model_validate(corpo)
+    except ValidationError:
+        return None
+
+
+def manual_login(data):
+    if not data or 'email' not in data or 'senha' not in data:
+        return None
+    return data
+
+
+def manual_paciente(data):
+    for field in ('nome', 'email', 'senha', 'telefone'):
+        if field not in data:
+            return None
+    return data
+
+
+def manual_consulta(data):
+    if any(field not in data for field in ('paciente_id', 'profissional_id', 'data', 'tipo')):
+        return None
+    if not all(isinstance(data[field], int) and not isinstance(data[field], bool)
+               for field in ('paciente_id', 'profissional_id')):
+        return None
+    if interpretar_data(data['data']) is None:
+        return None
+    duracao = data.get('duracao', 30)
+    if isinstance(duracao, bool) or not isinstance(duracao, int) or duracao <= 0:
+        return None
+    return data
+
+
+CASOS = [
+    ('login', LoginEntrada, manual_login,
+     {'email': 'ana@exemplo.com', 'senha': 'segredo123'},
+     {'email': 'ana@exemplo.com'}),
+    ('paciente', PacienteEntrada, manual_paciente,
+     {'nome': 'Ana Souza', 'email': 'ana@exemplo.com', 'senha': 'segredo123', 'telefone': '11999990000',
+      'data_nascimento': '1990-05-01', 'endereco': {'cidade': 'São Paulo', 'uf': 'SP'}},
+     {'nome': 'Ana Souza', 'email': 'ana@exemplo.com', 'senha': 'segredo123'}),
+    ('consulta', ConsultaLote, manual_consulta,
+     {'paciente_id': 12, 'profissional_id': 3, 'data': '2030-03-15T10:30:00', 'tipo': 'P', 'duracao': 45},
+     {'paciente_id': 12, 'profissional_id': 3, 'data': '15/03/2030', 'tipo': 'P'}),
+]
+
+
+def executar(repeticoes):
+    print(f"{'corpo':<20}{'pydantic':>12}{'manual':>12}{'razão':>9}")
+    for nome, modelo, manual, valido, invalido in CASOS:
+        for rotulo, corpo in (('válido', valido), ('inválido', invalido)):
+            t_modelo = medir(lambda: pydantic(modelo, corpo), repeticoes)
+            t_manual = medir(lambda: manual(corpo), repeticoes)
+            print(f'{nome + " " + rotulo:<20}{t_modelo * 1e6:>10.2f}µs{t_manual * 1e6:>10.2f}µs'
+                  f'{t_modelo / t_manual:>8.1f}x')
+
+
+if __name__ == '__main__':
+    executar(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -10,6 +10,21 @@ class Config:
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
     
+    # bcrypt (auth/senhas.py): custo dos hashes e executor dedicado; acima de
+    # BCRYPT_FILA_MAX operações pendentes login/cadastro respondem 503
+    BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+    BCRYPT_THREADS = int(os.getenv('BCRYPT_THREADS', str(max(1, (os.cpu_count() or 2) // 2))))
+    BCRYPT_FILA_MAX = int(os.getenv('BCRYPT_FILA_MAX', '64'))
+    
+    # Tokens JWT já verificados guardados em memória até o exp (auth/tokens.py)
+    TOKEN_CACHE_MAX = int(os.getenv('TOKEN_CACHE_MAX', '10000'))
+    
+    # GET /metrics (api/monitoramento.py): se definido, exige Authorization: Bearer <METRICAS_TOKEN>
+    METRICAS_TOKEN = os.getenv('METRICAS_TOKEN', '')
+    
+    # Revogação de tokens (auth/revogacao.py): registros vencidos apagados a cada intervalo (segundos)
+    REVOGACAO_PODA_INTERVALO = int(os.getenv('REVOGACAO_PODA_INTERVALO', '3600'))
+    
     # Arquivos JSON
     DATA_DIR = 'database'
     FILES = {
@@ -21,5 +36,58 @@ class Config:
         'prontuarios': os.path.join(DATA_DIR, 'prontuarios.json'),
         'receitas': os.path.join(DATA_DIR, 'receitas.json'),
         'internacoes': os.path.join(DATA_DIR, 'internacoes.json'),
-        'notificacoes': os.path.join(DATA_DIR, 'notificacoes.json')
-    }
\ No newline at end of file
+        'notificacoes': os.path.join(DATA_DIR, 'notificacoes.json'),
+        'tokens_revogados': os.path.join(DATA_DIR, 'tokens_revogados.json')
+    }
+    
+    # Persistência: 'json' reescreve o arquivo inteiro a cada escrita;
+    # 'wal' anexa cada mutação a um log JSON-lines e compacta em segundo plano;
+    # 'sqlite' usa o banco SQLITE_PATH (importe os JSON com python -m storage.migrar)
+    STORAGE_MODE = os.getenv('STORAGE_MODE', 'json')
+    WAL_FSYNC_INTERVALO = float(os.getenv('WAL_FSYNC_INTERVALO', '0.05'))  # segundos; 0 = fsync a cada escrita
+    WAL_COMPACTAR_APOS = int(os.getenv('WAL_COMPACTAR_APOS', '10000'))  # entradas no log
+    SQLITE_PATH = os.getenv('SQLITE_PATH', os.path.join(DATA_DIR, 'sghss.db'))
+    
+    # JSON (storage/codec.py): 'auto' usa orjson se instalado, 'orjson' ou 'json' forçam um deles;
+    # JSON_PRETTY=1 indenta arquivos das coleções e respostas (depuração)
+    JSON_CODEC = os.getenv('JSON_CODEC', 'auto')
+    JSON_PRETTY = os.getenv('JSON_PRETTY', '0') == '1'
+    
+    # Agenda: duração assumida para consultas sem o campo 'duracao' (minutos)
+    CONSULTA_DURACAO_MINUTOS = int(os.getenv('CONSULTA_DURACAO_MINUTOS', '30'))
+    
+    # Agenda dos profissionais (GET /profissionais/...): expediente, dias de atendimento
+    # (0 = segunda) e intervalo entre os horários oferecidos; consultas de até AGENDA_MAX_DIAS dias
+    EXPEDIENTE_INICIO = os.getenv('EXPEDIENTE_INICIO', '08:00')
+    EXPEDIENTE_FIM = os.getenv('EXPEDIENTE_FIM', '18:00')
+    EXPEDIENTE_DIAS = [int(d) for d in os.getenv('EXPEDIENTE_DIAS', '0,1,2,3,4').split(',') if d.strip()]
+    AGENDA_PASSO_MINUTOS = int(os.getenv('AGENDA_PASSO_MINUTOS', '30'))
+    AGENDA_MAX_DIAS = int(os.getenv('AGENDA_MAX_DIAS', '31'))
+    
+    # Receitas (api/receitas.py): validade padrão a partir da emissão (dias)
+    RECEITA_VALIDADE_DIAS = int(os.getenv('RECEITA_VALIDADE_DIAS', '30'))
+    
+    # Internações (api/leitos.py): alas e número de leitos de cada uma, no formato "ala:leitos,..."
+    INTERNACAO_ALAS = {
+        ala.strip(): int(leitos)
+        for ala, leitos in (item.split(':') for item in
+                            os.getenv('INTERNACAO_ALAS', 'UTI:10,Enfermaria:40,Pediatria:20').split(',') if item.strip())
+    }
+    
+    # Listagens: tamanho máximo de página (parâmetro limit)
+    PAGINA_MAXIMA = int(os.getenv('PAGINA_MAXIMA', '1000'))
+    
+    # Importação em lote (POST /pacientes/bulk e /consultas/bulk): linhas por requisição
+    LOTE_MAX_ITENS = int(os.getenv('LOTE_MAX_ITENS', '50000'))
+    
+    # Cache de respostas GET (api/cache.py)
+    CACHE_RESPOSTAS = os.getenv('CACHE_RESPOSTAS', '1') == '1'
+    CACHE_RESPOSTAS_MAX_BYTES = int(os.getenv('CACHE_RESPOSTAS_MAX_BYTES', str(32 * 1024 * 1024)))
+    
+    # Notificações gravadas em lotes por uma thread de fundo (api/notificacoes.py)
+    NOTIFICACOES_ASSINCRONAS = os.getenv('NOTIFICACOES_ASSINCRONAS', '1') == '1'
+    NOTIFICACOES_FILA_MAX = int(os.getenv('NOTIFICACOES_FILA_MAX', '10000'))
+    NOTIFICACOES_LOTE = int(os.getenv('NOTIFICACOES_LOTE', '500'))
+    NOTIFICACOES_ESPERA = float(os.getenv('NOTIFICACOES_ESPERA', '1.0'))  # segundos com a fila cheia
+    NOTIFICACOES_ESPERA_MAX = int(os.getenv('NOTIFICACOES_ESPERA_MAX', '30'))  # long-poll de GET /notificacoes
+    NOTIFICACOES_SSE_DURACAO = int(os.getenv('NOTIFICACOES_SSE_DURACAO', '300'))  # depois disso o cliente reconecta
\ No newline at end of file
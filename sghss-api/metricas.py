@@ -0,0 +1,233 @@
+"""Métricas da API no formato texto do Prometheus (expostas em GET /metrics).
+
+Contadores, medidores e histogramas ficam em memória, por processo (com
+vários workers do gunicorn cada um expõe os seus). As métricas usadas pela
+aplicação são definidas aqui, em um só lugar:
+
+- ``sghss_http_*``: requisições por endpoint (regra da rota), método e
+  status, latência e requisições em andamento (api/monitoramento.py);
+- ``sghss_storage_*``: tempo e bytes lidos/gravados por coleção e operação
+  (carga e gravação dos arquivos JSON, log do modo 'wal', SQLite);
+- ``sghss_bcrypt_duracao_segundos`` e ``sghss_jwt_verificacao_duracao_segundos``;
+- ``sghss_enriquecimento_duracao_segundos`` (junção de nomes) e
+  ``sghss_json_resposta_*`` (serialização das respostas).
+
+Estatísticas já mantidas por outros módulos (cache, fila de notificações,
+executor do bcrypt) entram como medidores lidos na hora da coleta
+(``registro.coletor``).
+"""
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+Rotulos = Tuple[str, ...]
+
+# Limites (segundos) dos histogramas de latência
+BALDES_PADRAO = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatar_rotulos(nomes: Sequence[str], valores: Sequence[str], extra: str = '') -> str:
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+def _formatar_valor(valor: float) -> str:
+    if math.isinf(valor):
+        return '+Inf' if valor > 0 else '-Inf'
+    return repr(float(valor)) if not float(valor).is_integer() else str(int(valor))
+
+
+class Metrica:
+    tipo = 'untyped'
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._lock = threading.Lock()
+        self._valores: Dict[Rotulos, float] = {}
+
+    def _chave(self, rotulos: Dict[str, object]) -> Rotulos:
+        return tuple(str(rotulos.get(nome, '')) for nome in self.rotulos)
+
+    def amostras(self) -> Iterator[str]:
+        with self._lock:
+            valores = sorted(self._valores.items())
+        for chave, valor in valores:
+            yield f'{self.nome}{_formatar_rotulos(self.rotulos, chave)} {_formatar_valor(valor)}'
+
+    def exportar(self) -> Iterator[str]:
+        yield f'# HELP {self.nome} {self.ajuda}'
+        yield f'# TYPE {self.nome} {self.tipo}'
+        yield from self.amostras()
+
+
+class Contador(Metrica):
+    tipo = 'counter'
+
+    def inc(self, valor: float = 1.0, **rotulos) -> None:
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0.0) + valor
+
+
+class Medidor(Metrica):
+    tipo = 'gauge'
+
+    def inc(self, valor: float = 1.0, **rotulos) -> None:
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0.0) + valor
+
+    def dec(self, valor: float = 1.0, **rotulos) -> None:
+        self.inc(-valor, **rotulos)
+
+    def definir(self, valor: float, **rotulos) -> None:
+        chave = self._chave(rotulos)
+        with self._lock:
+            self._valores[chave] = valor
+
+
+class Histograma(Metrica):
+    tipo = 'histogram'
+
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = (), baldes: Sequence[float] = BALDES_PADRAO):
+        super().__init__(nome, ajuda, rotulos)
+        self.baldes = tuple(sorted(baldes))
+        self._series: Dict[Rotulos, List[float]] = {}  # contagem por balde (não cumulativa), soma, total
+
+    def observar(self, valor: float, **rotulos) -> None:
+        chave = self._chave(rotulos)
+        indice = bisect_left(self.baldes, valor)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [0.0] * (len(self.baldes) + 3)
+            serie[indice] += 1
+            serie[-2] += valor
+            serie[-1] += 1
+
+    @contextmanager
+    def cronometrar(self, **rotulos) -> Iterator[None]:
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **rotulos)
+
+    def amostras(self) -> Iterator[str]:
+        with self._lock:
+            series = sorted((chave, list(serie)) for chave, serie in self._series.items())
+        for chave, serie in series:
+            acumulado = 0.0
+            for limite, quantidade in zip(self.baldes + (math.inf,), serie):
+                acumulado += quantidade
+                extra = f'le="{_formatar_valor(limite)}"'
+                yield f'{self.nome}_bucket{_formatar_rotulos(self.rotulos, chave, extra)} {_formatar_valor(acumulado)}'
+            rotulos = _formatar_rotulos(self.rotulos, chave)
+            yield f'{self.nome}_sum{rotulos} {_formatar_valor(serie[-2])}'
+            yield f'{self.nome}_count{rotulos} {_formatar_valor(serie[-1])}'
+
+
+Coletor = Callable[[], Iterable[Tuple[str, str, Dict[str, str], float]]]
+
+
+class Registro:
+    """Métricas da aplicação e coletores lidos na exportação"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metricas: Dict[str, Metrica] = {}
+        self._coletores: List[Coletor] = []
+
+    def _registrar(self, metrica: Metrica) -> Metrica:
+        with self._lock:
+            existente = self._metricas.get(metrica.nome)
+            if existente is not None:
+                return existente
+            self._metricas[metrica.nome] = metrica
+            return metrica
+
+    def contador(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()) -> Contador:
+        return self._registrar(Contador(nome, ajuda, rotulos))
+
+    def medidor(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()) -> Medidor:
+        return self._registrar(Medidor(nome, ajuda, rotulos))
+
+    def histograma(self, nome: str, ajuda: str, rotulos: Sequence[str] = (),
+                   baldes: Sequence[float] = BALDES_PADRAO) -> Histograma:
+        return self._registrar(Histograma(nome, ajuda, rotulos, baldes))
+
+    def coletor(self, funcao: Coletor) -> Coletor:
+        """Registra ``funcao``, que devolve medidores (nome, ajuda, rótulos, valor) no momento da coleta"""
+        with self._lock:
+            self._coletores.append(funcao)
+        return funcao
+
+    def exportar(self) -> str:
+        with self._lock:
+            metricas = list(self._metricas.values())
+            coletores = list(self._coletores)
+        linhas: List[str] = []
+        for metrica in metricas:
+            linhas.extend(metrica.exportar())
+
+        coletados: Dict[str, Tuple[str, List[str]]] = {}
+        for coletor in coletores:
+            for nome, ajuda, rotulos, valor in coletor():
+                amostra = f'{nome}{_formatar_rotulos(list(rotulos), list(rotulos.values()))} {_formatar_valor(valor)}'
+                coletados.setdefault(nome, (ajuda, []))[1].append(amostra)
+        for nome, (ajuda, amostras) in coletados.items():
+            linhas.append(f'# HELP {nome} {ajuda}')
+            linhas.append(f'# TYPE {nome} gauge')
+            linhas.extend(amostras)
+        return '\n'.join(linhas) + '\n'
+
+
+registro = Registro()
+
+# HTTP (api/monitoramento.py)
+HTTP_REQUISICOES = registro.contador(
+    'sghss_http_requisicoes_total', 'Requisições respondidas', ('metodo', 'endpoint', 'status'))
+HTTP_DURACAO = registro.histograma(
+    'sghss_http_requisicao_duracao_segundos', 'Tempo até a resposta ficar pronta', ('metodo', 'endpoint'))
+HTTP_EM_ANDAMENTO = registro.medidor(
+    'sghss_http_requisicoes_em_andamento', 'Requisições sendo processadas')
+
+# Persistência
+STORAGE_DURACAO = registro.histograma(
+    'sghss_storage_duracao_segundos', 'Tempo de leitura/gravação', ('colecao', 'operacao'))
+STORAGE_BYTES = registro.contador(
+    'sghss_storage_bytes_total', 'Bytes lidos/gravados', ('colecao', 'operacao'))
+
+# Autenticação
+BCRYPT_DURACAO = registro.histograma(
+    'sghss_bcrypt_duracao_segundos', 'Tempo de CPU de cada hash/verificação bcrypt', ('operacao',),
+    baldes=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0, 5.0))
+JWT_VERIFICACAO = registro.histograma(
+    'sghss_jwt_verificacao_duracao_segundos', 'Verificação do token JWT', ('origem',),
+    baldes=(0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.005))
+
+# Respostas
+ENRIQUECIMENTO_DURACAO = registro.histograma(
+    'sghss_enriquecimento_duracao_segundos', 'Junção de nomes relacionados por bloco de registros')
+JSON_RESPOSTA_DURACAO = registro.histograma(
+    'sghss_json_resposta_duracao_segundos', 'Serialização JSON das respostas')
+JSON_RESPOSTA_BYTES = registro.contador(
+    'sghss_json_resposta_bytes_total', 'Bytes de JSON serializados nas respostas')
+
+
+def registrar_io(colecao: str, operacao: str, inicio: float, tamanho: Optional[int] = None) -> None:
+    """Registra uma leitura/gravação iniciada em ``inicio`` (time.perf_counter)"""
+    STORAGE_DURACAO.observar(time.perf_counter() - inicio, colecao=colecao, operacao=operacao)
+    if tamanho is not None:
+        STORAGE_BYTES.inc(tamanho, colecao=colecao, operacao=operacao)
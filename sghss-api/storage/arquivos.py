@@ -0,0 +1,87 @@
+"""Backend de arquivos: coleções em memória persistidas em JSON ou em log.
+
+Cada coleção de Config.FILES é carregada uma única vez por processo
+(storage/colecao.py), com os índices secundários declarados em INDICES.
+No modo 'json' cada escrita reescreve o arquivo; no modo 'wal' as mutações
+são anexadas a um log (storage/wal.py) e compactadas em segundo plano.
+"""
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Type
+
+from storage.base import D, Backend, Derivado, Registro
+from storage.colecao import Colecao
+from storage.transacao import Transacao
+from storage.wal import ColecaoLog
+
+
+class BackendArquivos(Backend):
+    """Backend 'json'/'wal' sobre as coleções em memória"""
+
+    def __init__(self, arquivos: Dict[str, str], indices: Dict[str, Dict[str, bool]], wal: bool = False):
+        self.arquivos = arquivos
+        self.indices = indices
+        self._classe = ColecaoLog if wal else Colecao
+        self._colecoes: Dict[str, Colecao] = {}
+        self._derivados: Dict[type, Derivado] = {}
+        self._lock = threading.Lock()
+
+    def colecao(self, nome: str) -> Colecao:
+        """Retorna a coleção (única por processo) associada a ``arquivos[nome]``"""
+        col = self._colecoes.get(nome)
+        if col is None:
+            with self._lock:
+                col = self._colecoes.get(nome)
+                if col is None:
+                    col = self._colecoes[nome] = self._classe(nome, self.arquivos[nome], self.indices.get(nome))
+        return col
+
+    def listar(self, nome: str) -> List[Registro]:
+        return self.colecao(nome).listar()
+
+    def obter(self, nome: str, registro_id: int) -> Optional[Registro]:
+        return self.colecao(nome).obter(registro_id)
+
+    def obter_varios(self, nome: str, ids: Iterable[int]) -> Dict[int, Registro]:
+        return self.colecao(nome).obter_varios(ids)
+
+    def buscar(self, nome: str, campo: str, valor: Any) -> List[Registro]:
+        return self.colecao(nome).buscar(campo, valor)
+
+    def iterar(self, nome: str, campo: Optional[str] = None, valor: Any = None,
+               apos: Optional[int] = None) -> Iterator[Registro]:
+        return self.colecao(nome).iterar(campo, valor, apos)
+
+    def reservar_id(self, nome: str) -> int:
+        return self.colecao(nome).reservar_id()
+
+    def inserir(self, nome: str, registro: Registro) -> Registro:
+        return self.colecao(nome).inserir(registro)
+
+    def atualizar(self, nome: str, registro_id: int, campos: Registro) -> Optional[Registro]:
+        return self.colecao(nome).atualizar(registro_id, campos)
+
+    def remover(self, nome: str, registro_id: int) -> Optional[Registro]:
+        return self.colecao(nome).remover(registro_id)
+
+    def transacao(self, *nomes: str) -> Transacao:
+        return Transacao({nome: self.colecao(nome) for nome in nomes})
+
+    def derivado(self, classe: Type[D]) -> D:
+        colecao = self.colecao(classe.colecao)
+        # Só o lock da coleção: quem já está numa transação não pode esperar outro
+        with colecao.lock:
+            derivado = self._derivados.get(classe)
+            if derivado is None:
+                derivado = self._derivados[classe] = classe()
+                colecao.registrar_derivado(derivado)
+            else:
+                colecao.sincronizar()
+        return derivado
+
+    def versao(self, nome: str) -> int:
+        return self.colecao(nome).versao()
+
+    def sincronizar(self, nome: str) -> None:
+        colecao = self.colecao(nome)
+        with colecao.lock:
+            colecao.sincronizar()
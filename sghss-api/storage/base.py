@@ -0,0 +1,92 @@
+"""Interface comum dos backends de persistência.
+
+storage.repositorio escolhe um backend conforme Config.STORAGE_MODE e
+repassa a ele todas as chamadas; os blueprints nunca falam com um backend
+diretamente. Implementações:
+
+- storage/arquivos.py: coleções em memória persistidas em JSON ('json')
+  ou em log JSON-lines ('wal');
+- storage/sqlite.py: banco SQLite em modo WAL ('sqlite').
+
+A transação devolvida por ``transacao`` oferece as mesmas operações de
+leitura e escrita (listar, obter, buscar, ...) com o nome da coleção como
+primeiro argumento.
+
+Estruturas derivadas de uma coleção (agenda de horários, contadores...)
+implementam ``Derivado`` e são obtidas com ``derivado(Classe)``: o backend
+cria uma instância por processo, a reconstrói na carga e lhe repassa cada
+mudança aplicada, inclusive as feitas por outros processos.
+"""
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Type, TypeVar
+
+Registro = Dict[str, Any]
+
+
+class Derivado:
+    """Estrutura mantida a partir das mudanças de uma coleção"""
+
+    colecao = ''
+
+    def reconstruir(self, registros: Iterable[Registro]) -> None:
+        """Descarta o estado e o recalcula a partir de todos os registros"""
+        raise NotImplementedError
+
+    def aplicar(self, anterior: Optional[Registro], novo: Optional[Registro]) -> None:
+        """Uma mudança: inserção (anterior None), remoção (novo None) ou alteração"""
+        raise NotImplementedError
+
+
+D = TypeVar('D', bound=Derivado)
+
+
+class Backend:
+    """Operações que todo backend de persistência precisa oferecer"""
+
+    def listar(self, nome: str) -> List[Registro]:
+        raise NotImplementedError
+
+    def obter(self, nome: str, registro_id: int) -> Optional[Registro]:
+        raise NotImplementedError
+
+    def obter_varios(self, nome: str, ids: Iterable[int]) -> Dict[int, Registro]:
+        """{id: registro} dos ids existentes, numa única leitura"""
+        raise NotImplementedError
+
+    def buscar(self, nome: str, campo: str, valor: Any) -> List[Registro]:
+        raise NotImplementedError
+
+    def buscar_um(self, nome: str, campo: str, valor: Any) -> Optional[Registro]:
+        encontrados = self.buscar(nome, campo, valor)
+        return encontrados[0] if encontrados else None
+
+    def iterar(self, nome: str, campo: Optional[str] = None, valor: Any = None,
+               apos: Optional[int] = None) -> Iterator[Registro]:
+        """Registros em ordem de id, a partir de ``id > apos``, lidos em blocos"""
+        raise NotImplementedError
+
+    def reservar_id(self, nome: str) -> int:
+        raise NotImplementedError
+
+    def inserir(self, nome: str, registro: Registro) -> Registro:
+        raise NotImplementedError
+
+    def atualizar(self, nome: str, registro_id: int, campos: Registro) -> Optional[Registro]:
+        raise NotImplementedError
+
+    def remover(self, nome: str, registro_id: int) -> Optional[Registro]:
+        raise NotImplementedError
+
+    def transacao(self, *nomes: str):
+        raise NotImplementedError
+
+    def derivado(self, classe: Type[D]) -> D:
+        """Instância (única por backend) de ``classe``, sincronizada com a coleção"""
+        raise NotImplementedError
+
+    def versao(self, nome: str) -> int:
+        """Contador da coleção: muda a cada escrita (deste ou de outro processo)"""
+        raise NotImplementedError
+
+    def sincronizar(self, nome: str) -> None:
+        """Atualiza a coleção e seus derivados com as escritas de outros processos"""
+        raise NotImplementedError
@@ -0,0 +1,120 @@
+"""Codificação JSON usada na persistência e nas respostas da API.
+
+Config.JSON_CODEC escolhe a implementação: 'auto' (padrão) usa o orjson
+quando ele está instalado e o ``json`` da biblioteca padrão caso contrário;
+'orjson' exige o pacote e 'json' força a biblioteca padrão. As duas geram o
+mesmo JSON: UTF-8 sem escapes, chaves não-texto convertidas para texto e
+datas em ISO 8601.
+
+A saída é compacta. Com Config.JSON_PRETTY=1 os arquivos das coleções e as
+respostas saem indentados (para depuração); os logs do modo 'wal' e o NDJSON
+continuam com um registro por linha.
+
+``gravar`` escreve a lista de registros direto no arquivo, em blocos, sem
+montar o documento inteiro na memória: um registro por linha, o que também
+mantém os arquivos legíveis e os diffs pequenos.
+"""
+import dataclasses
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import IO, Any, Iterable, Optional, Union
+from uuid import UUID
+
+from config import Config
+
+try:
+    import orjson
+except ImportError:  # opcional: pip install orjson
+    orjson = None
+
+REGISTROS_POR_BLOCO = 512  # registros codificados antes de cada write
+
+
+def _padrao(obj: Any) -> Any:
+    """Tipos que o JSON não representa diretamente"""
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, (Decimal, UUID)):
+        return str(obj)
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f'Objeto do tipo {type(obj).__name__} não é serializável em JSON')
+
+
+class Codec:
+    """Codificador/decodificador JSON (orjson ou biblioteca padrão)"""
+
+    def __init__(self, usar_orjson: bool):
+        if usar_orjson and orjson is None:
+            raise ImportError('JSON_CODEC=orjson exige o pacote orjson (pip install orjson)')
+        self.nome = 'orjson' if usar_orjson else 'json'
+        self._orjson = usar_orjson
+        if usar_orjson:
+            self._opcoes = orjson.OPT_NON_STR_KEYS
+        else:
+            # Codificadores criados uma vez: json.dumps com argumentos cria um a cada chamada
+            self._compacto = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=_padrao)
+            self._indentado = json.JSONEncoder(ensure_ascii=False, indent=2, default=_padrao)
+
+    def codificar(self, obj: Any, indentar: bool = False) -> bytes:
+        if self._orjson:
+            opcoes = self._opcoes | orjson.OPT_INDENT_2 if indentar else self._opcoes
+            return orjson.dumps(obj, default=_padrao, option=opcoes)
+        return (self._indentado if indentar else self._compacto).encode(obj).encode('utf-8')
+
+    def texto(self, obj: Any, indentar: bool = False) -> str:
+        return self.codificar(obj, indentar).decode('utf-8')
+
+    def decodificar(self, dados: Union[bytes, str]) -> Any:
+        """Objeto do JSON em ``dados``; ValueError se o JSON for inválido"""
+        if self._orjson:
+            return orjson.loads(dados)
+        return json.loads(dados)
+
+    def gravar(self, registros: Iterable[Any], arquivo: IO[bytes], indentar: Optional[bool] = None) -> None:
+        """Escreve ``registros`` como uma lista JSON no arquivo binário ``arquivo``"""
+        if indentar is None:
+            indentar = Config.JSON_PRETTY
+        if indentar:
+            arquivo.write(self.codificar(list(registros), indentar=True))
+            arquivo.write(b'\n')
+            return
+
+        arquivo.write(b'[')
+        separador = b'\n'
+        bloco = []
+        for registro in registros:
+            bloco.append(self.codificar(registro))
+            if len(bloco) >= REGISTROS_POR_BLOCO:
+                arquivo.write(separador + b',\n'.join(bloco))
+                separador = b',\n'
+                bloco = []
+        if bloco:
+            arquivo.write(separador + b',\n'.join(bloco))
+            separador = b',\n'
+        arquivo.write(b'\n]\n' if separador == b',\n' else b']\n')
+
+    def ler(self, arquivo: IO[bytes]) -> Any:
+        return self.decodificar(arquivo.read())
+
+
+def _escolher() -> Codec:
+    if Config.JSON_CODEC not in ('auto', 'orjson', 'json'):
+        raise ValueError(f'JSON_CODEC inválido: {Config.JSON_CODEC} (use auto, orjson ou json)')
+    if Config.JSON_CODEC == 'auto':
+        return Codec(orjson is not None)
+    return Codec(Config.JSON_CODEC == 'orjson')
+
+
+padrao = _escolher()
+nome = padrao.nome
+codificar = padrao.codificar
+texto = padrao.texto
+decodificar = padrao.decodificar
+gravar = padrao.gravar
+ler = padrao.ler
@@ -0,0 +1,383 @@
+"""Coleção em memória com índices, persistida como um arquivo JSON.
+
+A coleção é carregada uma única vez; antes de cada operação mtime e tamanho
+do arquivo são comparados com os da última leitura/gravação e o JSON só é
+reprocessado quando outro processo o alterou.
+
+Além do índice primário (id -> registro), a coleção mantém os índices
+secundários recebidos no construtor, atualizados a cada escrita. Assim
+``obter`` é O(1) e ``buscar`` em um campo indexado é O(k) no número de
+registros encontrados; campos não indexados caem numa varredura linear.
+
+Toda mutação é descrita por entradas ``{'op': 'put', 'registro': {...}}`` ou
+``{'op': 'del', 'id': n}``, aplicadas em memória por ``_aplicar`` e gravadas
+por ``_persistir``. Aqui ``_persistir`` grava o arquivo inteiro num
+temporário e o publica com ``os.replace``, de modo que leitores nunca veem um
+arquivo truncado; o modo 'wal' (storage/wal.py) apenas anexa as entradas a
+um log.
+
+Escritas acontecem dentro de ``travar()``: o lock da coleção entre threads e
+um ``flock`` em ``<arquivo>.lock`` entre processos (workers do gunicorn).
+Com a trava, a coleção é sincronizada com o disco antes de ser alterada, o
+que evita perder atualizações feitas por outro processo.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import metricas
+from storage import codec, diario, log
+from storage.base import Derivado, Registro
+
+try:
+    import fcntl
+except ImportError:  # Windows: apenas o lock entre threads
+    fcntl = None
+
+Entrada = Dict[str, Any]
+
+
+class TravaArquivo:
+    """Lock exclusivo entre processos sobre um arquivo auxiliar"""
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._fd = None
+        self._pid = None
+
+    def adquirir(self) -> None:
+        if fcntl is None:
+            return
+        # Após um fork o descritor herdado compartilharia o lock com o pai
+        if self._fd is None or self._pid != os.getpid():
+            self._fd = os.open(self.caminho, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+
+    def liberar(self) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+class Colecao:
+    """Coleção JSON mantida em memória e sincronizada com o arquivo"""
+
+    def __init__(self, nome: str, arquivo: str, indices: Optional[Dict[str, bool]] = None):
+        self.nome = nome
+        self.arquivo = arquivo
+        self.lock = threading.RLock()
+        self._registros: Dict[int, Registro] = {}
+        self._ids: List[int] = []  # ids em ordem crescente (paginação por cursor)
+        self._campos_indexados = dict(indices or {})
+        # Índices únicos: valor -> id; demais: valor -> lista ordenada de ids
+        self._indices: Dict[str, Dict[Any, Any]] = {}
+        self._assinatura = None  # (inode, mtime_ns, tamanho) do arquivo em memória
+        self._carregada = False
+        self._proximo_id = 1
+        self._trava = TravaArquivo(arquivo + '.lock')
+        self._profundidade = 0  # aninhamento de travar() na thread dona do lock
+        self._derivados: List[Derivado] = []
+        self._versao = 0  # muda a cada carga e a cada entrada aplicada neste processo
+
+    @contextmanager
+    def travar(self):
+        """Trava a coleção para escrita (entre threads e entre processos)"""
+        with self.lock:
+            if self._profundidade == 0:
+                self._trava.adquirir()
+            self._profundidade += 1
+            try:
+                if self._profundidade == 1:
+                    self._recuperar_transacoes()
+                yield self
+            finally:
+                self._profundidade -= 1
+                if self._profundidade == 0:
+                    self._trava.liberar()
+
+    def _recuperar_transacoes(self) -> None:
+        """Reaplica partes de transações interrompidas por uma queda"""
+        for caminho, entradas in diario.pendentes(os.path.dirname(self.arquivo), self.nome):
+            self.sincronizar()
+            for entrada in entradas:
+                self._aplicar(entrada)
+            self._escrever_aplicadas(entradas)
+            diario.concluir(caminho, self.nome)
+
+    # Sincronização com o arquivo
+    def _assinatura_arquivo(self):
+        try:
+            st = os.stat(self.arquivo)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def sincronizar(self) -> None:
+        """Recarrega o arquivo se ele mudou desde a última leitura"""
+        assinatura = self._assinatura_arquivo()
+        if self._carregada and assinatura == self._assinatura:
+            return
+
+        self._carregar()
+        self._assinatura = assinatura
+
+        # Logs deixados pelo modo 'wal' são incorporados ao arquivo
+        if log.existem_logs(self.arquivo):
+            with self.travar():
+                for entrada in log.ler_logs(self.arquivo):
+                    self._aplicar(entrada)
+                self.salvar()
+                log.descartar_logs(self.arquivo)
+
+    def _carregar(self) -> None:
+        """Reconstrói registros e índices a partir do arquivo JSON"""
+        inicio = time.perf_counter()
+        conteudo = b''
+        try:
+            with open(self.arquivo, 'rb') as f:
+                conteudo = f.read()
+            dados = codec.decodificar(conteudo)
+        except (FileNotFoundError, ValueError):
+            dados = []
+        metricas.registrar_io(self.nome, 'carga', inicio, len(conteudo))
+
+        self._registros = {}
+        self._indices = {campo: {} for campo in self._campos_indexados}
+        self._proximo_id = max((r.get('id', 0) for r in dados), default=0) + 1
+        for registro in dados:
+            # Registros antigos (atendimentos, prontuários...) não tinham id
+            if 'id' not in registro:
+                registro['id'] = self._proximo_id
+                self._proximo_id += 1
+            self._registros[registro['id']] = registro
+            self._indexar(registro)
+        self._ids = sorted(self._registros)
+
+        self._carregada = True
+        self._versao += 1
+        for derivado in self._derivados:
+            derivado.reconstruir(self._registros.values())
+
+    def registrar_derivado(self, derivado: Derivado) -> None:
+        """Passa a manter ``derivado`` a cada carga e a cada entrada aplicada"""
+        with self.lock:
+            self.sincronizar()
+            self._derivados.append(derivado)
+            derivado.reconstruir(self._registros.values())
+
+    def _gravar_snapshot(self, registros: List[Registro], caminho: str, fsync: bool = False) -> None:
+        inicio = time.perf_counter()
+        with open(caminho, 'wb') as f:
+            codec.gravar(registros, f)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+            tamanho = f.tell()
+        metricas.registrar_io(self.nome, 'gravacao', inicio, tamanho)
+
+    def salvar(self) -> None:
+        temporario = f'{self.arquivo}.{os.getpid()}.tmp'
+        self._gravar_snapshot(list(self._registros.values()), temporario)
+        os.replace(temporario, self.arquivo)
+        self._assinatura = self._assinatura_arquivo()
+
+    # Índices secundários
+    def _indexar(self, registro: Registro) -> None:
+        registro_id = registro['id']
+        for campo, unico in self._campos_indexados.items():
+            valor = registro.get(campo)
+            if valor is None:
+                continue
+            if unico:
+                self._indices[campo][valor] = registro_id
+                continue
+            ids = self._indices[campo].setdefault(valor, [])
+            if not ids or ids[-1] < registro_id:
+                ids.append(registro_id)
+            else:
+                insort(ids, registro_id)
+
+    def _desindexar(self, registro: Registro) -> None:
+        registro_id = registro['id']
+        for campo, unico in self._campos_indexados.items():
+            valor = registro.get(campo)
+            if valor is None:
+                continue
+            indice = self._indices[campo]
+            if unico:
+                if indice.get(valor) == registro_id:
+                    del indice[valor]
+                continue
+            ids = indice.get(valor)
+            if not ids:
+                continue
+            pos = bisect_left(ids, registro_id)
+            if pos < len(ids) and ids[pos] == registro_id:
+                del ids[pos]
+            if not ids:
+                del indice[valor]
+
+    # Aplicação e persistência de mutações
+    def _aplicar(self, entrada: Entrada) -> Optional[Registro]:
+        """Aplica uma entrada em memória e devolve o registro anterior"""
+        if entrada['op'] == 'lote':
+            for item in entrada['entradas']:
+                self._aplicar(item)
+            return None
+        if entrada['op'] == 'inicio':  # cabeçalho dos logs do modo 'wal'
+            return None
+
+        if entrada['op'] == 'put':
+            registro = entrada['registro']
+            registro_id = registro['id']
+            anterior = self._registros.get(registro_id)
+            if anterior is not None:
+                self._desindexar(anterior)
+            elif not self._ids or self._ids[-1] < registro_id:
+                self._ids.append(registro_id)
+            else:
+                insort(self._ids, registro_id)
+            self._registros[registro_id] = registro
+            self._indexar(registro)
+            self._proximo_id = max(self._proximo_id, registro_id + 1)
+            self._versao += 1
+            for derivado in self._derivados:
+                derivado.aplicar(anterior, registro)
+            return anterior
+
+        anterior = self._registros.pop(entrada['id'], None)
+        if anterior is not None:
+            self._desindexar(anterior)
+            pos = bisect_left(self._ids, entrada['id'])
+            del self._ids[pos]
+            self._versao += 1
+            for derivado in self._derivados:
+                derivado.aplicar(anterior, None)
+        return anterior
+
+    def _persistir(self, entradas: List[Entrada]) -> None:
+        self.salvar()
+
+    def _escrever(self, entradas: Iterable[Entrada]) -> None:
+        entradas = list(entradas)
+        for entrada in entradas:
+            self._aplicar(entrada)
+        self._escrever_aplicadas(entradas)
+
+    def _escrever_aplicadas(self, entradas: List[Entrada]) -> None:
+        """Persiste entradas já aplicadas em memória"""
+        try:
+            self._persistir(entradas)
+        except Exception:
+            # A memória ficou à frente do disco: recarregar na próxima operação
+            self._carregada = False
+            raise
+
+    def _novo_registro(self, registro: Registro) -> Registro:
+        """Cópia de ``registro`` com id (gerado se ausente) na primeira posição"""
+        registro_id = registro.get('id')
+        if registro_id is None:
+            registro_id = self._proximo_id
+        if registro_id in self._registros:
+            raise ValueError(f"{self.nome}: id {registro_id} já existe")
+        return {'id': registro_id, **{k: v for k, v in registro.items() if k != 'id'}}
+
+    # Operações
+    def versao(self) -> int:
+        """Contador que muda sempre que o conteúdo da coleção muda"""
+        with self.lock:
+            self.sincronizar()
+            return self._versao
+
+    def listar(self) -> List[Registro]:
+        with self.lock:
+            self.sincronizar()
+            return list(self._registros.values())
+
+    def obter(self, registro_id: int) -> Optional[Registro]:
+        with self.lock:
+            self.sincronizar()
+            return self._registros.get(registro_id)
+
+    def obter_varios(self, ids: Iterable[int]) -> Dict[int, Registro]:
+        with self.lock:
+            self.sincronizar()
+            registros = self._registros
+            return {i: registros[i] for i in ids if i in registros}
+
+    def buscar(self, campo: str, valor: Any) -> List[Registro]:
+        with self.lock:
+            self.sincronizar()
+            if campo == 'id':
+                registro = self._registros.get(valor)
+                return [registro] if registro is not None else []
+            if campo not in self._campos_indexados:
+                return [r for r in self._registros.values() if r.get(campo) == valor]
+            encontrado = self._indices[campo].get(valor)
+            if encontrado is None:
+                return []
+            if self._campos_indexados[campo]:
+                return [self._registros[encontrado]]
+            return [self._registros[i] for i in encontrado]
+
+    def iterar(self, campo: Optional[str] = None, valor: Any = None,
+               apos: Optional[int] = None, lote: int = 256) -> Iterator[Registro]:
+        """Registros em ordem de id (``id > apos``), opcionalmente com ``campo == valor``.
+
+        Lidos em blocos de ``lote`` sob o lock, retomando do último id: o
+        gerador pode ser consumido aos poucos (streaming) sem segurar a coleção.
+        """
+        while True:
+            with self.lock:
+                self.sincronizar()
+                if campo is None or campo not in self._campos_indexados:
+                    ids = self._ids
+                elif self._campos_indexados[campo]:
+                    unico = self._indices[campo].get(valor)
+                    ids = [unico] if unico is not None else []
+                else:
+                    ids = self._indices[campo].get(valor, [])
+                pos = bisect_right(ids, apos) if apos is not None else 0
+                bloco = [self._registros[i] for i in ids[pos:pos + lote]]
+            if not bloco:
+                return
+            apos = bloco[-1]['id']
+            if campo is not None and campo not in self._campos_indexados:
+                bloco = [r for r in bloco if r.get(campo) == valor]
+            yield from bloco
+
+    def reservar_id(self) -> int:
+        with self.travar():
+            self.sincronizar()
+            novo_id = self._proximo_id
+            self._proximo_id += 1
+            return novo_id
+
+    def inserir(self, registro: Registro) -> Registro:
+        with self.travar():
+            self.sincronizar()
+            registro = self._novo_registro(registro)
+            self._escrever([{'op': 'put', 'registro': registro}])
+            return registro
+
+    def atualizar(self, registro_id: int, campos: Registro) -> Optional[Registro]:
+        with self.travar():
+            self.sincronizar()
+            atual = self._registros.get(registro_id)
+            if atual is None:
+                return None
+            # Novo dict: quem ainda segura o registro antigo não o vê mudar
+            novo = {**atual, **campos, 'id': registro_id}
+            self._escrever([{'op': 'put', 'registro': novo}])
+            return novo
+
+    def remover(self, registro_id: int) -> Optional[Registro]:
+        with self.travar():
+            self.sincronizar()
+            removido = self._registros.get(registro_id)
+            if removido is not None:
+                self._escrever([{'op': 'del', 'id': registro_id}])
+            return removido
@@ -0,0 +1,87 @@
+"""Diário de transações que alteram mais de uma coleção.
+
+Antes de gravar qualquer coleção, a transação escreve as entradas de cada
+coleção em ``<DATA_DIR>/_transacoes/<id>.tmp/<colecao>.json`` e renomeia o
+diretório para ``<id>`` -- esse rename atômico é o ponto de confirmação.
+Depois cada coleção é gravada e sua parte do diário removida.
+
+Se o processo cair no meio, a parte de cada coleção continua no diário e é
+reaplicada (as entradas são idempotentes) na próxima vez que qualquer
+processo travar aquela coleção para escrita, antes de qualquer outra escrita.
+Diretórios ``.tmp`` pertencem a transações nunca confirmadas: nada delas
+chegou às coleções.
+"""
+import os
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from storage import codec
+
+Entrada = Dict
+
+
+def diretorio(base: str) -> str:
+    return os.path.join(base, '_transacoes')
+
+
+def _fsync_diretorio(caminho: str) -> None:
+    try:
+        fd = os.open(caminho, os.O_RDONLY)
+    except OSError:  # Windows não abre diretórios
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def gravar(base: str, partes: Dict[str, List[Entrada]]) -> str:
+    """Grava e confirma o diário; devolve o diretório da transação"""
+    raiz = diretorio(base)
+    transacao_id = f'{time.time_ns():020d}-{os.getpid()}-{threading.get_ident()}'
+    temporario = os.path.join(raiz, transacao_id + '.tmp')
+    os.makedirs(temporario)
+
+    for nome, entradas in partes.items():
+        with open(os.path.join(temporario, nome + '.json'), 'wb') as f:
+            f.write(codec.codificar(entradas))
+            f.flush()
+            os.fsync(f.fileno())
+    _fsync_diretorio(temporario)
+
+    confirmado = os.path.join(raiz, transacao_id)
+    os.rename(temporario, confirmado)
+    _fsync_diretorio(raiz)
+    return confirmado
+
+
+def concluir(caminho: str, nome: str) -> None:
+    """Remove a parte já gravada de uma coleção (e o diretório, se vazio)"""
+    try:
+        os.remove(os.path.join(caminho, nome + '.json'))
+    except FileNotFoundError:
+        pass
+    try:
+        os.rmdir(caminho)
+    except OSError:
+        pass  # ainda há partes de outras coleções
+
+
+def pendentes(base: str, nome: str) -> List[Tuple[str, List[Entrada]]]:
+    """Partes confirmadas e não concluídas de ``nome``, da mais antiga à mais nova"""
+    raiz = diretorio(base)
+    try:
+        transacoes = sorted(t for t in os.listdir(raiz) if not t.endswith('.tmp'))
+    except FileNotFoundError:
+        return []
+
+    encontradas = []
+    for transacao_id in transacoes:
+        caminho = os.path.join(raiz, transacao_id)
+        try:
+            with open(os.path.join(caminho, nome + '.json'), 'rb') as f:
+                encontradas.append((caminho, codec.ler(f)))
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+    return encontradas
@@ -0,0 +1,126 @@
+"""Exporta uma coleção (Config.FILES) como NDJSON, opcionalmente comprimido com gzip.
+
+Uso (na pasta sghss-api)::
+
+    python -m storage.exportar consultas [--since-id 1200] [--since 2024-01-15T00:00:00]
+                                         [--gzip] [--saida consultas.ndjson.gz]
+
+Também disponível em GET /admin/export/<colecao> (api/admin.py).
+
+Os registros saem em ordem de id, lidos em blocos por ``repositorio.iterar``
+e convertidos em linhas à medida que são enviados: a memória usada não
+depende do tamanho da coleção. Para cargas incrementais:
+
+- ``since_id``: só registros com id maior (o último id recebido);
+- ``since``: só registros criados ou alterados a partir da data ISO, pelos
+  campos de data de cada coleção (``CAMPOS_ALTERACAO``).
+
+Hashes de senha não são exportados (``CAMPOS_OMITIDOS``).
+"""
+import argparse
+import sys
+import zlib
+from datetime import datetime
+from typing import Dict, Iterator, Optional, Tuple
+
+from config import Config
+from storage import codec, repositorio
+from storage.base import Registro
+
+# Campos com a data de criação/alteração; 'data' em consultas é o horário marcado
+_PADRAO = ('data_atualizacao', 'data_criacao', 'data_cadastro', 'data')
+CAMPOS_ALTERACAO: Dict[str, Tuple[str, ...]] = {
+    'consultas': ('data_atualizacao', 'data_criacao'),
+    'notificacoes': ('lida_em', 'data'),
+}
+CAMPOS_OMITIDOS: Dict[str, Tuple[str, ...]] = {
+    'usuarios': ('senha',),
+}
+LINHAS_POR_BLOCO = 256  # linhas juntadas (e comprimidas) antes de cada envio
+
+
+def _data(valor) -> Optional[datetime]:
+    try:
+        data = datetime.fromisoformat(str(valor))
+    except ValueError:
+        return None
+    return data.astimezone().replace(tzinfo=None) if data.tzinfo is not None else data
+
+
+def alterado_desde(nome: str, registro: Registro, desde: datetime) -> bool:
+    for campo in CAMPOS_ALTERACAO.get(nome, _PADRAO):
+        data = _data(registro.get(campo)) if registro.get(campo) else None
+        if data is not None and data >= desde:
+            return True
+    return False
+
+
+def registros(nome: str, since_id: Optional[int] = None, since: Optional[datetime] = None) -> Iterator[Registro]:
+    """Registros de ``nome`` em ordem de id, depois de ``since_id`` e alterados desde ``since``"""
+    if nome not in Config.FILES:
+        raise ValueError(f'Coleção desconhecida: {nome}')
+    omitidos = CAMPOS_OMITIDOS.get(nome, ())
+    for registro in repositorio.iterar(nome, apos=since_id):
+        if since is not None and not alterado_desde(nome, registro, since):
+            continue
+        if omitidos:
+            registro = {campo: valor for campo, valor in registro.items() if campo not in omitidos}
+        yield registro
+
+
+def ndjson(nome: str, since_id: Optional[int] = None, since: Optional[datetime] = None) -> Iterator[bytes]:
+    """Blocos de linhas NDJSON (bytes UTF-8)"""
+    bloco = []
+    for registro in registros(nome, since_id, since):
+        bloco.append(codec.codificar(registro))
+        if len(bloco) >= LINHAS_POR_BLOCO:
+            yield b'\n'.join(bloco) + b'\n'
+            bloco = []
+    if bloco:
+        yield b'\n'.join(bloco) + b'\n'
+
+
+def comprimir(blocos: Iterator[bytes]) -> Iterator[bytes]:
+    """Stream gzip dos ``blocos``, gerado aos poucos"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: cabeçalho gzip
+    for bloco in blocos:
+        saida = compressor.compress(bloco)
+        if saida:
+            yield saida
+    yield compressor.flush()
+
+
+def exportar(nome: str, since_id: Optional[int] = None, since: Optional[datetime] = None,
+             gzip: bool = False) -> Iterator[bytes]:
+    blocos = ndjson(nome, since_id, since)
+    return comprimir(blocos) if gzip else blocos
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Exporta uma coleção como NDJSON')
+    parser.add_argument('colecao', choices=sorted(Config.FILES), help='coleção a exportar')
+    parser.add_argument('--since-id', type=int, help='só registros com id maior que este')
+    parser.add_argument('--since', help='só registros criados/alterados a partir desta data ISO')
+    parser.add_argument('--gzip', action='store_true', help='comprime a saída com gzip')
+    parser.add_argument('--saida', help='arquivo de saída (padrão: saída padrão)')
+    args = parser.parse_args(argv)
+
+    since = _data(args.since) if args.since else None
+    if args.since and since is None:
+        print('Data inválida em --since (use o formato ISO, ex.: 2024-01-15T00:00:00)', file=sys.stderr)
+        return 1
+
+    saida = open(args.saida, 'wb') if args.saida else sys.stdout.buffer
+    try:
+        for bloco in exportar(args.colecao, args.since_id, since, args.gzip):
+            saida.write(bloco)
+    finally:
+        if args.saida:
+            saida.close()
+        else:
+            saida.flush()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""Logs JSON-lines usados pelo modo de persistência 'wal'.
+
+O log de uma coleção fica ao lado do arquivo JSON (``consultas.json`` ->
+``consultas.json.log``), uma entrada por linha. Todo log começa com uma
+entrada ``{'op': 'inicio', 'id': ...}`` de id único, que permite a outros
+processos distinguir um log recriado do que já conheciam. Na compactação o
+log corrente é rotacionado para ``consultas.json.log.<n>`` e um novo é criado
+no lugar; a carga aplica o arquivo JSON, depois os logs rotacionados em ordem
+crescente e por fim o log corrente.
+
+Gravações e rotações acontecem com a coleção travada (Colecao.travar), então
+um único processo por vez anexa ao log; leitores sem a trava apenas ignoram
+uma última linha ainda incompleta.
+
+O fsync é feito em lotes: ``anexar`` grava e faz flush, e uma thread de fundo
+sincroniza com o disco os logs alterados a cada Config.WAL_FSYNC_INTERVALO
+segundos. Com intervalo 0 cada ``anexar`` faz o próprio fsync.
+"""
+import atexit
+import glob
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import metricas
+from config import Config
+from storage import codec
+
+Entrada = Dict[str, Any]
+
+
+def caminho_log(arquivo: str) -> str:
+    return arquivo + '.log'
+
+
+def colecao(caminho: str) -> str:
+    """Nome da coleção de um log (``database/consultas.json.log.3`` -> ``consultas``)"""
+    return os.path.basename(caminho).split('.json', 1)[0]
+
+
+def logs_rotacionados(arquivo: str) -> List[str]:
+    """Logs rotacionados ainda não descartados, do mais antigo ao mais novo"""
+    prefixo = caminho_log(arquivo) + '.'
+    caminhos = [c for c in glob.glob(glob.escape(prefixo) + '*') if c[len(prefixo):].isdigit()]
+    return sorted(caminhos, key=lambda c: int(c[len(prefixo):]))
+
+
+def existem_logs(arquivo: str) -> bool:
+    return os.path.exists(caminho_log(arquivo)) or bool(logs_rotacionados(arquivo))
+
+
+def ler(caminho: str, inicio: int = 0) -> Tuple[List[Entrada], int]:
+    """Lê as entradas completas a partir de ``inicio``.
+
+    Devolve as entradas e a posição logo após a última linha completa; uma
+    linha final sem quebra (gravação interrompida) é ignorada.
+    """
+    comeco = time.perf_counter()
+    try:
+        with open(caminho, 'rb') as f:
+            f.seek(inicio)
+            dados = f.read()
+    except FileNotFoundError:
+        return [], 0
+
+    fim = dados.rfind(b'\n') + 1
+    entradas = []
+    for linha in dados[:fim].splitlines():
+        if linha.strip():
+            entradas.append(codec.decodificar(linha))
+    metricas.registrar_io(colecao(caminho), 'log_leitura', comeco, len(dados))
+    return entradas, inicio + fim
+
+
+def identificador(caminho: str) -> Optional[str]:
+    """Id gravado na entrada 'inicio' do log, ou None"""
+    try:
+        with open(caminho, 'rb') as f:
+            primeira = f.readline()
+    except FileNotFoundError:
+        return None
+    if not primeira.endswith(b'\n'):
+        return None
+    entrada = codec.decodificar(primeira)
+    return entrada.get('id') if entrada.get('op') == 'inicio' else None
+
+
+def ler_logs(arquivo: str) -> Iterator[Entrada]:
+    """Todas as entradas dos logs rotacionados e do log corrente, em ordem"""
+    for caminho in logs_rotacionados(arquivo) + [caminho_log(arquivo)]:
+        entradas, _ = ler(caminho)
+        yield from entradas
+
+
+def descartar_logs(arquivo: str, ate: Optional[str] = None) -> None:
+    """Remove os logs rotacionados (até ``ate``, inclusive) e o corrente"""
+    for caminho in logs_rotacionados(arquivo):
+        os.remove(caminho)
+        if caminho == ate:
+            return
+    if ate is None:
+        try:
+            os.remove(caminho_log(arquivo))
+        except FileNotFoundError:
+            pass
+
+
+class LogAnexavel:
+    """Log corrente de uma coleção, aberto em modo append"""
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self.id_atual = None  # id do cabeçalho do log aberto
+        self._arquivo = None
+        self._lock = threading.Lock()
+
+    def _abrir(self):
+        if self._arquivo is not None:
+            # Outro processo rotacionou o log: o descritor aponta para o antigo
+            estado = self.estado()
+            if estado is None or estado[0] != os.fstat(self._arquivo.fileno()).st_ino:
+                self._arquivo.close()
+                self._arquivo = None
+        if self._arquivo is None:
+            self._arquivo = open(self.caminho, 'ab')
+            tamanho = self._arquivo.tell()
+            if tamanho:
+                # Descarta uma linha parcial deixada por uma queda
+                with open(self.caminho, 'rb') as f:
+                    f.seek(tamanho - 1)
+                    if f.read(1) != b'\n':
+                        _, fim = ler(self.caminho)
+                        self._arquivo.truncate(fim)
+                self.id_atual = identificador(self.caminho)
+            else:
+                self.id_atual = uuid.uuid4().hex
+                self._arquivo.write(self._linha({'op': 'inicio', 'id': self.id_atual}))
+                self._arquivo.flush()
+        return self._arquivo
+
+    @staticmethod
+    def _linha(entrada: Entrada) -> bytes:
+        return codec.codificar(entrada) + b'\n'
+
+    def estado(self) -> Optional[Tuple[int, int, int]]:
+        """(inode, tamanho, mtime_ns) do log em disco, ou None se ele não existe"""
+        try:
+            st = os.stat(self.caminho)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def anexar(self, entradas: List[Entrada]) -> Tuple[int, int, int]:
+        """Anexa as entradas e devolve o novo estado do log"""
+        inicio = time.perf_counter()
+        dados = b''.join(self._linha(e) for e in entradas)
+        with self._lock:
+            f = self._abrir()
+            f.write(dados)
+            f.flush()
+            if Config.WAL_FSYNC_INTERVALO <= 0:
+                os.fsync(f.fileno())
+            else:
+                _sincronizador.marcar(self)
+            st = os.fstat(f.fileno())
+        metricas.registrar_io(colecao(self.caminho), 'log_anexar', inicio, len(dados))
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def fsync(self) -> None:
+        with self._lock:
+            if self._arquivo is not None:
+                os.fsync(self._arquivo.fileno())
+
+    def rotacionar(self, destino: str) -> None:
+        """Renomeia o log para ``destino`` e cria um novo log vazio"""
+        with self._lock:
+            if self._arquivo is not None:
+                self._arquivo.flush()
+                os.fsync(self._arquivo.fileno())
+                self._arquivo.close()
+                self._arquivo = None
+            if os.path.exists(self.caminho):
+                os.replace(self.caminho, destino)
+            self._abrir()
+
+
+class _Sincronizador:
+    """Thread de fundo que faz fsync em lote dos logs alterados"""
+
+    def __init__(self):
+        self._pendentes = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def marcar(self, log_anexavel: LogAnexavel) -> None:
+        with self._lock:
+            self._pendentes.add(log_anexavel)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._executar, name='wal-fsync', daemon=True)
+                self._thread.start()
+
+    def sincronizar(self) -> None:
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, set()
+        for log_anexavel in pendentes:
+            log_anexavel.fsync()
+
+    def _executar(self) -> None:
+        while True:
+            time.sleep(Config.WAL_FSYNC_INTERVALO)
+            self.sincronizar()
+
+
+_sincronizador = _Sincronizador()
+atexit.register(_sincronizador.sincronizar)
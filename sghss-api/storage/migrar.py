@@ -0,0 +1,64 @@
+"""Importa as coleções JSON (Config.FILES) para o banco SQLite.
+
+Uso (na pasta sghss-api)::
+
+    python -m storage.migrar [--destino database/sghss.db] [--substituir]
+
+Lê cada coleção como o modo 'json'/'wal' leria (incluindo logs e
+transações pendentes no diário) e grava tudo no banco em uma única
+transação, preservando os ids. Sem ``--substituir`` a migração recusa
+tabelas que já tenham registros. Depois, use STORAGE_MODE=sqlite.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+
+from config import Config
+from storage.colecao import Colecao
+from storage.repositorio import INDICES
+from storage.sqlite import BackendSQLite
+
+
+def migrar(destino: str, substituir: bool = False) -> dict:
+    """Copia todas as coleções para ``destino``; devolve {nome: quantidade}"""
+    banco = BackendSQLite(destino, Config.FILES, INDICES)
+    origem = {}
+    for nome, arquivo in Config.FILES.items():
+        if not os.path.exists(arquivo):
+            origem[nome] = []
+            continue
+        colecao = Colecao(nome, arquivo, INDICES.get(nome))
+        with colecao.travar():
+            colecao.sincronizar()
+            origem[nome] = [r for r in colecao.listar() if r.get('id') is not None]
+
+    quantidades = {}
+    with banco.transacao(*Config.FILES):
+        for nome, registros in origem.items():
+            if not substituir and banco.contar(nome):
+                raise ValueError(f'Tabela {nome} já tem registros (use --substituir)')
+            quantidades[nome] = banco.importar(nome, registros, substituir=substituir)
+    return quantidades
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Migra os arquivos JSON para o banco SQLite')
+    parser.add_argument('--destino', default=Config.SQLITE_PATH, help='arquivo do banco SQLite')
+    parser.add_argument('--substituir', action='store_true', help='apaga o conteúdo atual das tabelas')
+    args = parser.parse_args(argv)
+
+    try:
+        quantidades = migrar(args.destino, args.substituir)
+    except (ValueError, sqlite3.IntegrityError) as e:
+        print(f'Migração cancelada: {e}', file=sys.stderr)
+        return 1
+
+    for nome, quantidade in quantidades.items():
+        print(f'  {nome:<14} {quantidade:>8} registros')
+    print(f'Banco gerado em {args.destino}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
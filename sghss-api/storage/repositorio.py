@@ -0,0 +1,134 @@
+"""Camada de repositório compartilhada pelos blueprints.
+
+As funções deste módulo repassam as chamadas ao backend escolhido por
+Config.STORAGE_MODE (interface em storage/base.py):
+
+- 'json': coleções em memória (storage/colecao.py), com os índices
+  secundários de INDICES, reescrevendo o arquivo a cada escrita;
+- 'wal': idem, anexando as mutações a um log (storage/wal.py);
+- 'sqlite': tabelas de um banco SQLite em Config.SQLITE_PATH
+  (storage/sqlite.py), com INDICES como índices do banco.
+
+Cada função de escrita é atômica sozinha; leituras seguidas de escritas que
+precisam ser consistentes, ou escritas em várias coleções, devem ser feitas
+dentro de ``transacao(...)`` (storage/transacao.py).
+
+Os registros devolvidos podem ser compartilhados com o cache: quem precisar
+acrescentar campos deve trabalhar sobre uma cópia (``dict(registro)``).
+"""
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Type
+
+from config import Config
+from storage.base import D, Backend, Registro
+
+# Índices secundários por coleção: campo -> valor único?
+INDICES: Dict[str, Dict[str, bool]] = {
+    'usuarios': {'email': True},
+    'profissionais': {'especialidade': False},
+    'consultas': {'paciente': False, 'profissional': False},
+    'prontuarios': {'paciente': False, 'profissional': False},
+    'atendimentos': {'paciente': False, 'profissional': False, 'consulta': False},
+    'receitas': {'codigo': True, 'paciente': False, 'profissional': False, 'consulta': False},
+    'internacoes': {'paciente': False},
+    'tokens_revogados': {'jti': True},
+}
+
+
+_backend: Optional[Backend] = None
+_backend_lock = threading.Lock()
+
+
+def criar_backend(modo: str) -> Backend:
+    """Instancia o backend de persistência para ``modo`` ('json', 'wal' ou 'sqlite')"""
+    if modo == 'sqlite':
+        from storage.sqlite import BackendSQLite
+        return BackendSQLite(Config.SQLITE_PATH, Config.FILES, INDICES)
+    if modo in ('json', 'wal'):
+        from storage.arquivos import BackendArquivos
+        return BackendArquivos(Config.FILES, INDICES, wal=(modo == 'wal'))
+    raise ValueError(f'STORAGE_MODE inválido: {modo}')
+
+
+def backend() -> Backend:
+    """Backend (único por processo) escolhido por Config.STORAGE_MODE"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = criar_backend(Config.STORAGE_MODE)
+    return _backend
+
+
+def listar(nome: str) -> List[Registro]:
+    """Lista todos os registros da coleção"""
+    return backend().listar(nome)
+
+
+def obter(nome: str, registro_id: int) -> Optional[Registro]:
+    """Busca um registro pelo id"""
+    return backend().obter(nome, registro_id)
+
+
+def obter_varios(nome: str, ids: Iterable[int]) -> Dict[int, Registro]:
+    """Busca vários registros por id de uma vez: {id: registro} dos existentes"""
+    return backend().obter_varios(nome, ids)
+
+
+def buscar(nome: str, campo: str, valor: Any) -> List[Registro]:
+    """Lista os registros cujo ``campo`` é igual a ``valor`` (usa INDICES)"""
+    return backend().buscar(nome, campo, valor)
+
+
+def buscar_um(nome: str, campo: str, valor: Any) -> Optional[Registro]:
+    """Primeiro registro cujo ``campo`` é igual a ``valor``"""
+    return backend().buscar_um(nome, campo, valor)
+
+
+def iterar(nome: str, campo: Optional[str] = None, valor: Any = None,
+           apos: Optional[int] = None) -> Iterator[Registro]:
+    """Percorre os registros em ordem de id, depois de ``apos`` (paginação por cursor).
+
+    Com ``campo`` só os registros com ``campo == valor`` (usa INDICES).
+    """
+    return backend().iterar(nome, campo, valor, apos)
+
+
+def reservar_id(nome: str) -> int:
+    """Reserva um id para um registro que será inserido em seguida"""
+    return backend().reservar_id(nome)
+
+
+def inserir(nome: str, registro: Registro) -> Registro:
+    """Insere um registro (gera o id se ausente) e o devolve"""
+    return backend().inserir(nome, registro)
+
+
+def atualizar(nome: str, registro_id: int, campos: Registro) -> Optional[Registro]:
+    """Atualiza campos de um registro; None se ele não existe"""
+    return backend().atualizar(nome, registro_id, campos)
+
+
+def remover(nome: str, registro_id: int) -> Optional[Registro]:
+    """Remove um registro e o devolve; None se ele não existe"""
+    return backend().remover(nome, registro_id)
+
+
+def transacao(*nomes: str):
+    """Abre uma transação sobre as coleções informadas (use com ``with``)"""
+    return backend().transacao(*nomes)
+
+
+def derivado(classe: Type[D]) -> D:
+    """Estrutura derivada ``classe`` (única por processo), já sincronizada"""
+    return backend().derivado(classe)
+
+
+def versao(nome: str) -> int:
+    """Versão da coleção: muda a cada escrita (invalidação de caches)"""
+    return backend().versao(nome)
+
+
+def sincronizar(nome: str) -> None:
+    """Traz para este processo as escritas feitas por outros em ``nome``"""
+    backend().sincronizar(nome)
@@ -0,0 +1,422 @@
+"""Backend SQLite (Config.STORAGE_MODE = 'sqlite').
+
+Cada coleção vira uma tabela ``(id INTEGER PRIMARY KEY, dados TEXT, ...)``:
+o registro inteiro fica em ``dados`` (JSON) e os campos usados em buscas
+são copiados para colunas próprias, indexadas:
+
+- os campos de INDICES (storage/repositorio.py), únicos ou não;
+- os índices compostos de INDICES_COMPOSTOS, como consultas(profissional,
+  data, status), usado na checagem de conflito de horário.
+
+Colunas novas em INDICES são criadas e preenchidas na abertura do banco.
+O banco roda em journal_mode=WAL (leitores não bloqueiam o escritor) e cada
+thread usa sua própria conexão. Escritas abrem ``BEGIN IMMEDIATE``, então
+uma transação (``transacao(...)``) trava o banco para escrita desde o início
+e as leituras feitas dentro dela já enxergam o estado que será confirmado.
+
+Cada escrita incrementa o contador da coleção em ``_versoes``. As estruturas
+derivadas (``registrar_derivado``) recebem as mudanças de uma transação só
+depois do COMMIT; se o contador mostrar que outro processo escreveu, elas são
+reconstruídas a partir da tabela em ``sincronizar``.
+
+Para importar os arquivos JSON existentes: ``python -m storage.migrar``.
+"""
+import os
+import sqlite3
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Type
+
+import metricas
+from storage import codec
+from storage.base import D, Backend, Derivado, Registro
+
+# Índices compostos por coleção (além dos campos simples de INDICES)
+INDICES_COMPOSTOS: Dict[str, List[Tuple[str, ...]]] = {
+    'consultas': [('profissional', 'data', 'status')],
+}
+
+TIMEOUT = 30.0  # segundos esperando o banco destravar
+
+
+def _valor_coluna(valor: Any) -> Any:
+    if isinstance(valor, (dict, list)):
+        return codec.texto(valor)
+    return valor
+
+
+class BackendSQLite(Backend):
+    """Coleções como tabelas de um único banco SQLite"""
+
+    def __init__(self, caminho: str, nomes: Iterable[str], indices: Dict[str, Dict[str, bool]]):
+        self.caminho = caminho
+        self.nomes = tuple(nomes)
+        self.indices = indices
+        self.colunas: Dict[str, Tuple[str, ...]] = {}
+        for nome in self.nomes:
+            campos = list(indices.get(nome, {}))
+            for composto in INDICES_COMPOSTOS.get(nome, []):
+                campos.extend(c for c in composto if c not in campos)
+            self.colunas[nome] = tuple(campos)
+        self._local = threading.local()
+        self._derivados: Dict[str, List[Derivado]] = {}
+        self._instancias: Dict[type, Derivado] = {}
+        self._versoes_derivados: Dict[str, int] = {}  # versão refletida pelos derivados
+        self._derivados_lock = threading.RLock()
+
+        diretorio = os.path.dirname(caminho)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        self._criar_esquema()
+
+    # Conexões (uma por thread; recriada após fork)
+    def _conexao(self) -> sqlite3.Connection:
+        local = self._local
+        conexao = getattr(local, 'conexao', None)
+        if conexao is None or local.pid != os.getpid():
+            conexao = sqlite3.connect(self.caminho, timeout=TIMEOUT, isolation_level=None)
+            conexao.execute('PRAGMA journal_mode=WAL')
+            conexao.execute('PRAGMA synchronous=NORMAL')
+            local.conexao = conexao
+            local.pid = os.getpid()
+            local.profundidade = 0
+        return conexao
+
+    @contextmanager
+    def _escrita(self) -> Iterator[sqlite3.Connection]:
+        """Transação de escrita; reentrante dentro da mesma thread"""
+        conexao = self._conexao()
+        local = self._local
+        if local.profundidade:
+            local.profundidade += 1
+            try:
+                yield conexao
+            finally:
+                local.profundidade -= 1
+            return
+
+        inicio = time.perf_counter()
+        conexao.execute('BEGIN IMMEDIATE')
+        local.profundidade = 1
+        local.versoes_iniciais = {}
+        local.mudancas = []
+        try:
+            yield conexao
+            versoes_finais = {nome: self._versao(conexao, nome) for nome in local.versoes_iniciais}
+            conexao.execute('COMMIT')
+        except BaseException:
+            if conexao.in_transaction:
+                conexao.execute('ROLLBACK')
+            raise
+        finally:
+            local.profundidade = 0
+        metricas.registrar_io(','.join(sorted(local.versoes_iniciais)) or '-', 'transacao', inicio)
+        self._publicar(local.versoes_iniciais, versoes_finais, local.mudancas)
+
+    def _criar_esquema(self) -> None:
+        with self._escrita() as conexao:
+            conexao.execute(
+                'CREATE TABLE IF NOT EXISTS _sequencias (nome TEXT PRIMARY KEY, proximo INTEGER NOT NULL)'
+            )
+            conexao.execute('CREATE TABLE IF NOT EXISTS _versoes (nome TEXT PRIMARY KEY, versao INTEGER NOT NULL)')
+            for nome in self.nomes:
+                conexao.execute('INSERT OR IGNORE INTO _versoes (nome, versao) VALUES (?, 0)', (nome,))
+                conexao.execute(f'CREATE TABLE IF NOT EXISTS "{nome}" (id INTEGER PRIMARY KEY, dados TEXT NOT NULL)')
+                existentes = {linha[1] for linha in conexao.execute(f'PRAGMA table_info("{nome}")')}
+                for campo in self.colunas[nome]:
+                    if campo in existentes:
+                        continue
+                    # Sem tipo declarado: a coluna guarda o valor como veio do JSON
+                    conexao.execute(f'ALTER TABLE "{nome}" ADD COLUMN "{campo}"')
+                    conexao.execute(f'UPDATE "{nome}" SET "{campo}" = json_extract(dados, ?)', (f'$."{campo}"',))
+                for campo, unico in self.indices.get(nome, {}).items():
+                    conexao.execute(
+                        f'CREATE {"UNIQUE " if unico else ""}INDEX IF NOT EXISTS '
+                        f'"ix_{nome}_{campo}" ON "{nome}" ("{campo}")'
+                    )
+                for composto in INDICES_COMPOSTOS.get(nome, []):
+                    colunas = ', '.join(f'"{c}"' for c in composto)
+                    conexao.execute(
+                        f'CREATE INDEX IF NOT EXISTS "ix_{nome}_{"_".join(composto)}" ON "{nome}" ({colunas})'
+                    )
+
+    # Conversão registro <-> linha
+    def _tabela(self, nome: str) -> str:
+        if nome not in self.colunas:
+            raise KeyError(f'Coleção {nome} não existe')
+        return nome
+
+    def _linha(self, nome: str, registro: Registro) -> Sequence[Any]:
+        dados = codec.texto(registro)
+        metricas.STORAGE_BYTES.inc(len(dados), colecao=nome, operacao='gravacao')
+        return (registro['id'], dados, *(_valor_coluna(registro.get(c)) for c in self.colunas[nome]))
+
+    def _inserir_linhas(self, conexao: sqlite3.Connection, nome: str, linhas: List[Sequence[Any]]) -> None:
+        colunas = ('id', 'dados', *self.colunas[nome])
+        nomes = ', '.join(f'"{c}"' for c in colunas)
+        marcadores = ', '.join('?' for _ in colunas)
+        conexao.executemany(f'INSERT INTO "{nome}" ({nomes}) VALUES ({marcadores})', linhas)
+
+    def _proximo_id(self, conexao: sqlite3.Connection, nome: str) -> int:
+        linha = conexao.execute('SELECT proximo FROM _sequencias WHERE nome = ?', (nome,)).fetchone()
+        maior = conexao.execute(f'SELECT COALESCE(MAX(id), 0) FROM "{nome}"').fetchone()[0]
+        return max(linha[0] if linha else 1, maior + 1)
+
+    def _avancar_sequencia(self, conexao: sqlite3.Connection, nome: str, proximo: int) -> None:
+        conexao.execute(
+            'INSERT INTO _sequencias (nome, proximo) VALUES (?, ?) '
+            'ON CONFLICT(nome) DO UPDATE SET proximo = MAX(proximo, excluded.proximo)',
+            (nome, proximo),
+        )
+
+    # Versões e estruturas derivadas
+    def _versao(self, conexao: sqlite3.Connection, nome: str) -> int:
+        return conexao.execute('SELECT versao FROM _versoes WHERE nome = ?', (nome,)).fetchone()[0]
+
+    def _mudou(self, conexao: sqlite3.Connection, nome: str,
+               anterior: Optional[Registro], novo: Optional[Registro]) -> None:
+        """Registra uma mudança da transação de escrita corrente"""
+        local = self._local
+        if nome not in local.versoes_iniciais:
+            local.versoes_iniciais[nome] = self._versao(conexao, nome)
+        conexao.execute('UPDATE _versoes SET versao = versao + 1 WHERE nome = ?', (nome,))
+        if nome in self._derivados:
+            local.mudancas.append((nome, anterior, novo))
+
+    def _publicar(self, iniciais: Dict[str, int], finais: Dict[str, int], mudancas: list) -> None:
+        """Repassa aos derivados as mudanças de uma transação confirmada"""
+        with self._derivados_lock:
+            for nome, inicial in iniciais.items():
+                if nome not in self._derivados:
+                    continue
+                proprias = [(a, n) for m, a, n in mudancas if m == nome]
+                if (self._versoes_derivados.get(nome) != inicial
+                        or finais[nome] != inicial + len(proprias)):
+                    continue  # defasados: reconstruídos no próximo sincronizar
+                for anterior, novo in proprias:
+                    for derivado in self._derivados[nome]:
+                        derivado.aplicar(anterior, novo)
+                self._versoes_derivados[nome] = finais[nome]
+
+    def versao(self, nome: str) -> int:
+        return self._versao(self._conexao(), self._tabela(nome))
+
+    def derivado(self, classe: Type[D]) -> D:
+        with self._derivados_lock:
+            derivado = self._instancias.get(classe)
+            if derivado is None:
+                derivado = self._instancias[classe] = classe()
+                self._derivados.setdefault(self._tabela(classe.colecao), []).append(derivado)
+                self._versoes_derivados.pop(classe.colecao, None)
+        self.sincronizar(classe.colecao)
+        return derivado
+
+    def sincronizar(self, nome: str) -> None:
+        tabela = self._tabela(nome)
+        if tabela not in self._derivados:
+            return
+        local = self._local
+        conexao = self._conexao()
+        if local.profundidade:
+            if any(m == tabela for m, _, _ in local.mudancas):
+                return  # a transação corrente já alterou a tabela: espera o COMMIT
+            versao = self._versao(conexao, tabela)
+            with self._derivados_lock:
+                if self._versoes_derivados.get(tabela) != versao:
+                    self._reconstruir(conexao, tabela, versao)
+            return
+
+        with self._derivados_lock:
+            if self._versoes_derivados.get(tabela) == self._versao(conexao, tabela):
+                return
+            # Leitura consistente: registros e versão do mesmo instante
+            conexao.execute('BEGIN')
+            try:
+                self._reconstruir(conexao, tabela, self._versao(conexao, tabela))
+            finally:
+                conexao.execute('COMMIT')
+
+    def _reconstruir(self, conexao: sqlite3.Connection, nome: str, versao: int) -> None:
+        inicio = time.perf_counter()
+        linhas = [d for (d,) in conexao.execute(f'SELECT dados FROM "{nome}" ORDER BY id')]
+        registros = [codec.decodificar(d) for d in linhas]
+        metricas.registrar_io(nome, 'carga', inicio, sum(len(d) for d in linhas))
+        for derivado in self._derivados[nome]:
+            derivado.reconstruir(registros)
+        self._versoes_derivados[nome] = versao
+
+    # Operações
+    def listar(self, nome: str) -> List[Registro]:
+        tabela = self._tabela(nome)
+        cursor = self._conexao().execute(f'SELECT dados FROM "{tabela}" ORDER BY id')
+        return [codec.decodificar(dados) for (dados,) in cursor]
+
+    def obter(self, nome: str, registro_id: int) -> Optional[Registro]:
+        tabela = self._tabela(nome)
+        linha = self._conexao().execute(f'SELECT dados FROM "{tabela}" WHERE id = ?', (registro_id,)).fetchone()
+        return codec.decodificar(linha[0]) if linha else None
+
+    def obter_varios(self, nome: str, ids: Iterable[int]) -> Dict[int, Registro]:
+        tabela = self._tabela(nome)
+        ids = list(ids)
+        encontrados = {}
+        conexao = self._conexao()
+        # Blocos abaixo do limite de parâmetros por comando do SQLite
+        for inicio in range(0, len(ids), 500):
+            bloco = ids[inicio:inicio + 500]
+            marcadores = ', '.join('?' for _ in bloco)
+            for registro_id, dados in conexao.execute(
+                    f'SELECT id, dados FROM "{tabela}" WHERE id IN ({marcadores})', bloco):
+                encontrados[registro_id] = codec.decodificar(dados)
+        return encontrados
+
+    def _condicao(self, tabela: str, campo: str, valor: Any) -> Tuple[str, Tuple[Any, ...]]:
+        if campo == 'id' or campo in self.colunas[tabela]:
+            return f'"{campo}" = ?', (_valor_coluna(valor),)
+        return 'json_extract(dados, ?) = ?', (f'$."{campo}"', valor)
+
+    def buscar(self, nome: str, campo: str, valor: Any) -> List[Registro]:
+        tabela = self._tabela(nome)
+        if valor is None:
+            return []
+        condicao, parametros = self._condicao(tabela, campo, valor)
+        cursor = self._conexao().execute(f'SELECT dados FROM "{tabela}" WHERE {condicao} ORDER BY id', parametros)
+        return [codec.decodificar(dados) for (dados,) in cursor]
+
+    def iterar(self, nome: str, campo: Optional[str] = None, valor: Any = None,
+               apos: Optional[int] = None, lote: int = 256) -> Iterator[Registro]:
+        tabela = self._tabela(nome)
+        condicao, parametros = ('1', ()) if campo is None else self._condicao(tabela, campo, valor)
+        sql = f'SELECT id, dados FROM "{tabela}" WHERE {condicao} AND id > ? ORDER BY id LIMIT ?'
+        # Uma consulta curta por bloco: não segura transação de leitura entre blocos
+        ultimo = apos if apos is not None else -(2 ** 63)
+        while True:
+            linhas = self._conexao().execute(sql, (*parametros, ultimo, lote)).fetchall()
+            if not linhas:
+                return
+            ultimo = linhas[-1][0]
+            for _, dados in linhas:
+                yield codec.decodificar(dados)
+
+    def reservar_id(self, nome: str) -> int:
+        tabela = self._tabela(nome)
+        with self._escrita() as conexao:
+            registro_id = self._proximo_id(conexao, tabela)
+            self._avancar_sequencia(conexao, tabela, registro_id + 1)
+        return registro_id
+
+    def inserir(self, nome: str, registro: Registro) -> Registro:
+        tabela = self._tabela(nome)
+        with self._escrita() as conexao:
+            registro_id = registro.get('id')
+            if registro_id is None:
+                registro_id = self._proximo_id(conexao, tabela)
+            elif conexao.execute(f'SELECT 1 FROM "{tabela}" WHERE id = ?', (registro_id,)).fetchone():
+                raise ValueError(f"{nome}: id {registro_id} já existe")
+            novo = {'id': registro_id, **{k: v for k, v in registro.items() if k != 'id'}}
+            self._inserir_linhas(conexao, tabela, [self._linha(tabela, novo)])
+            self._avancar_sequencia(conexao, tabela, registro_id + 1)
+            self._mudou(conexao, tabela, None, novo)
+        return novo
+
+    def atualizar(self, nome: str, registro_id: int, campos: Registro) -> Optional[Registro]:
+        tabela = self._tabela(nome)
+        with self._escrita() as conexao:
+            atual = self.obter(tabela, registro_id)
+            if atual is None:
+                return None
+            novo = {**atual, **campos, 'id': registro_id}
+            atribuicoes = ', '.join(f'"{c}" = ?' for c in ('dados', *self.colunas[tabela]))
+            conexao.execute(
+                f'UPDATE "{tabela}" SET {atribuicoes} WHERE id = ?',
+                (*self._linha(tabela, novo)[1:], registro_id),
+            )
+            self._mudou(conexao, tabela, atual, novo)
+        return novo
+
+    def remover(self, nome: str, registro_id: int) -> Optional[Registro]:
+        tabela = self._tabela(nome)
+        with self._escrita() as conexao:
+            removido = self.obter(tabela, registro_id)
+            if removido is not None:
+                conexao.execute(f'DELETE FROM "{tabela}" WHERE id = ?', (registro_id,))
+                self._mudou(conexao, tabela, removido, None)
+        return removido
+
+    def transacao(self, *nomes: str) -> 'TransacaoSQLite':
+        return TransacaoSQLite(self, nomes)
+
+    def importar(self, nome: str, registros: Iterable[Registro], substituir: bool = False) -> int:
+        """Grava ``registros`` (com id) na tabela de uma vez; devolve quantos"""
+        tabela = self._tabela(nome)
+        linhas = [self._linha(tabela, r) for r in registros]
+        with self._escrita() as conexao:
+            if substituir:
+                conexao.execute(f'DELETE FROM "{tabela}"')
+                conexao.execute('DELETE FROM _sequencias WHERE nome = ?', (tabela,))
+            self._inserir_linhas(conexao, tabela, linhas)
+            self._avancar_sequencia(conexao, tabela, self._proximo_id(conexao, tabela))
+            # Sem repassar registro a registro: os derivados são reconstruídos
+            self._local.versoes_iniciais.setdefault(tabela, self._versao(conexao, tabela))
+            conexao.execute('UPDATE _versoes SET versao = versao + 1 WHERE nome = ?', (tabela,))
+        return len(linhas)
+
+    def contar(self, nome: str) -> int:
+        tabela = self._tabela(nome)
+        return self._conexao().execute(f'SELECT COUNT(*) FROM "{tabela}"').fetchone()[0]
+
+
+class TransacaoSQLite:
+    """Transação do backend SQLite (mesma interface de storage.transacao.Transacao)"""
+
+    def __init__(self, backend: BackendSQLite, nomes: Sequence[str]):
+        self._backend = backend
+        self._nomes = set(nomes)
+        self._pilha = ExitStack()
+        self._apos_confirmar: List[Callable[[], None]] = []
+
+    def __enter__(self) -> 'TransacaoSQLite':
+        self._pilha.enter_context(self._backend._escrita())
+        return self
+
+    def __exit__(self, tipo, valor, rastreamento) -> bool:
+        suprimida = self._pilha.__exit__(tipo, valor, rastreamento)
+        if tipo is None:
+            for funcao in self._apos_confirmar:
+                funcao()
+        return suprimida
+
+    def ao_confirmar(self, funcao: Callable[[], None]) -> None:
+        """Executa ``funcao`` depois do COMMIT"""
+        self._apos_confirmar.append(funcao)
+
+    def _nome(self, nome: str) -> str:
+        if nome not in self._nomes:
+            raise KeyError(f'Coleção {nome} não faz parte da transação')
+        return nome
+
+    def listar(self, nome: str) -> List[Registro]:
+        return self._backend.listar(self._nome(nome))
+
+    def obter(self, nome: str, registro_id: int) -> Optional[Registro]:
+        return self._backend.obter(self._nome(nome), registro_id)
+
+    def buscar(self, nome: str, campo: str, valor: Any) -> List[Registro]:
+        return self._backend.buscar(self._nome(nome), campo, valor)
+
+    def buscar_um(self, nome: str, campo: str, valor: Any) -> Optional[Registro]:
+        encontrados = self.buscar(nome, campo, valor)
+        return encontrados[0] if encontrados else None
+
+    def reservar_id(self, nome: str) -> int:
+        return self._backend.reservar_id(self._nome(nome))
+
+    def inserir(self, nome: str, registro: Registro) -> Registro:
+        return self._backend.inserir(self._nome(nome), registro)
+
+    def atualizar(self, nome: str, registro_id: int, campos: Registro) -> Optional[Registro]:
+        return self._backend.atualizar(self._nome(nome), registro_id, campos)
+
+    def remover(self, nome: str, registro_id: int) -> Optional[Registro]:
+        return self._backend.remover(self._nome(nome), registro_id)
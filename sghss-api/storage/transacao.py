@@ -0,0 +1,142 @@
+"""Transações sobre uma ou mais coleções do repositório.
+
+Uso::
+
+    with repositorio.transacao('consultas', 'atendimentos') as tx:
+        consulta = tx.obter('consultas', consulta_id)
+        tx.atualizar('consultas', consulta_id, {'status': 'REALIZADA'})
+        tx.inserir('atendimentos', {...})
+
+As coleções são travadas (Colecao.travar) em ordem alfabética, o que evita
+deadlock entre transações, e sincronizadas com o disco. As operações são
+aplicadas em memória na hora -- leituras dentro da transação as enxergam --
+e desfeitas se o bloco levantar exceção. Na saída normal:
+
+- uma coleção alterada: suas entradas são persistidas numa única gravação
+  atômica (rename do arquivo JSON ou uma linha 'lote' no log);
+- várias coleções: as entradas passam antes pelo diário (storage/diario.py),
+  que garante que a transação inteira seja aplicada mesmo após uma queda.
+
+Dentro da transação só as coleções declaradas podem ser usadas.
+"""
+import os
+from contextlib import ExitStack
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from storage import diario
+from storage.colecao import Colecao, Entrada, Registro
+
+
+class Transacao:
+    """Unidade de escrita atômica sobre as coleções declaradas"""
+
+    def __init__(self, colecoes: Dict[str, Colecao]):
+        self._colecoes = colecoes
+        self._pilha = ExitStack()
+        self._entradas: Dict[str, List[Entrada]] = {nome: [] for nome in colecoes}
+        self._desfazer: List[Tuple[Colecao, Entrada]] = []
+        self._apos_confirmar: List[Callable[[], None]] = []
+
+    def __enter__(self) -> 'Transacao':
+        try:
+            for nome in sorted(self._colecoes):
+                self._pilha.enter_context(self._colecoes[nome].travar())
+            for colecao in self._colecoes.values():
+                colecao.sincronizar()
+        except BaseException:
+            self._pilha.close()
+            raise
+        return self
+
+    def __exit__(self, tipo, valor, rastreamento) -> bool:
+        try:
+            if tipo is None:
+                self._confirmar()
+            else:
+                self._reverter()
+        finally:
+            self._pilha.close()
+        if tipo is None:
+            for funcao in self._apos_confirmar:
+                funcao()
+        return False
+
+    def ao_confirmar(self, funcao: Callable[[], None]) -> None:
+        """Executa ``funcao`` depois que a transação for confirmada e destravada"""
+        self._apos_confirmar.append(funcao)
+
+    def _colecao(self, nome: str) -> Colecao:
+        try:
+            return self._colecoes[nome]
+        except KeyError:
+            raise KeyError(f'Coleção {nome} não faz parte da transação') from None
+
+    def _registrar(self, nome: str, entrada: Entrada, registro_id: int) -> None:
+        colecao = self._colecao(nome)
+        anterior = colecao._aplicar(entrada)
+        self._entradas[nome].append(entrada)
+        if anterior is None:
+            inversa = {'op': 'del', 'id': registro_id}
+        else:
+            inversa = {'op': 'put', 'registro': anterior}
+        self._desfazer.append((colecao, inversa))
+
+    def _reverter(self) -> None:
+        for colecao, inversa in reversed(self._desfazer):
+            colecao._aplicar(inversa)
+
+    def _confirmar(self) -> None:
+        alteradas = {nome: entradas for nome, entradas in self._entradas.items() if entradas}
+        if len(alteradas) == 1:
+            nome, entradas = next(iter(alteradas.items()))
+            self._colecoes[nome]._escrever_aplicadas(entradas)
+            return
+        if not alteradas:
+            return
+
+        base = os.path.dirname(next(iter(self._colecoes.values())).arquivo)
+        try:
+            caminho = diario.gravar(base, alteradas)
+        except Exception:
+            self._reverter()
+            raise
+        # Confirmada: a partir daqui o diário completa o que faltar
+        for nome, entradas in alteradas.items():
+            self._colecoes[nome]._escrever_aplicadas(entradas)
+            diario.concluir(caminho, nome)
+
+    # Operações (mesma assinatura das funções de storage.repositorio)
+    def listar(self, nome: str) -> List[Registro]:
+        return self._colecao(nome).listar()
+
+    def obter(self, nome: str, registro_id: int) -> Optional[Registro]:
+        return self._colecao(nome).obter(registro_id)
+
+    def buscar(self, nome: str, campo: str, valor: Any) -> List[Registro]:
+        return self._colecao(nome).buscar(campo, valor)
+
+    def buscar_um(self, nome: str, campo: str, valor: Any) -> Optional[Registro]:
+        encontrados = self.buscar(nome, campo, valor)
+        return encontrados[0] if encontrados else None
+
+    def reservar_id(self, nome: str) -> int:
+        return self._colecao(nome).reservar_id()
+
+    def inserir(self, nome: str, registro: Registro) -> Registro:
+        registro = self._colecao(nome)._novo_registro(registro)
+        self._registrar(nome, {'op': 'put', 'registro': registro}, registro['id'])
+        return registro
+
+    def atualizar(self, nome: str, registro_id: int, campos: Registro) -> Optional[Registro]:
+        atual = self.obter(nome, registro_id)
+        if atual is None:
+            return None
+        novo = {**atual, **campos, 'id': registro_id}
+        self._registrar(nome, {'op': 'put', 'registro': novo}, registro_id)
+        return novo
+
+    def remover(self, nome: str, registro_id: int) -> Optional[Registro]:
+        removido = self.obter(nome, registro_id)
+        if removido is not None:
+            self._registrar(nome, {'op': 'del', 'id': registro_id}, registro_id)
+        return removido
@@ -0,0 +1,152 @@
+"""Modo de persistência 'wal': log de mutações com compactação em segundo plano.
+
+Cada escrita anexa suas entradas ao log da coleção em vez de reescrever o
+arquivo JSON inteiro, então o custo de uma escrita não depende do tamanho da
+coleção. Na carga o arquivo JSON (snapshot) é lido e o log reaplicado.
+
+Uma escrita com várias entradas (transação) vira uma única linha 'lote', de
+modo que nunca é reaplicada pela metade.
+
+Quando o log passa de Config.WAL_COMPACTAR_APOS entradas a coleção é enviada
+à thread de compactação: com a coleção travada o log corrente é rotacionado e
+os registros copiados; fora da trava o snapshot é gravado num temporário,
+publicado com ``os.replace`` (se nenhum processo publicou outro nesse meio
+tempo) e os logs rotacionados são descartados. Uma
+queda em qualquer ponto é recuperada reaplicando os logs que sobraram: as
+entradas são idempotentes (put/del do registro inteiro).
+"""
+import atexit
+import os
+import queue
+import threading
+from typing import List
+
+from config import Config
+from storage import log
+from storage.colecao import Colecao, Entrada
+
+
+class ColecaoLog(Colecao):
+    """Coleção persistida como snapshot JSON + log de entradas"""
+
+    def __init__(self, nome, arquivo, indices=None):
+        super().__init__(nome, arquivo, indices)
+        self.log = log.LogAnexavel(log.caminho_log(arquivo))
+        self._estado_log = None  # estado (inode, tamanho, mtime_ns) do log já aplicado
+        self._posicao_log = 0  # posição logo após a última entrada aplicada
+        self._id_log = None  # id do cabeçalho do log aplicado
+        self._entradas_no_log = 0
+        self._compactando = False
+
+    def sincronizar(self) -> None:
+        assinatura = self._assinatura_arquivo()
+        estado = self.log.estado()
+        if self._carregada and assinatura == self._assinatura:
+            if estado == self._estado_log:
+                return
+            if (estado is not None and self._estado_log is not None
+                    and estado[0] == self._estado_log[0] and estado[1] >= self._posicao_log
+                    and log.identificador(self.log.caminho) == self._id_log):
+                # Outro processo anexou entradas: aplica apenas o final do log
+                entradas, fim = log.ler(self.log.caminho, self._posicao_log)
+                for entrada in entradas:
+                    self._aplicar(entrada)
+                self._entradas_no_log += len(entradas)
+                self._estado_log = estado
+                self._posicao_log = fim
+                return
+
+        # Snapshot novo (compactação) ou log substituído: carga completa
+        self._carregar()
+        self._assinatura = assinatura
+        self._entradas_no_log = 0
+        for caminho in log.logs_rotacionados(self.arquivo):
+            entradas, _ = log.ler(caminho)
+            for entrada in entradas:
+                self._aplicar(entrada)
+            self._entradas_no_log += len(entradas)
+        entradas, fim = log.ler(self.log.caminho)
+        for entrada in entradas:
+            self._aplicar(entrada)
+        self._entradas_no_log += len(entradas)
+        self._estado_log = estado
+        self._posicao_log = fim
+        self._id_log = entradas[0].get('id') if entradas and entradas[0]['op'] == 'inicio' else None
+
+    def _persistir(self, entradas: List[Entrada]) -> None:
+        # Várias entradas viram um único registro 'lote': a linha é atômica
+        if len(entradas) > 1:
+            entradas = [{'op': 'lote', 'entradas': entradas}]
+        self._estado_log = self.log.anexar(entradas)
+        self._posicao_log = self._estado_log[1]
+        self._id_log = self.log.id_atual
+        self._entradas_no_log += len(entradas)
+        if self._entradas_no_log >= Config.WAL_COMPACTAR_APOS and not self._compactando:
+            self._compactando = True
+            _compactador.agendar(self)
+
+    def compactar(self) -> None:
+        """Grava um snapshot com o estado atual e descarta o log aplicado"""
+        try:
+            with self.travar():
+                self.sincronizar()
+                assinatura = self._assinatura
+                registros = list(self._registros.values())
+                rotacionados = log.logs_rotacionados(self.arquivo)
+                sufixo = int(rotacionados[-1].rsplit('.', 1)[1]) + 1 if rotacionados else 1
+                destino = f'{self.log.caminho}.{sufixo}'
+                self.log.rotacionar(destino)
+                self._estado_log = self.log.estado()
+                self._posicao_log = self._estado_log[1]
+                self._id_log = self.log.id_atual
+                self._entradas_no_log = 0
+
+            temporario = f'{self.arquivo}.{os.getpid()}.tmp'
+            self._gravar_snapshot(registros, temporario, fsync=True)
+
+            with self.travar():
+                if self._assinatura_arquivo() != assinatura:
+                    # Outro processo publicou um snapshot mais novo
+                    os.remove(temporario)
+                    return
+                os.replace(temporario, self.arquivo)
+                self._assinatura = self._assinatura_arquivo()
+                log.descartar_logs(self.arquivo, ate=destino)
+        finally:
+            self._compactando = False
+
+
+class _Compactador:
+    """Thread de fundo que compacta as coleções agendadas"""
+
+    def __init__(self):
+        self._fila = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._em_execucao = threading.Lock()
+
+    def agendar(self, colecao: ColecaoLog) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._executar, name='wal-compactacao', daemon=True)
+                self._thread.start()
+        self._fila.put(colecao)
+
+    def _executar(self) -> None:
+        while True:
+            colecao = self._fila.get()
+            with self._em_execucao:
+                try:
+                    colecao.compactar()
+                except OSError:
+                    # Mantém o log: a próxima escrita reagenda a compactação
+                    pass
+
+    def aguardar(self) -> None:
+        """Espera a compactação em andamento (as agendadas ficam para depois)"""
+        with self._em_execucao:
+            pass
+
+
+_compactador = _Compactador()
+atexit.register(_compactador.aguardar)